@@ -0,0 +1,132 @@
+import os
+
+import flask
+import numpy as np
+from solver import solve_layers, solve_clay_batch, soil_profiles, seconds_per_day
+from batch import default_scenario, scenario_inputs, depth_nodes, inputs_profile
+
+# JSON solve API of the Flask server, without the figures of the Dash callbacks. POST /api/solve takes
+# one scenario object, with the names of the batch scenario table, or {"scenarios": [...]}, and the
+# options below next to them.
+max_scenarios = int(os.environ.get('CONSOLIDATION_API_MAX_SCENARIOS', 1000))
+max_times = 1001  # slider positions of a request
+max_values = int(os.environ.get('CONSOLIDATION_API_MAX_VALUES', 5 * 10**6))  # (time × depth) values of a request
+default_times = (10, 50, 90)
+step_range = (0.001, 1.0)  # m, depth steps a request may ask for
+block_size = 100  # scenarios solved at once, whose clay solutions are dropped once their results are taken
+
+scenario_keys = set(default_scenario) | {'id', 'sublayers', 'drains', 'loading', 'compression', 'layers'}
+option_keys = {'times', 'profiles', 'step'}
+
+
+# Error of a request, answered with its status and message
+class RequestError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# Scenario rows, options and whether a single scenario was posted, of the JSON body of a request
+def parse_request(body):
+    if not isinstance(body, dict):
+        raise RequestError('The body is a JSON object: a scenario or {"scenarios": [...]}')
+    single = 'scenarios' not in body
+    rows = [{key: value for key, value in body.items() if key not in option_keys}] if single else body['scenarios']
+    if not isinstance(rows, list) or not rows:
+        raise RequestError('scenarios is a non-empty list of scenario objects')
+    if len(rows) > max_scenarios:
+        raise RequestError(f'At most {max_scenarios} scenarios per request, got {len(rows)}', 413)
+
+    times = body.get('times', default_times)
+    try:
+        times = np.asarray(times, dtype=float).reshape(-1)
+        step = float(body.get('step', 0.05))
+    except (TypeError, ValueError):
+        raise RequestError('times is a list of slider positions and step a number')
+    if not 0 < len(times) <= max_times or not np.all((times >= 0) & (times <= 100)):
+        raise RequestError(f'times is a list of 1 to {max_times} slider positions between 0 and 100')
+    if not step_range[0] <= step <= step_range[1]:
+        raise RequestError(f'step is between {step_range[0]} and {step_range[1]} m')
+
+    scenarios = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise RequestError(f'scenarios[{index}] is not an object')
+        unknown = set(row) - scenario_keys
+        if unknown:
+            raise RequestError(f'scenarios[{index}]: unknown inputs {", ".join(sorted(unknown))}')
+        try:
+            scenarios.append((row.get('id', index), scenario_inputs(row, step)))
+        except (TypeError, ValueError) as error:
+            raise RequestError(f'scenarios[{index}]: {error}')
+
+    # the solutions hold the times and the final state at every node, whether the profiles are sent or not
+    values = sum((len(times) + 1) * depth_nodes(inputs, step) for _, inputs in scenarios)
+    if values > max_values:
+        raise RequestError(f'The solutions would hold {values} values, at most {max_values} per request', 413)
+    return scenarios, times, step, bool(body.get('profiles', False)), single
+
+
+# Clay solutions of the scenarios at the slider positions. The homogeneous clays under an instant load
+# are solved in one batch (see solver.solve_clay_batch); finite differences, nonlinear clays, drains,
+# load histories and layers one scenario at a time.
+def solve_scenarios(scenarios, t, step):
+    solutions = [None] * len(scenarios)
+    batches = {}
+    for i, (_, inputs) in enumerate(scenarios):
+        if inputs['method'] == 'analytic' and not (inputs['drains'] or inputs['loading'] or inputs['layers']):
+            batches.setdefault(inputs['tolerance'], []).append(i)
+    for tolerance, members in batches.items():
+        columns = ([scenarios[i][1][key] for i in members] for key in ('z1', 'z2', 'z3', 'delta_sigma', 'm_v', 'k'))
+        for i, solution in zip(members, solve_clay_batch(t, *columns, tolerance, step)):
+            solutions[i] = solution
+    for i, (_, inputs) in enumerate(scenarios):
+        if solutions[i] is None:
+            solutions[i] = solve_layers(t, inputs_profile(inputs), inputs['delta_sigma'], inputs['tolerance'],
+                                        inputs['method'], inputs['sublayers'], step, inputs['drains'],
+                                        inputs['loading'], inputs['compression'])
+    return solutions
+
+
+# Numeric result of a scenario at the slider positions, the last clay solution being the final state
+def scenario_result(scenario_id, inputs, clay, step, profiles):
+    settelment = clay['accummultive_settelment'][:, -1]
+    result = {
+        'id': scenario_id,
+        'c_v': float(clay['c_v']),
+        't_99_days': float(clay['t_99'] / seconds_per_day),
+        'final_settelment': float(settelment[-1]),
+        'U': np.asarray(clay['U'][:-1], dtype=float).tolist(),
+        'settelment': settelment[:-1].tolist(),
+    }
+    if profiles:
+        column = soil_profiles(clay, inputs_profile(inputs), inputs['delta_sigma'], inputs['water_table'], step)
+        result['profiles'] = {
+            'depths': column['depths'].tolist(),
+            'clay_depths': clay['z2_depth'].tolist(),
+            **{key: column[key][:-1].tolist() for key in ('total_stress', 'pore_pressure', 'effective_stress',
+                                                            'excess_pore_pressure')},
+        }
+    return result
+
+
+# View of POST /api/solve
+def solve():
+    try:
+        scenarios, times, step, profiles, single = parse_request(flask.request.get_json(silent=True))
+    except RequestError as error:
+        return flask.jsonify(error=str(error)), error.status
+    t = np.append(times, 100)  # the final state, for the final settlement
+    results = []
+    for start in range(0, len(scenarios), block_size):
+        block = scenarios[start:start + block_size]
+        results += [scenario_result(scenario_id, inputs, clay, step, profiles)
+                    for (scenario_id, inputs), clay in zip(block, solve_scenarios(block, t, step))]
+    if single:
+        return flask.jsonify(dict(results[0], times=times.tolist()))
+    return flask.jsonify(times=times.tolist(), results=results)
+
+
+# Add the /api/solve route to the Flask server of the app
+def register(server):
+    server.add_url_rule('/api/solve', 'api.solve', solve, methods=['POST'])
@@ -0,0 +1,69 @@
+// clientside.js
+const n_layers = 3;  // dashed boundary lines drawn before the profiles
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    consolidation: {
+        // Show the precomputed time frame of the time slider position in the pressure graph,
+        // whose traces are the layer boundaries, σT, u, σ' and u0. The profiles are plotly typed arrays.
+        select_pressure_frame: function(t, sweep, pressure_fig) {
+            if (t === null || t === undefined || !sweep || !pressure_fig) {
+                return window.dash_clientside.no_update;
+            }
+            const frame = sweep[Math.round(t)];
+            const pressure = Object.assign({}, pressure_fig, {data: pressure_fig.data.slice()});
+            pressure.layout = Object.assign({}, pressure_fig.layout);
+            ['total_stress', 'pore_pressure', 'effective_stress'].forEach(function(key, j) {
+                pressure.data[n_layers + j] = Object.assign({}, pressure.data[n_layers + j],
+                                                            {x: frame[key], y: frame.depths, type: frame.type});
+            });
+            for (let j = 0; j < n_layers; j++) {
+                pressure.data[j] = Object.assign({}, pressure.data[j], {x: [0, frame.x_max]});
+            }
+            pressure.layout.xaxis = Object.assign({}, pressure.layout.xaxis, {range: [0, frame.x_max]});
+            return pressure;
+        },
+
+        // Show the precomputed time frame of the time slider position in the settlement graph,
+        // whose traces are the layer boundaries and the settlement of the clay
+        select_settelment_frame: function(t, sweep, settelment_fig) {
+            if (t === null || t === undefined || !sweep || !settelment_fig) {
+                return window.dash_clientside.no_update;
+            }
+            const frame = sweep[Math.round(t)];
+            const settelment = Object.assign({}, settelment_fig, {data: settelment_fig.data.slice()});
+            settelment.layout = Object.assign({}, settelment_fig.layout);
+            for (let j = 0; j < n_layers; j++) {
+                settelment.data[j] = Object.assign({}, settelment.data[j], {x: [0, frame.x_max]});
+            }
+            settelment.data[n_layers] = Object.assign({}, settelment.data[n_layers],
+                                                      {x: frame.accummultive_settelment, y: frame.depths, type: frame.type});
+            settelment.layout.xaxis = Object.assign({}, settelment.layout.xaxis, {range: [0, frame.x_max]});
+            const annotations = settelment.layout.annotations.slice();
+            annotations[0] = Object.assign({}, annotations[0], {
+                x: frame.label_x,
+                text: 'U = ' + (frame.U * 100).toFixed(0) + '%'
+            });
+            settelment.layout.annotations = annotations;
+            return settelment;
+        },
+
+        // Point the first export links, the profiles at the time of the slider, at the slider position
+        // t, keeping the scenario of their query
+        select_export_time: function(t, links) {
+            if (t === null || t === undefined || !links || !links.length) {
+                return window.dash_clientside.no_update;
+            }
+            const first = links[0];
+            const children = first.props.children.map(function(child, j) {
+                if (j === 0) {
+                    return 'Profiles at t = ' + t + '%:';
+                }
+                const parts = child.props.href.split('?');
+                const query = new URLSearchParams(parts[1]);
+                query.set('t', t);
+                return Object.assign({}, child, {props: Object.assign({}, child.props, {href: parts[0] + '?' + query.toString()})});
+            });
+            return [Object.assign({}, first, {props: Object.assign({}, first.props, {children: children})})].concat(links.slice(1));
+        }
+    }
+});
@@ -0,0 +1,125 @@
+import csv
+import io
+
+import numpy as np
+from solver import gamma_water, drainage_length, series_degree_of_consolidation, seconds_per_day
+
+
+c_v_range = (1e-11, 1e-4)  # m²/s, searched on a log scale
+candidates = 2000  # c_v values per search round
+refinements = 2  # search rounds around the best c_v of the previous round
+chunk_size = 2**21  # largest (candidate × reading × mode) block evaluated at once
+
+
+# Settlement (mm) of the clay at the times (s) for arrays of c_v and m_v, broadcast against each
+# other; the result has a trailing time axis
+def settelment_model(seconds, c_v, m_v, z2, z3, delta_sigma, step=0.05):
+    H = drainage_length(z2, z3)
+    c_v, m_v = np.broadcast_arrays(np.asarray(c_v, dtype=float), np.asarray(m_v, dtype=float))
+    U = series_degree_of_consolidation(c_v[..., None] * np.asarray(seconds, dtype=float) / H**2)
+    return 1000 * m_v[..., None] * delta_sigma * clay_thickness(z2, step) * U
+
+
+# Thickness of the clay as the app integrates its settlement: one step per node of its depth grid
+def clay_thickness(z2, step=0.05):
+    return (int(z2/step) + 1) * step
+
+
+# Best m_v and the sum of squared errors of each c_v candidate. The settlement is linear in m_v, so
+# m_v follows from linear least squares for every c_v; the candidates are evaluated in chunks.
+def profile_fit(seconds, settelment, c_v, z2, z3, delta_sigma, step=0.05):
+    m_v = np.empty(len(c_v))
+    sse = np.empty(len(c_v))
+    block = max(chunk_size // (10 * len(seconds)), 1)
+    for start in range(0, len(c_v), block):
+        shape = settelment_model(seconds, c_v[start:start + block], 1, z2, z3, delta_sigma, step)
+        fitted = np.maximum(shape @ settelment / np.maximum(np.sum(shape**2, axis=-1), np.finfo(float).tiny), 0)
+        m_v[start:start + block] = fitted
+        sse[start:start + block] = np.sum((settelment - fitted[:, None] * shape)**2, axis=-1)
+    return m_v, sse
+
+
+# Two-sided 95 % quantiles of Student's t distribution for 1 to 30 degrees of freedom
+t_table = (12.706204736, 4.302652730, 3.182446305, 2.776445105, 2.570581836, 2.446911851, 2.364624252,
+           2.306004135, 2.262157163, 2.228138852, 2.200985160, 2.178812830, 2.160368656, 2.144786688,
+           2.131449546, 2.119905299, 2.109815578, 2.100922040, 2.093024054, 2.085963447, 2.079613845,
+           2.073873068, 2.068657610, 2.063898562, 2.059538553, 2.055529439, 2.051830516, 2.048407142,
+           2.045229642, 2.042272456)
+
+
+# Two-sided 95 % quantile of Student's t distribution with dof degrees of freedom: the table up to 30,
+# the Cornish–Fisher expansion about the normal quantile z beyond, within 2e-6 there
+def t_quantile(dof, z=1.959963984540054):
+    dof = max(int(dof), 1)
+    if dof <= len(t_table):
+        return t_table[dof - 1]
+    return (z + (z**3 + z) / (4 * dof) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * dof**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * dof**3))
+
+
+# Least-squares fit of c_v and m_v to a settlement record (days, mm), with 95 % confidence intervals
+# from the linearized covariance of (ln c_v, m_v). k follows from k = c_v m_v γw.
+def fit_settelment(days, settelment, z2, z3, delta_sigma, step=0.05):
+    seconds = np.asarray(days, dtype=float) * seconds_per_day
+    settelment = np.asarray(settelment, dtype=float)
+
+    log_c_v = np.linspace(*np.log(c_v_range), candidates)
+    for refinement in range(refinements + 1):
+        if refinement:
+            spacing = log_c_v[1] - log_c_v[0]
+            log_c_v = np.linspace(log_c_v[best] - 2 * spacing, log_c_v[best] + 2 * spacing, candidates)
+        m_v, sse = profile_fit(seconds, settelment, np.exp(log_c_v), z2, z3, delta_sigma, step)
+        best = np.argmin(sse)
+    c_v, m_v, sse = np.exp(log_c_v[best]), m_v[best], sse[best]
+
+    # Jacobian of the settlement with respect to (ln c_v, m_v), by central differences in ln c_v
+    h = 1e-6
+    curves = settelment_model(seconds, c_v * np.exp([-h, h]), m_v, z2, z3, delta_sigma, step)
+    jacobian = np.column_stack(((curves[1] - curves[0]) / (2 * h), curves.mean(axis=0) / max(m_v, np.finfo(float).tiny)))
+    dof = len(seconds) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sse / max(dof, 1) * np.linalg.pinv(jacobian.T @ jacobian)
+    se_log_c_v, se_m_v = np.sqrt(np.maximum(np.diag(covariance), 0))
+    var_log_k = covariance[0, 0] + covariance[1, 1] / m_v**2 + 2 * covariance[0, 1] / m_v
+    se_log_k = np.sqrt(max(var_log_k, 0))
+    t = t_quantile(dof)
+    k = c_v * m_v * gamma_water
+
+    return {
+        'c_v': c_v, 'c_v_interval': (c_v * np.exp(-t * se_log_c_v), c_v * np.exp(t * se_log_c_v)),
+        'm_v': m_v, 'm_v_interval': (m_v - t * se_m_v, m_v + t * se_m_v),
+        'k': k, 'k_interval': (k * np.exp(-t * se_log_k), k * np.exp(t * se_log_k)),
+        'final_settelment': 1000 * m_v * delta_sigma * clay_thickness(z2, step),
+        'rmse': np.sqrt(sse / len(seconds)),
+        'evaluations': candidates * (refinements + 1),
+    }
+
+
+# Asaoka's observational method: settlements s_i at equal time steps Δt over the later part of the
+# record follow s_i = β0 + β1 s_(i-1), giving the final settlement β0 / (1 - β1) and
+# c_v = -5/12 H² ln β1 / Δt
+def asaoka(days, settelment, z2, z3, points=20):
+    days = np.asarray(days, dtype=float)
+    times = np.linspace(days[0] + (days[-1] - days[0]) / 3, days[-1], points)
+    readings = np.interp(times, days, settelment)
+    beta_1, beta_0 = np.polyfit(readings[:-1], readings[1:], 1)
+    H = drainage_length(z2, z3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        final = beta_0 / (1 - beta_1)
+        c_v = -5/12 * H**2 * np.log(beta_1) / ((times[1] - times[0]) * seconds_per_day) if beta_1 > 0 else np.nan
+    return {'beta_0': beta_0, 'beta_1': beta_1, 'final_settelment': final, 'c_v': c_v}
+
+
+# (days, mm) columns of a settlement record in CSV text; rows that are not two numbers, such as a
+# header, are skipped. The readings are returned sorted by time.
+def read_record(text):
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        try:
+            rows.append((float(row[0]), float(row[1])))
+        except (IndexError, ValueError):
+            continue
+    if len(rows) < 3:
+        raise ValueError('A settlement record needs at least three rows of time (days) and settlement (mm)')
+    days, settelment = np.array(sorted(rows)).T
+    return days, settelment
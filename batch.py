@@ -0,0 +1,235 @@
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+from solver import solve_consolidation, scenario_profile, default_tolerance, drain_parameters
+from loading import load_history
+from nonlinear import compression_parameters, initial_effective_stress
+
+
+# Inputs of a scenario, in the order solve_consolidation takes them, with the defaults of the app
+default_scenario = {
+    'z1': 2, 'z2': 4, 'z3': 2, 'delta_sigma': 100,
+    'gamma_1': 18, 'gamma_r_1': 19, 'gamma_2': 19, 'gamma_r_2': 21, 'gamma_3': 18, 'gamma_r_3': 19,
+    'm_v': 5e-4, 'k': 1e-10, 'water_table': 0, 'tolerance': default_tolerance, 'method': 'analytic',
+}
+
+
+# Solver methods of a scenario, see solver.solve_clay
+methods = ('analytic', 'fdm', 'nonlinear')
+
+# Columns of a row of the layers of a scenario, in place of the Sand-1 / Clay / Sand-2 column
+layer_columns = ('thickness', 'gamma', 'gamma_r', 'compressible', 'm_v', 'k')
+max_layers = 100
+
+# Depth nodes of the profile of one scenario, which bound the (time × depth) arrays of its solution
+max_nodes = int(os.environ.get('CONSOLIDATION_MAX_NODES', 20001))
+
+
+# Scenarios of a CSV or JSON lines table, read one row at a time
+def read_scenarios(path):
+    with open(path, newline='') as file:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(file):
+                yield {key: value for key, value in row.items() if value not in (None, '')}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Solver inputs of a scenario row at the depth step, missing columns taking the defaults
+def scenario_inputs(row, step=0.05):
+    inputs = {}
+    for key, default in default_scenario.items():
+        value = row.get(key, default)
+        inputs[key] = value if isinstance(default, str) else float(value)
+    sublayers = row.get('sublayers', ())
+    if isinstance(sublayers, str):
+        sublayers = json.loads(sublayers)  # [[thickness, m_v, k], ...] in a CSV cell
+    inputs['sublayers'] = tuple(tuple(float(x) for x in sublayer) for sublayer in sublayers)
+    drains = row.get('drains')
+    if isinstance(drains, str):
+        drains = json.loads(drains)  # {"spacing": 1.5, "pattern": "square", ...} in a CSV cell
+    if drains:
+        # keywords of drain_parameters, or its arguments in order as the drains store of the app holds them
+        drains = drain_parameters(**drains) if isinstance(drains, dict) else drain_parameters(*drains)
+    inputs['drains'] = drains or None
+    loading = row.get('loading')
+    if isinstance(loading, str):
+        loading = json.loads(loading)  # [[day, kPa], ...] in a CSV cell, in place of delta_sigma
+    inputs['loading'] = load_history(loading) if loading else None
+    layers = row.get('layers')
+    if isinstance(layers, str):
+        layers = json.loads(layers)  # [[thickness, gamma, gamma_r, compressible, m_v, k], ...] in a CSV cell
+    if layers:
+        # objects with the names of layer_columns, or rows in their order
+        layers = [[layer[key] for key in layer_columns] if isinstance(layer, dict) else layer for layer in layers]
+        layers = tuple((*(float(x) for x in layer[:3]), bool(layer[3]), *(float(x) for x in layer[4:]))
+                       for layer in layers)
+    inputs['layers'] = layers or None
+    validate_inputs(inputs, step)
+    compression = row.get('compression')
+    if isinstance(compression, str):
+        compression = json.loads(compression)  # {"Cc": 0.5, "Cr": 0.05, "e0": 1.2, ...} in a CSV cell
+    if compression:
+        # keywords of compression_parameters, or its arguments in order as the compression store of the app
+        # holds them; the initial effective stress always follows from the unit weights of the scenario
+        if not isinstance(compression, dict):
+            compression = dict(zip(('Cc', 'Cr', 'e0', 'preconsolidation', 'ck'), compression))
+        stresses = initial_effective_stress(*(inputs[key] for key in ('z1', 'z2', 'z3', 'gamma_1', 'gamma_r_1', 'gamma_2',
+                                                                      'gamma_r_2', 'gamma_3', 'gamma_r_3', 'water_table')))
+        compression = compression_parameters(**dict(compression, sigma_top=stresses[0], sigma_bottom=stresses[1]))
+    elif inputs['method'] == 'nonlinear':
+        raise ValueError('The nonlinear method needs the compression column: Cc, Cr and e0')
+    inputs['compression'] = compression or None
+    return inputs
+
+
+# ValueError for the inputs of a scenario that have no physical solution, or whose profile at the depth
+# step has more than max_nodes nodes
+def validate_inputs(inputs, step=0.05):
+    for key in ('z1', 'z2', 'z3', 'delta_sigma', 'gamma_1', 'gamma_r_1', 'gamma_2', 'gamma_r_2', 'gamma_3', 'gamma_r_3',
+                'm_v', 'k', 'water_table', 'tolerance'):
+        if not np.isfinite(inputs[key]):
+            raise ValueError(f'{key} is not a finite number')
+    for key in ('z2', 'm_v', 'k', 'tolerance'):
+        if inputs[key] <= 0:
+            raise ValueError(f'{key} must be positive')
+    for key in ('z1', 'z3'):
+        if inputs[key] < 0:
+            raise ValueError(f'{key} must not be negative')
+    if inputs['layers']:
+        validate_layers(inputs)
+    elif not 0 <= inputs['water_table'] <= inputs['z1']:
+        raise ValueError('water_table must be between 0 and z1')
+    if inputs['method'] not in methods:
+        raise ValueError(f'Unknown method {inputs["method"]!r}, expected one of {", ".join(methods)}')
+    if depth_nodes(inputs, step) > max_nodes:
+        raise ValueError(f'The profile would have {depth_nodes(inputs, step)} depth nodes at a step of {step} m, '
+                         f'at most {max_nodes}')
+
+
+# ValueError for layers of a scenario without a clay or with a clay above the water table, which the
+# pore pressures of the clay solution take as saturated
+def validate_layers(inputs):
+    layers = inputs['layers']
+    if len(layers) > max_layers:
+        raise ValueError(f'At most {max_layers} layers, got {len(layers)}')
+    for index, layer in enumerate(layers):
+        if len(layer) != len(layer_columns) or not np.all(np.isfinite(layer)):
+            raise ValueError(f'layers[{index}] is not a row of finite {", ".join(layer_columns)}')
+        thickness, _, _, compressible, m_v, k = layer
+        if thickness < 0:
+            raise ValueError(f'layers[{index}]: the thickness must not be negative')
+        if compressible and (m_v <= 0 or k <= 0):
+            raise ValueError(f'layers[{index}]: m_v and k of a compressible layer must be positive')
+    clays = [i for i, layer in enumerate(layers) if layer[3] and layer[0] > 0]
+    if not clays:
+        raise ValueError('The layers have no compressible layer')
+    if inputs['sublayers'] or inputs['method'] == 'nonlinear':
+        raise ValueError('Sublayers and the nonlinear method need the Sand-1 / Clay / Sand-2 column')
+    if not 0 <= inputs['water_table'] <= sum(layer[0] for layer in layers[:clays[0]]):
+        raise ValueError('water_table must be between 0 and the top of the first compressible layer')
+
+
+# Depth nodes of the profile of a scenario at the depth step, each layer from its top to its bottom node
+def depth_nodes(inputs, step=0.05):
+    if inputs.get('layers'):
+        return sum(int(layer[0] / step) + 1 for layer in inputs['layers'])
+    return int((inputs['z1'] + inputs['z2'] + inputs['z3']) / step) + 3
+
+
+# Soil profile of the inputs of a scenario, see solver.scenario_profile
+def inputs_profile(inputs):
+    return scenario_profile(*(inputs[key] for key in ('z1', 'z2', 'z3', 'gamma_1', 'gamma_r_1', 'gamma_2', 'gamma_r_2',
+                                                      'gamma_3', 'gamma_r_3', 'm_v', 'k')), inputs['layers'])
+
+
+# Final settlement and degree of consolidation at the requested slider positions of one scenario
+def run_scenario(index, row, times, profiles=False):
+    result = {'id': row.get('id', index)}
+    try:
+        inputs = scenario_inputs(row)
+        # all requested times and the final state in one batched evaluation
+        solution = solve_consolidation(np.append(times, 100), **inputs)
+        settelment = solution['accummultive_settelment'][:, -1]
+        result['final_settelment'] = float(settelment[-1])
+        result['U'] = dict(zip(map(str, times), np.asarray(solution['U'][:-1], dtype=float).tolist()))
+        result['settelment'] = dict(zip(map(str, times), settelment[:-1].tolist()))
+        if profiles:
+            result['profiles'] = {
+                'depths': solution['depths'].tolist(),
+                'total_stress': solution['total_stress'][-1].tolist(),  # under the final load
+                'pore_pressure': dict(zip(map(str, times), solution['pore_pressure'][:-1].tolist())),
+                'effective_stress': dict(zip(map(str, times), solution['effective_stress'][:-1].tolist())),
+            }
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    return result
+
+
+# Flat CSV row of a scenario result
+def csv_row(result):
+    row = {'id': result['id'], 'final_settelment': result.get('final_settelment'), 'error': result.get('error')}
+    for key in ('U', 'settelment'):
+        for t, value in result.get(key, {}).items():
+            row[f'{key}_{t}'] = value
+    return row
+
+
+# Run the scenarios on a process pool and write each result as soon as it is finished. Only a bounded
+# number of scenarios is in flight, so memory stays flat for any size of the scenario table.
+def run_batch(scenarios, output, times=(10, 50, 90), profiles=False, workers=None):
+    workers = workers or os.cpu_count()
+    times = np.asarray(times, dtype=float)
+    as_csv = output.endswith('.csv')
+    fieldnames = ['id', 'final_settelment', 'error'] + [f'{key}_{t}' for key in ('U', 'settelment') for t in times]
+
+    count = 0
+    with open(output, 'w', newline='') as file, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(file, fieldnames=fieldnames) if as_csv else None
+        if writer:
+            writer.writeheader()
+
+        def write(done):
+            for future in done:
+                result = future.result()
+                if writer:
+                    writer.writerow(csv_row(result))
+                else:
+                    file.write(json.dumps(result) + '\n')
+            file.flush()
+
+        pending = set()
+        for index, row in enumerate(scenarios):
+            if len(pending) >= 4 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(done)
+            pending.add(pool.submit(run_scenario, index, row, times, profiles))
+            count += 1
+        write(pending)
+    return count
+
+
+# Command line of the batch runner, `python batch.py scenarios.csv`, which imports the solver only
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='batch.py',
+                                     description='Run a table of consolidation scenarios without the web app.')
+    parser.add_argument('scenarios', help='scenario table (.csv or .jsonl), one scenario per row')
+    parser.add_argument('-o', '--output', default='results.jsonl', help='result file (.jsonl or .csv)')
+    parser.add_argument('-t', '--times', type=float, nargs='+', default=[10, 50, 90],
+                        help='time slider positions (percent of t_99) to report')
+    parser.add_argument('-p', '--profiles', action='store_true', help='include the depth profiles (.jsonl only)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of processes (default: all cores)')
+    args = parser.parse_args(argv)
+
+    count = run_batch(read_scenarios(args.scenarios), args.output, args.times, args.profiles, args.workers)
+    print(f'{count} scenarios written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from solver import (gamma_water, slider_times, time_factor, drainage_length, mode_numbers, fourier_series,
+                    excess_pore_pressure, solve_time_sweep, solve_clay_sweep, solve_clay_batch, sweep_frame,
+                    default_tolerance)
+from finite_difference import consolidate, element_properties
+from nonlinear import compression_parameters, consolidate_nonlinear, initial_effective_stress
+from monte_carlo import uncertainty_bands
+from figures import pressure_sweep_store, settelment_sweep_store, pressure_changes, settelment_changes
+
+
+# Benchmark matrix: clay thicknesses over the slider range, grid steps, Fourier modes and slider positions
+thicknesses = (1, 5, 10, 20)
+steps = (0.05, 0.01)
+mode_counts = (10, 100, 1000)
+positions = (1, 10, 50, 90)
+sample_counts = (1000, 10000)  # Monte Carlo realizations, whose time should grow linearly
+stage_counts = (10, 300)  # load stages of a load history, each a 2-day ramp and a 2-day hold
+batch_sizes = (100, 1000)  # scenarios of one /api/solve request
+preconsolidation_pressures = (0, 80)  # kPa, of the nonlinear clay: normally and lightly overconsolidated
+
+# Scenario around the matrix values, the defaults of the app
+scenario = {'z1': 2, 'z3': 2, 'delta_sigma': 100, 'gamma_1': 18, 'gamma_r_1': 19, 'gamma_2': 19, 'gamma_r_2': 21,
+            'gamma_3': 18, 'gamma_r_3': 19, 'm_v': 5e-4, 'k': 1e-10, 'water_table': 0}
+
+default_threshold = 0.25  # slowdown against the baseline that counts as a regression
+min_time = 0.2  # seconds of repeated calls per benchmark
+min_repeats = 3
+
+
+# Stresses and settlement of one slider position as the app computed them before the solver module:
+# a loop over the nodes, summing 100 Fourier modes at each clay node. Kept as the reference.
+def loop_profiles(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k,
+                  water_table, step=0.05):
+    z1_depth = np.linspace(0, z1, num=int(z1/step)+1)
+    z2_depth = np.linspace(z1, z1+z2, num=int(z2/step)+1)
+    z3_depth = np.linspace(z1+z2, z1+z2+z3, num=int(z3/step)+1)
+    total_stress_z1, pore_pressure_z1 = np.zeros_like(z1_depth), np.zeros_like(z1_depth)
+    total_stress_z2, pore_pressure_z2 = np.zeros_like(z2_depth), np.zeros_like(z2_depth)
+    total_stress_z3, pore_pressure_z3 = np.zeros_like(z3_depth), np.zeros_like(z3_depth)
+    settelment_z2 = np.zeros_like(z2_depth)
+
+    for i, depth in enumerate(z1_depth):
+        if depth <= water_table:
+            total_stress_z1[i] = depth * gamma_1 + delta_sigma
+        else:
+            total_stress_z1[i] = total_stress_z1[int(water_table/step)] + (depth - water_table) * gamma_r_1
+            pore_pressure_z1[i] = (depth-water_table) * gamma_water
+
+    for i, depth in enumerate(z2_depth):
+        total_stress_z2[i] = total_stress_z1[int(z1/step)] + (depth - z1) * gamma_r_2
+        H = drainage_length(z2, z3)
+        c_v, t_99, T_v = time_factor(t, H, m_v, k)
+        if t == 0:
+            excess = delta_sigma
+        elif t == 100:
+            excess = 0
+        else:
+            M = mode_numbers(100)
+            excess = np.sum((2 * delta_sigma / M) * np.sin(M * (depth - z1) / H) * np.exp(-M**2 * T_v))
+        pore_pressure_z2[i] = (depth - water_table) * gamma_water + excess
+        settelment_z2[i] = 1000*(delta_sigma-excess) * m_v * step
+
+    for i, depth in enumerate(z3_depth):
+        total_stress_z3[i] = total_stress_z2[int(z2/step)] + (depth-z1-z2) * gamma_r_3
+        pore_pressure_z3[i] = (depth-water_table) * gamma_water
+
+    return (np.concatenate((total_stress_z1, total_stress_z2, total_stress_z3)),
+            np.concatenate((pore_pressure_z1, pore_pressure_z2, pore_pressure_z3)), settelment_z2)
+
+
+# Inputs of solve_consolidation for the clay thickness z2, in its argument order
+def sweep_args(z2):
+    s = scenario
+    return (s['z1'], z2, s['z3'], s['delta_sigma'], s['gamma_1'], s['gamma_r_1'], s['gamma_2'], s['gamma_r_2'],
+            s['gamma_3'], s['gamma_r_3'], s['m_v'], s['k'], s['water_table'])
+
+
+def clay_args(z2):
+    s = scenario
+    return (s['z1'], z2, s['z3'], s['delta_sigma'], s['m_v'], s['k'])
+
+
+# Benchmarks as (name, function) pairs. Every function runs once per call and takes no arguments;
+# the setup (inputs, precomputed solutions) happens here, outside of the measurement.
+def benchmarks():
+    s = scenario
+    for z2, step, t in itertools.product(thicknesses, steps, positions):
+        yield f'loop_profiles[z2={z2},step={step},t={t}]', lambda z2=z2, step=step, t=t: loop_profiles(
+            t, *sweep_args(z2), step=step)
+
+    for z2, step, modes in itertools.product(thicknesses, steps, mode_counts):
+        H = drainage_length(z2, s['z3'])
+        T_v = time_factor(slider_times[1:-1], H, s['m_v'], s['k'])[2]
+        Z = np.linspace(0, z2, num=int(z2/step)+1) / H
+        N = np.full(len(T_v), modes)
+        yield f'fourier_series[z2={z2},step={step},modes={modes}]', lambda Z=Z, T_v=T_v, N=N: fourier_series(Z, T_v, N)
+
+    for z2, step, t in itertools.product(thicknesses, steps, positions):
+        H = drainage_length(z2, s['z3'])
+        T_v = time_factor(t, H, s['m_v'], s['k'])[2]
+        depths = np.linspace(s['z1'], s['z1'] + z2, num=int(z2/step)+1)
+        yield f'excess_pore_pressure[z2={z2},step={step},t={t}]', (
+            lambda depths=depths, H=H, T_v=T_v, t=t: excess_pore_pressure(depths, s['z1'], H, s['delta_sigma'], T_v, t))
+
+    for z2, step in itertools.product(thicknesses, steps):
+        yield f'solve_time_sweep[z2={z2},step={step}]', lambda z2=z2, step=step: solve_time_sweep(*sweep_args(z2), step=step)
+
+    for z2, step in itertools.product(thicknesses, steps):
+        depths = np.linspace(s['z1'], s['z1'] + z2, num=int(z2/step)+1)
+        m_v_e, k_e = element_properties(depths, s['m_v'], s['k'])
+        t_99 = time_factor(0, drainage_length(z2, s['z3']), s['m_v'], s['k'])[1]
+        seconds = slider_times / 100 * t_99
+        yield f'consolidate[z2={z2},step={step}]', (
+            lambda depths=depths, m_v_e=m_v_e, k_e=k_e, seconds=seconds: consolidate(depths, m_v_e, k_e, s['delta_sigma'], seconds))
+
+    for z2, step in itertools.product(thicknesses, steps):
+        sweep = solve_time_sweep(*sweep_args(z2), step=step)
+        clay = solve_clay_sweep(*clay_args(z2), step=step)
+        yield f'pressure_sweep_store[z2={z2},step={step}]', lambda sweep=sweep: pressure_sweep_store(sweep)
+        yield f'settelment_sweep_store[z2={z2},step={step}]', lambda clay=clay: settelment_sweep_store(clay)
+        yield f'pressure_changes[z2={z2},step={step}]', lambda sweep=sweep, z2=z2: pressure_changes(
+            sweep_frame(sweep, 50), s['z1'], z2, s['z3'], s['water_table'])
+        yield f'settelment_changes[z2={z2},step={step}]', lambda clay=clay, z2=z2: settelment_changes(
+            sweep_frame(clay, 50), s['z1'], z2, s['z3'])
+
+    for z2, samples in itertools.product(thicknesses, sample_counts):
+        yield f'uncertainty_bands[z2={z2},samples={samples}]', lambda z2=z2, samples=samples: uncertainty_bands(
+            50, s['z1'], z2, s['z3'], s['delta_sigma'], s['m_v'], s['k'], samples)
+
+    for stages, method in itertools.product(stage_counts, ('analytic', 'fdm')):
+        history = ((0, 0),) + tuple(point for i in range(stages) for point in ((4 * i + 2, 100 * (i + 1) / stages),
+                                                                   (4 * i + 4, 100 * (i + 1) / stages)))
+        yield f'solve_clay_sweep[stages={stages},method={method}]', (
+            lambda history=history, method=method: solve_clay_sweep(*clay_args(4), method=method, loading=history))
+
+    for z2, step, preconsolidation in itertools.product(thicknesses, steps, preconsolidation_pressures):
+        depths = np.linspace(s['z1'], s['z1'] + z2, num=int(z2/step)+1)
+        compression = compression_parameters(0.5, 0.05, 1.2, preconsolidation, None, *initial_effective_stress(
+            s['z1'], z2, s['z3'], s['gamma_1'], s['gamma_r_1'], s['gamma_2'], s['gamma_r_2'], s['gamma_3'],
+            s['gamma_r_3'], s['water_table']))
+        yield f'consolidate_nonlinear[z2={z2},step={step},preconsolidation={preconsolidation}]', (
+            lambda depths=depths, compression=compression: consolidate_nonlinear(depths, s['k'], s['delta_sigma'], compression))
+
+    for scenarios in batch_sizes:
+        rng = np.random.default_rng(0)
+        columns = (s['z1'], rng.choice(thicknesses, scenarios), s['z3'], rng.uniform(50, 200, scenarios),
+                   rng.uniform(1e-4, 1e-3, scenarios), rng.uniform(1e-10, 1e-9, scenarios))
+        yield f'solve_clay_batch[scenarios={scenarios}]', lambda columns=columns: solve_clay_batch(slider_times, *columns)
+
+    yield from callback_benchmarks()
+
+
+# End-to-end callbacks of the app with empty caches, as for a new scenario
+def callback_benchmarks():
+    import cosolidation
+    from cache import caches
+
+    def cold(function, *args):
+        def run():
+            shared = [cache.shared for cache in caches]
+            for cache in caches:
+                cache.clear()
+                cache.shared = None
+            try:
+                return function(*args)
+            finally:
+                for cache, directory in zip(caches, shared):
+                    cache.shared = directory
+        return run
+
+    s = scenario
+    for z2, t in itertools.product(thicknesses, positions):
+        z1, _, z3, delta_sigma, *unit_weights, m_v, k, water_table = sweep_args(z2)
+        yield f'update_pressure[z2={z2},t={t}]', cold(
+            cosolidation.update_pressure, 1, t, z1, z2, z3, delta_sigma, *unit_weights, m_v, k, water_table,
+            default_tolerance, 'analytic', [])
+        yield f'update_settelment[z2={z2},t={t}]', cold(
+            cosolidation.update_settelment, 1, t, z1, z2, z3, delta_sigma, m_v, k, default_tolerance, 'analytic', [])
+    for z2 in thicknesses:
+        yield f'update_settelment_time[z2={z2}]', cold(
+            cosolidation.update_settelment_time, 1, s['z1'], z2, s['z3'], s['delta_sigma'], s['m_v'], s['k'],
+            default_tolerance, 'analytic', [])
+
+
+# Median time per call, calls per second and peak traced memory of a benchmark
+def measure(function):
+    function()  # warm-up
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_repeats or time.perf_counter() - start < min_time:
+        before = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - before)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = statistics.median(times)
+    return {'seconds': seconds, 'throughput': 1 / seconds, 'peak_memory': peak, 'repeats': len(times)}
+
+
+def run(pattern=None):
+    results = {}
+    for name, function in benchmarks():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(function)
+        result = results[name]
+        print(f"{name:60s} {result['seconds'] * 1e3:10.3f} ms {result['throughput']:10.1f}/s "
+              f"{result['peak_memory'] / 2**20:8.2f} MiB", flush=True)
+    return {'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                            'machine': platform.machine(), 'processor': platform.processor()},
+            'results': results}
+
+
+# Benchmarks that are slower than in the baseline by more than the threshold, as (name, ratio) pairs
+def regressions(report, baseline, threshold=default_threshold):
+    slower = []
+    for name, result in report['results'].items():
+        if name in baseline['results']:
+            ratio = result['seconds'] / baseline['results'][name]['seconds']
+            if ratio > 1 + threshold:
+                slower.append((name, ratio))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the solver kernels, the figure building and the callbacks.')
+    parser.add_argument('-k', '--filter', default=None, help='only run the benchmarks whose name contains this text')
+    parser.add_argument('-o', '--output', default=None, help='write the results as a JSON baseline')
+    parser.add_argument('-c', '--compare', default=None, help='baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=default_threshold,
+                        help='relative slowdown that fails the check (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    report = run(args.filter)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            slower = regressions(report, json.load(file), args.threshold)
+        for name, ratio in slower:
+            print(f'regression: {name} is {ratio:.2f}x slower than the baseline')
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Size bound of the result caches, set with the CONSOLIDATION_CACHE_SIZE environment variable, and the
+# bound of the bytes of their arrays, as the entries of a fine depth grid take several MB each
+default_maxsize = int(os.environ.get('CONSOLIDATION_CACHE_SIZE', 64))
+default_maxbytes = int(os.environ.get('CONSOLIDATION_CACHE_BYTES', 64 * 2**20))
+
+# Directory of the cache shared by all worker processes, off unless CONSOLIDATION_CACHE_DIR is set
+shared_directory = os.environ.get('CONSOLIDATION_CACHE_DIR')
+shared_maxsize = int(os.environ.get('CONSOLIDATION_SHARED_CACHE_SIZE', 1024))
+shared_maxbytes = int(os.environ.get('CONSOLIDATION_SHARED_CACHE_BYTES', 2**30))  # of each cache directory
+
+# All caches created in this process, to report their counters
+caches = []
+
+
+# Hashable cache key of the callback inputs, so that 2, 2.0 and 2.0000000000001 hit the same entry
+def normalize_key(*values, digits=12):
+    key = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(f'{value:.{digits}g}')
+        elif isinstance(value, (list, tuple)):
+            value = normalize_key(*value, digits=digits)
+        key.append(value)
+    return tuple(key)
+
+
+# Bytes of the arrays, strings and bytes held by a cached value, through its dicts, lists and tuples
+def value_nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(value_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(item) for item in value)
+    return 0
+
+
+# Least-recently-used cache on the local disk, shared by the processes of one machine. Entries are
+# pickled into one file each and written atomically; reading an entry touches its file, and the
+# files that were used longest ago are removed beyond maxsize entries or maxbytes bytes of files.
+class DiskCache:
+    def __init__(self, directory, maxsize=None, maxbytes=None):
+        self.directory = directory
+        self.maxsize = shared_maxsize if maxsize is None else maxsize
+        self.maxbytes = shared_maxbytes if maxbytes is None else maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest() + '.pkl')
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                stored_key, value = pickle.load(file)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        if stored_key != key:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump((key, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.pkl'):
+                    entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except OSError:
+                pass  # removed by another worker
+        count, nbytes = len(entries), sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if count <= self.maxsize and nbytes <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass  # removed by another worker
+            count -= 1
+            nbytes -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+
+# Bounded least-recently-used cache with hit/miss/eviction counters. The entries are also bounded by
+# maxbytes, the total value_nbytes of their values (None for no bound). With a shared directory, misses
+# are looked up in (and results written to) a DiskCache in a subdirectory named after the cache, so
+# a result computed by one worker process is reused by the others.
+class LRUCache:
+    def __init__(self, name, maxsize=None, shared=shared_directory, maxbytes=default_maxbytes):
+        self.name = name
+        self.maxsize = default_maxsize if maxsize is None else maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.shared = DiskCache(os.path.join(shared, name)) if shared else None
+        caches.append(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        size = value_nbytes(value)
+        with self._lock:
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            while len(self._entries) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes
+                                                        and len(self._entries) > 1):
+                evicted, _ = self._entries.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    # Cached value of key, taken from the shared cache or computed and stored on a miss
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        if self.shared:
+            value = self.shared.get(key, missing)
+        if value is missing:
+            value = compute()
+            if self.shared:
+                self.shared.put(key, value)
+        self.put(key, value)
+        return value
+
+    # (key, value) pairs from the least to the most recently used
+    def entries(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        stats = {'name': self.name, 'size': len(self._entries), 'maxsize': self.maxsize, 'nbytes': self.nbytes,
+                 'maxbytes': self.maxbytes,
+                 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+        if self.shared:
+            stats.update(shared_hits=self.shared.hits, shared_misses=self.shared.misses,
+                         shared_evictions=self.shared.evictions)
+        return stats
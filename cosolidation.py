@@ -1,14 +1,77 @@
+import time
+started = time.perf_counter()  # startup time is measured from here, see metrics.startup_seconds
+
+import base64
+import importlib
+import json
 import os
+import sys
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output, State
+from dash import dcc, html, dash_table
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from urllib.parse import urlencode
 import numpy as np
-import plotly.graph_objs as go
-import time
+from solver import (solve_clay_sweep, soil_profiles, sweep_frame, settelment_time_curve, default_tolerance,
+                    curve_times, seconds_per_day, drain_parameters, drain_patterns, scale_clay, scale_curve)
+from figures import (soil_layers_template, pressure_template, settelment_template, settelment_time_template,
+                     drain_design_template, drain_design_changes,
+                     soil_layers_changes, pressure_changes, settelment_changes, settelment_time_changes,
+                     back_analysis_changes, pressure_band_changes, settelment_band_changes, settelment_time_band_changes,
+                     hidden_band_changes, pressure_band, settelment_band, settelment_time_band,
+                     pressure_sweep_store, settelment_sweep_store, patch_figure, apply_patch)
+from stratigraphy import three_layer_profile
+from cache import LRUCache, normalize_key, caches
+from metrics import stage, timed
+# the solve API, the exports, the batch runner, the back-analysis and the nonlinear method are imported
+# by the routes and callbacks that use them, see lazy_route
+import drains
+import jobs
+import loading
+import metrics
+import monte_carlo
+import snapshot
+
+metrics.startup_seconds['imports'] = time.perf_counter() - started
 
 
 app = dash.Dash(__name__, meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}])
 
+# Expose the server for gunicorn: `gunicorn cosolidation:server`, configured in gunicorn.conf.py
+server = app.server
+metrics.register(server)  # /metrics, with the callback stages if CONSOLIDATION_METRICS is set
+
+
+# Flask route to the view function of a module, which is imported by the first request of the route
+def lazy_route(rule, module, view, **options):
+    def dispatch(**kwargs):
+        return getattr(importlib.import_module(module), view)(**kwargs)
+    server.add_url_rule(rule, f'{module}.{view}', dispatch, **options)
+
+
+lazy_route('/export/<kind>.<file_format>', 'export', 'export')  # /export/profiles.csv, .npz or .parquet, ...
+lazy_route('/api/solve', 'api', 'solve', methods=['POST'])
+
+# Results of repeated scenarios for each graph, bounded by CONSOLIDATION_CACHE_SIZE entries each and
+# shared between the worker processes through CONSOLIDATION_CACHE_DIR if set
+soil_layers_cache = LRUCache('soil_layers')
+clay_cache = LRUCache('clay')
+unit_clay_cache = LRUCache('unit_clay')  # clay solutions under a unit load, see unit_load_inputs
+settelment_time_cache = LRUCache('settelment_time')
+unit_curve_cache = LRUCache('unit_settelment_time')
+pressure_cache = LRUCache('pressure')
+drain_design_cache = LRUCache('drain_design')
+uncertainty_cache = LRUCache('uncertainty')
+
+# Figure templates, built once or taken from the startup snapshot
+startup_snapshot = snapshot.load()
+if startup_snapshot:
+    templates = startup_snapshot['templates']
+else:
+    templates = {'soil_layers': soil_layers_template(), 'pressure': pressure_template(),
+                 'settelment': settelment_template(), 'settelment_time': settelment_time_template(),
+                 'drain_design': drain_design_template()}
+metrics.startup_seconds['templates'] = time.perf_counter() - started
+
 app.title = 'Consolidation'
 app._favicon = ('assets/favicon.ico')
 
@@ -86,7 +149,8 @@ app.layout = html.Div([
                 dcc.Slider(
                     id='time-slider', min=0, max=100, step=1, value=0,
                     marks={0: '0', 100: '∞'},
-                    tooltip=None,  updatemode='drag'
+                    # the value follows on release; the frames follow drag_value in the browser
+                    tooltip=None,  updatemode='mouseup'
                 ),
 
             ]),
@@ -101,6 +165,56 @@ app.layout = html.Div([
                                 html.Span('Chnage of stress', className='tooltiptext')
                             ]),'(kPa)'], className='input-label'),
                 dcc.Input(id='delta_sigma', type='number', value=100, step=1, className='input-field'),
+                html.Label(["Load history",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Load (kPa) at times (days) from the start of construction, linear between the points; two points on one day make a load step. Replaces Δσ when filled, the time slider then covering the loading and t99 after it.', className='tooltiptext')
+                            ])], className='input-label'),
+                dash_table.DataTable(
+                    id='load-history',
+                    columns=[{'name': 'Time (days)', 'id': 'day', 'type': 'numeric'},
+                             {'name': 'Load (kPa)', 'id': 'load', 'type': 'numeric'}],
+                    data=[], editable=True, row_deletable=True, page_size=10,
+                    style_cell={'fontSize': '0.8vw', 'textAlign': 'center'}
+                ),
+                html.Button("Add Load Point", id='add-load-point-button', n_clicks=0, style={'width': '100%', 'marginTop': '1vh'}),
+                dcc.Upload(id='load-history-file', children=html.Button("Upload Load CSV", style={'width': '100%', 'marginTop': '1vh'}),
+                           accept='.csv,.txt'),
+                html.Div(id='load-history-result', style={'fontSize': '0.8vw', 'whiteSpace': 'pre-line', 'marginTop': '1vh'}),
+
+                # Solver Properties
+                html.H3('Solver:', style={'textAlign': 'left'}, className='h3'),
+                    html.Label(["Tolerance",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Error tolerance of the excess pore pressure, relative to Δσ', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='tolerance', type='number', value=default_tolerance, min=1e-12, max=1e-1, className='input-field'),
+                html.Label(["Method",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Terzaghi series for a homogeneous clay, finite differences for a clay with sublayers, or the nonlinear Cc/Cr compression of a homogeneous clay under the instant load Δσ', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.RadioItems(
+                    id='solver-method', value='analytic',
+                    options=[{'label': ' Terzaghi series', 'value': 'analytic'},
+                             {'label': ' Finite differences', 'value': 'fdm'},
+                             {'label': ' Nonlinear (Cc, Cr)', 'value': 'nonlinear'}],
+                    className='input-field'
+                ),
+                html.Label(["Background job",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Solve the graphs of an update in a separate process, with progress and cancellation, for large sweeps, fine grids and long load histories. Needs diskcache on the server.', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Checklist(id='background-enabled', value=[],
+                              options=[{'label': ' Run updates as background jobs', 'value': 'on',
+                                        'disabled': jobs.manager is None}],
+                              className='input-field'),
+                html.Progress(id='job-progress', value='0', max='1', style={'width': '100%'}),
+                html.Div(id='job-status', style={'fontSize': '0.8vw', 'whiteSpace': 'pre-line'}),
+                html.Button("Cancel Job", id='cancel-job-button', n_clicks=0, disabled=True, style={'width': '100%', 'marginTop': '1vh'}),
+                dcc.Store(id='job-request'),
 
 
                 # Sand-1 Properties
@@ -161,6 +275,113 @@ app.layout = html.Div([
                                 html.Span('Coefficient of permeability of Clay', className='tooltiptext')
                             ])], className='input-label'),
                 dcc.Input(id='k', type='number', value=1e-10, step=1e-10, className='input-field'),                 
+                html.Label(["Sublayers",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Sublayers from the top of the Clay, used by the finite differences method. The rest of the Clay takes mv and k above.', className='tooltiptext')
+                            ])], className='input-label'),
+                dash_table.DataTable(
+                    id='clay-sublayers',
+                    columns=[{'name': 'Thickness (m)', 'id': 'thickness', 'type': 'numeric'},
+                             {'name': 'mv (m²/kN)', 'id': 'm_v', 'type': 'numeric'},
+                             {'name': 'k (m/s)', 'id': 'k', 'type': 'numeric'}],
+                    data=[], editable=True, row_deletable=True,
+                    style_cell={'fontSize': '0.8vw', 'textAlign': 'center'}
+                ),
+                html.Button("Add Sublayer", id='add-sublayer-button', n_clicks=0, style={'width': '100%', 'marginTop': '1vh'}),
+                html.Label(["C", html.Sub("c"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Compression index of Clay, the slope of the virgin compression line e–log σ′, used by the nonlinear method', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='compression-index', type='number', value=0.5, min=0, step=0.01, className='input-field'),
+                html.Label(["C", html.Sub("r"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Recompression index of Clay, the slope of e–log σ′ below the preconsolidation pressure', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='recompression-index', type='number', value=0.05, min=0, step=0.005, className='input-field'),
+                html.Label(["e", html.Sub("0"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Initial void ratio of Clay', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='void-ratio', type='number', value=1.2, min=0, step=0.05, className='input-field'),
+                html.Label(["σ′", html.Sub("p"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Preconsolidation pressure of Clay. Where it is below the initial effective stress, 0 for example, the Clay is normally consolidated.', className='tooltiptext')
+                            ]), ' (kPa)'], className='input-label'),
+                dcc.Input(id='preconsolidation', type='number', value=0, min=0, step=1, className='input-field'),
+                html.Label(["C", html.Sub("k"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Permeability change index Δe/Δlog k of Clay, k falling as the void ratio does. Empty for a constant k.', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='permeability-index', type='number', value=None, min=0, step=0.05, className='input-field'),
+                dcc.Store(id='compression'),
+
+
+                # Prefabricated vertical drains in the Clay and the design sweep of their spacing
+                html.H3('Vertical drains:', style={'textAlign': 'left'}, className='h3'),
+                dcc.Checklist(id='drains-enabled', value=[],
+                              options=[{'label': ' Radial consolidation to vertical drains', 'value': 'on'}],
+                              className='input-field'),
+                dcc.RadioItems(
+                    id='drain-pattern', value='triangular',
+                    options=[{'label': f' {pattern.capitalize()}', 'value': pattern} for pattern in drain_patterns],
+                    className='input-field'
+                ),
+                dcc.RadioItems(
+                    id='drain-theory', value='hansbo',
+                    options=[{'label': ' Hansbo (smear)', 'value': 'hansbo'},
+                             {'label': ' Barron (ideal drain)', 'value': 'barron'}],
+                    className='input-field'
+                ),
+                html.Label(["Spacing s (m)",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Distance between neighbouring drains. A point of the design graph picks its spacing and pattern.', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='drain-spacing', type='number', value=1.5, min=0, step=0.05, className='input-field'),
+                html.Label(["d", html.Sub("w"), " (m)",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Equivalent diameter of the drain, (a + b)/2 of a band drain', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='drain-diameter', type='number', value=0.05, min=0, step=0.005, className='input-field'),
+                html.Label(["d", html.Sub("s"), "/d", html.Sub("w"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Diameter of the smear zone around the drain, relative to the drain (Hansbo)', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='smear-ratio', type='number', value=2, min=1, step=0.5, className='input-field'),
+                html.Label(["k", html.Sub("h"), "/k", html.Sub("s"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Horizontal permeability of the Clay, relative to the smear zone (Hansbo)', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='permeability-ratio', type='number', value=2, min=1, step=0.5, className='input-field'),
+                html.Label(["c", html.Sub("h"), "/c", html.Sub("v"),
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Horizontal coefficient of consolidation, relative to cv of the Clay', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='ch-ratio', type='number', value=2, min=0, step=0.5, className='input-field'),
+                html.Label(["Target U (%)",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Degree of consolidation the design sweep aims at', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='target-U', type='number', value=90, min=0, step=1, max=99.9, className='input-field'),
+                html.Label(["Target time (days)",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Time the design sweep aims at, for example the time before the pavement is built', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='target-days', type='number', value=180, min=0, step=1, className='input-field'),
+                html.Div(id='drain-design-result', style={'fontSize': '0.8vw', 'whiteSpace': 'pre-line', 'marginTop': '1vh'}),
+                dcc.Store(id='drains'),
 
 
                 # Sand-2 Properties
@@ -185,24 +406,93 @@ app.layout = html.Div([
                                 ])], className='input-label', style={'marginRight': '5px'}),
                     html.Div(id='gamma_prime_3', className='input-field')  
                 ]),
+
+
+                # Back-analysis of a settlement record
+                html.H3('Back-analysis:', style={'textAlign': 'left'}, className='h3'),
+                html.Label(["Settlement record",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('CSV file of time (days) and settlement (mm) readings, fitted with cv and mv of the Clay above', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Upload(id='settelment-record', children=html.Button("Upload CSV", style={'width': '100%'}),
+                           accept='.csv,.txt'),
+                html.Div(id='back-analysis-result', style={'fontSize': '0.8vw', 'whiteSpace': 'pre-line', 'marginTop': '1vh'}),
+                html.Button("Use Fitted mv and k", id='use-fit-button', n_clicks=0, style={'width': '100%', 'marginTop': '1vh'}),
+                dcc.Store(id='back-analysis'),
+
+                # Monte Carlo realizations of the uncertain clay inputs
+                html.H3('Uncertainty:', style={'textAlign': 'left'}, className='h3'),
+                dcc.Checklist(id='uncertainty-enabled', value=[],
+                              options=[{'label': ' P5–P95 bands of Monte Carlo realizations', 'value': 'on'}],
+                              className='input-field'),
+                html.Label(["Samples",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Realizations of the homogeneous Clay without drains, at most 100000', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Input(id='samples', type='number', value=monte_carlo.default_samples, min=1,
+                          max=monte_carlo.max_samples, step=1, className='input-field'),
+                html.Label(["k",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Distribution and coefficient of variation of k, around its value above', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Dropdown(id='k-distribution', value='lognormal', options=list(monte_carlo.distributions), clearable=False),
+                dcc.Input(id='k-cov', type='number', value=1.0, min=0, step=0.05, className='input-field'),
+                html.Label(["mv",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Distribution and coefficient of variation of mv, around its value above', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Dropdown(id='m_v-distribution', value='lognormal', options=list(monte_carlo.distributions), clearable=False),
+                dcc.Input(id='m_v-cov', type='number', value=0.2, min=0, step=0.05, className='input-field'),
+                html.Label(["Δσ",
+                            html.Div(className='tooltip', children=[
+                                html.Img(src='/assets/info-icon.png', className='info-icon', alt='Info'),
+                                html.Span('Distribution and coefficient of variation of Δσ, around its value above', className='tooltiptext')
+                            ])], className='input-label'),
+                dcc.Dropdown(id='delta_sigma-distribution', value='normal', options=list(monte_carlo.distributions), clearable=False),
+                dcc.Input(id='delta_sigma-cov', type='number', value=0.1, min=0, step=0.05, className='input-field'),
+                html.Div(id='uncertainty-result', style={'fontSize': '0.8vw', 'whiteSpace': 'pre-line', 'marginTop': '1vh'}),
+
+                # Downloads of the numbers behind the graphs, streamed by the server
+                html.H3('Export:', style={'textAlign': 'left'}, className='h3'),
+                html.Div(id='export-links', style={'fontSize': '0.8vw', 'marginTop': '1vh'}),
                
             ]),
         ]),
 
         # Graphs container
-        html.Div(className='graph-container', id='graphs-container', style={'display': 'flex', 'flexDirection': 'row', 'width': '75%'},
+        html.Div(className='graph-container', id='graphs-container', style={'display': 'flex', 'flexDirection': 'column', 'width': '75%'},
         children=[
-            html.Div(style={'width': '20%', 'height': '100%'}, children=[
-                dcc.Graph(id='soil-layers-graph', style={'height': '100%', 'width': '100%'})
-            ]),
-            html.Div(style={'width': '40%', 'height': '100%'}, children=[
-                dcc.Graph(id='pressure-graph', style={'height': '100%', 'width': '100%'})
+            html.Div(style={'display': 'flex', 'flexDirection': 'row', 'width': '100%', 'height': '65%'}, children=[
+                html.Div(style={'width': '20%', 'height': '100%'}, children=[
+                    dcc.Graph(id='soil-layers-graph', figure=templates['soil_layers'], style={'height': '100%', 'width': '100%'})
+                ]),
+                html.Div(style={'width': '40%', 'height': '100%'}, children=[
+                    dcc.Graph(id='pressure-graph', figure=templates['pressure'], style={'height': '100%', 'width': '100%'})
+                ]),
+                html.Div(style={'width': '40%', 'height': '100%'}, children=[
+                    dcc.Graph(id='settelment-graph', figure=templates['settelment'], style={'height': '100%', 'width': '100%'})
+                ])
             ]),
-            html.Div(style={'width': '40%', 'height': '100%'}, children=[
-                dcc.Graph(id='settelment-graph', style={'height': '100%', 'width': '100%'})
+            # Settlement of the clay over real time, for construction scheduling, and the time to the
+            # target degree of consolidation over the drain spacings
+            html.Div(style={'display': 'flex', 'flexDirection': 'row', 'width': '100%', 'height': '35%'}, children=[
+                html.Div(style={'width': '60%', 'height': '100%'}, children=[
+                    dcc.Graph(id='settelment-time-graph', figure=templates['settelment_time'], style={'height': '100%', 'width': '100%'})
+                ]),
+                html.Div(style={'width': '40%', 'height': '100%'}, children=[
+                    dcc.Graph(id='drain-design-graph', figure=templates['drain_design'], style={'height': '100%', 'width': '100%'})
+                ])
             ])
         ]),
 
+        # Precomputed time frames of the current scenario, picked by the time slider in the browser
+        dcc.Store(id='pressure-sweep'),
+        dcc.Store(id='settelment-sweep'),
+
         
         # Add the logo image to the top left corner
         html.Img(
@@ -237,14 +527,294 @@ def update_gamma_prime(gamma_r1, gamma_r2, gamma_r3, z1):
     return f"= {gamma_prime1} kN/m³", f"= {gamma_prime2} kN/m³", f"= {gamma_prime3} kN/m³", water_table_max
 
 
-# Callback to handle the animations and input updates
+# (thickness, m_v, k) of the complete rows of the clay sublayer table
+def parse_sublayers(rows):
+    sublayers = []
+    for row in rows or []:
+        values = [row.get(key) for key in ('thickness', 'm_v', 'k')]
+        if all(isinstance(value, (int, float)) and value > 0 for value in values):
+            sublayers.append(tuple(float(value) for value in values))
+    return tuple(sublayers)
+
+
+# Callback to add an empty row to the clay sublayer table
+@app.callback(
+    Output('clay-sublayers', 'data'),
+    Input('add-sublayer-button', 'n_clicks'),
+    State('clay-sublayers', 'data'),
+    prevent_initial_call=True
+)
+def add_sublayer(n_clicks, rows):
+    return (rows or []) + [{'thickness': 1, 'm_v': None, 'k': None}]
+
+
+# Callback to add a point to the load history table, or to fill it from an uploaded CSV file of
+# (days, kPa) rows
+@app.callback(
+    [Output('load-history', 'data'),
+     Output('load-history-result', 'children')],
+    [Input('add-load-point-button', 'n_clicks'),
+     Input('load-history-file', 'contents')],
+    State('load-history', 'data'),
+    prevent_initial_call=True
+)
+def update_load_history(n_clicks, contents, rows):
+    if dash.ctx.triggered_id == 'load-history-file':
+        try:
+            history = loading.read_history(base64.b64decode(contents.split(',', 1)[1]).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as error:
+            return dash.no_update, str(error)
+        return [{'day': day, 'load': load} for day, load in history], f'{len(history)} points of the load history read'
+    rows = rows or []
+    last = rows[-1] if rows else {'day': 0, 'load': 0}
+    return rows + [{'day': last.get('day'), 'load': last.get('load')}], ''
+
+
+# Clay solution of all slider positions, shared by the pressure and settlement graphs. Each stage is
+# cached by the inputs it depends on: the solution under a unit load by unit_load_inputs, its scaling
+# to Δσ and the settlement frames by all clay inputs, and the stress profiles of the pressure graph by
+# pore_pressure_inputs with the water table and unit weights. So a change of Δσ rescales the cached
+# solution and a change of the water table or a unit weight only redoes the stress sums.
+def clay_sweep(z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, drains=None, history=None,
+               compression=None):
+    params = (z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers)
+    compression = compression if method == 'nonlinear' else None
+    unit_inputs = unit_load_inputs(*params, drains, history, compression)
+
+    def solve():
+        with stage('series'):
+            if unit_inputs:
+                unit = unit_clay_cache.get_or_compute(normalize_key(*unit_inputs), lambda: solve_clay_sweep(
+                    z1, z2, z3, 1, m_v, k, tolerance, method, sublayers, drains=drains))
+                clay = scale_clay(unit, delta_sigma)
+            else:
+                clay = solve_clay_sweep(*params, drains=drains, loading=history, compression=compression)
+        with stage('figure'):
+            return clay, settelment_sweep_store(clay)
+    return clay_cache.get_or_compute(normalize_key(*params, drains, history, compression), solve)
+
+
+# Clay inputs of the solution under a unit load, which the linear methods scale to Δσ, or None for a
+# load history, which replaces Δσ, and for the nonlinear method, whose solution is not linear in Δσ
+def unit_load_inputs(z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, drains=None, history=None,
+                     compression=None):
+    if method == 'nonlinear' or history:
+        return None
+    return (z1, z2, z3, m_v, k, tolerance, method, sublayers, drains)
+
+
+# Clay inputs the excess pore pressure depends on. The time slider is relative to t_99, so the
+# isochrones of the Terzaghi series do not depend on m_v and k, with or without drains: the radial
+# consolidation rate is proportional to c_v too. A load history is given in days, which makes them
+# depend on c_v. The nonlinear method depends on all of them and the compression of the clay.
+def pore_pressure_inputs(z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, drains=None, history=None,
+                         compression=None):
+    if method == 'nonlinear':
+        return (z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, drains, history, compression)
+    if method == 'fdm' or history:
+        return (z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, drains, history)
+    return (z1, z2, z3, delta_sigma, tolerance, method, drains)
+
+
+# Drains of the drains store, a list in JSON, as the tuple of drain_parameters or None
+def parse_drains(data):
+    return tuple(data) if data else None
+
+
+# Compression of the compression store, a list in JSON, as the tuple of compression_parameters or None
+def parse_compression(data):
+    return tuple(data) if data else None
+
+
+# Callback to draw the soil column, which only depends on the geometry
+@app.callback(
+    Output('soil-layers-graph', 'figure'),
+    Input('update-button', 'n_clicks'),
+    [State('z-1', 'value'),
+     State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('water-table', 'value')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+@timed('soil_layers')
+def update_soil_layers(n_clicks, z1, z2, z3, water_table):
+    with stage('figure'):
+        changes = soil_layers_cache.get_or_compute(normalize_key(z1, z2, z3, water_table),
+                                                   lambda: soil_layers_changes(z1, z2, z3, water_table))
+        # only the changed values of the figure are sent to the browser
+        return patch_figure(changes)
+
+
+# Callback to draw the stresses and pore water pressure, from the geometry, unit weights and time
+@app.callback(
+    [Output('pressure-graph', 'figure'),
+     Output('pressure-sweep', 'data')],
+    [Input('update-button', 'n_clicks'),
+     State('time-slider', 'value')],
+    [State('z-1', 'value'),
+     State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('delta_sigma', 'value'),
+     State('gamma_1', 'value'),
+     State('gamma_r_1', 'value'),
+     State('gamma_2', 'value'),
+     State('gamma_r_2', 'value'),
+     State('gamma_3', 'value'),
+     State('gamma_r_3', 'value'),
+     State('m_v', 'value'),
+     State('k', 'value'),
+     State('water-table', 'value'),
+     State('tolerance', 'value'),
+     State('solver-method', 'value'),
+     State('clay-sublayers', 'data'),
+     State('drains', 'data'),
+     State('load-history', 'data'),
+     State('compression', 'data'),
+     State('background-enabled', 'value')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+@timed('pressure')
+def update_pressure(n_clicks, t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                    gamma_3, gamma_r_3, m_v, k, water_table, tolerance=default_tolerance, method='analytic',
+                    sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None, background=None):
+    if background:
+        return dash.no_update, dash.no_update  # drawn by the background job
+    changes, sweep_store = pressure_outputs(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                                            gamma_3, gamma_r_3, m_v, k, water_table, tolerance, method,
+                                            sublayer_rows, drains_data, history_rows, compression_data)
+    with stage('figure'):
+        return patch_figure(changes), sweep_store
+
+
+# Changes of the pressure graph at the slider position and the pressure frames of all positions
+def pressure_outputs(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k,
+                     water_table, tolerance=default_tolerance, method='analytic', sublayer_rows=None,
+                     drains_data=None, history_rows=None, compression_data=None):
+    with stage('parse'):
+        clay_params = (z1, z2, z3, delta_sigma, m_v, k, tolerance or default_tolerance, method,
+                       parse_sublayers(sublayer_rows), parse_drains(drains_data), loading.parse_history(history_rows),
+                       parse_compression(compression_data))
+        unit_weights = (gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3)
+        key = normalize_key(water_table, *unit_weights, *pore_pressure_inputs(*clay_params))
+
+    def solve():
+        clay, _ = clay_sweep(*clay_params)
+        with stage('stresses'):
+            sweep = soil_profiles(clay, three_layer_profile(z1, z2, z3, *unit_weights), delta_sigma, water_table)
+        with stage('figure'):
+            return sweep, pressure_sweep_store(sweep)
+    sweep, sweep_store = pressure_cache.get_or_compute(key, solve)
+
+    with stage('figure'):
+        return pressure_changes(sweep_frame(sweep, int(t)), z1, z2, z3, water_table), sweep_store
+
+
+# Callback to draw the settlement, from the geometry, clay properties and time
 @app.callback(
-    [Output('soil-layers-graph', 'figure'),
-     Output('pressure-graph', 'figure'),
-     Output('settelment-graph', 'figure')],
-    [Input('update-button', 'n_clicks'), 
-     State('time-slider', 'value')],   
+    [Output('settelment-graph', 'figure'),
+     Output('settelment-sweep', 'data')],
+    [Input('update-button', 'n_clicks'),
+     State('time-slider', 'value')],
     [State('z-1', 'value'),
+     State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('delta_sigma', 'value'),
+     State('m_v', 'value'),
+     State('k', 'value'),
+     State('tolerance', 'value'),
+     State('solver-method', 'value'),
+     State('clay-sublayers', 'data'),
+     State('drains', 'data'),
+     State('load-history', 'data'),
+     State('compression', 'data'),
+     State('background-enabled', 'value')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+@timed('settelment')
+def update_settelment(n_clicks, t, z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+                      sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None, background=None):
+    if background:
+        return dash.no_update, dash.no_update  # drawn by the background job
+    changes, sweep_store = settelment_outputs(t, z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayer_rows,
+                                              drains_data, history_rows, compression_data)
+    with stage('figure'):
+        return patch_figure(changes), sweep_store
+
+
+# Changes of the settlement graph at the slider position and the settlement frames of all positions
+def settelment_outputs(t, z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+                       sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None):
+    with stage('parse'):
+        sublayers = parse_sublayers(sublayer_rows)
+        history = loading.parse_history(history_rows)
+    clay, sweep_store = clay_sweep(z1, z2, z3, delta_sigma, m_v, k, tolerance or default_tolerance, method, sublayers,
+                                   parse_drains(drains_data), history, parse_compression(compression_data))
+    with stage('figure'):
+        return settelment_changes(sweep_frame(clay, int(t)), z1, z2, z3), sweep_store
+
+
+# Callback to draw the settlement–time curve of the clay, which does not depend on the time slider
+@app.callback(
+    Output('settelment-time-graph', 'figure'),
+    Input('update-button', 'n_clicks'),
+    [State('z-1', 'value'),
+     State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('delta_sigma', 'value'),
+     State('m_v', 'value'),
+     State('k', 'value'),
+     State('tolerance', 'value'),
+     State('solver-method', 'value'),
+     State('clay-sublayers', 'data'),
+     State('drains', 'data'),
+     State('load-history', 'data'),
+     State('compression', 'data'),
+     State('background-enabled', 'value')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+@timed('settelment_time')
+def update_settelment_time(n_clicks, z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+                           sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None,
+                           background=None):
+    if background:
+        return dash.no_update  # drawn by the background job
+    with stage('figure'):
+        return patch_figure(settelment_time_outputs(z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayer_rows,
+                                                    drains_data, history_rows, compression_data))
+
+
+# Changes of the settlement–time graph
+def settelment_time_outputs(z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+                            sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None):
+    with stage('parse'):
+        params = (z1, z2, z3, delta_sigma, m_v, k, tolerance or default_tolerance, method, parse_sublayers(sublayer_rows))
+        drains = parse_drains(drains_data)
+        history = loading.parse_history(history_rows)
+        compression = parse_compression(compression_data) if method == 'nonlinear' else None
+
+    unit_inputs = unit_load_inputs(*params, drains, history, compression)
+
+    def solve():
+        with stage('series'):
+            if unit_inputs:
+                unit = unit_curve_cache.get_or_compute(normalize_key(*unit_inputs), lambda: settelment_time_curve(
+                    *params[:3], 1, *params[4:], drains=drains))
+                curve = scale_curve(unit, delta_sigma)
+            else:
+                curve = settelment_time_curve(*params, drains=drains, loading=history, compression=compression)
+        with stage('figure'):
+            return settelment_time_changes(curve)
+    return settelment_time_cache.get_or_compute(normalize_key(*params, drains, history, compression), solve)
+
+
+# Callback to point the export links at the current scenario, the profiles at the time of the slider
+# and of the whole time sweep and the settlement–time curve. Moving the slider only changes the time
+# of the first links, which is done in the browser (see select_export_time).
+@app.callback(
+    Output('export-links', 'children'),
+    Input('update-button', 'n_clicks'),
+    [State('time-slider', 'value'),
+     State('z-1', 'value'),
      State('z-2', 'value'),
      State('z-3', 'value'),
      State('delta_sigma', 'value'),
@@ -256,443 +826,467 @@ def update_gamma_prime(gamma_r1, gamma_r2, gamma_r3, z1):
      State('gamma_r_3', 'value'),
      State('m_v', 'value'),
      State('k', 'value'),
-     State('water-table', 'value')]
+     State('water-table', 'value'),
+     State('tolerance', 'value'),
+     State('solver-method', 'value'),
+     State('clay-sublayers', 'data'),
+     State('drains', 'data'),
+     State('load-history', 'data'),
+     State('compression', 'data')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+def update_export_links(n_clicks, t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                        gamma_3, gamma_r_3, m_v, k, water_table, tolerance=default_tolerance, method='analytic',
+                        sublayer_rows=None, drains_data=None, history_rows=None, compression_data=None):
+    query = {
+        'z1': z1, 'z2': z2, 'z3': z3, 'delta_sigma': delta_sigma, 'gamma_1': gamma_1, 'gamma_r_1': gamma_r_1,
+        'gamma_2': gamma_2, 'gamma_r_2': gamma_r_2, 'gamma_3': gamma_3, 'gamma_r_3': gamma_r_3,
+        'm_v': m_v, 'k': k, 'water_table': water_table, 'tolerance': tolerance or default_tolerance, 'method': method,
+        'sublayers': json.dumps(parse_sublayers(sublayer_rows)),
+    }
+    if drains_data:
+        query['drains'] = json.dumps(drains_data)
+    history = loading.parse_history(history_rows)
+    if history:
+        query['loading'] = json.dumps(history)
+    if compression_data and method == 'nonlinear':
+        query['compression'] = json.dumps(compression_data[:5])  # the initial stresses follow from the scenario
+    import export
+    formats = [file_format for file_format in export.formats if file_format != 'parquet' or export.parquet_available]
+
+    def links(label, kind, **extra):
+        anchors = [html.A(file_format.upper(), href=f'/export/{kind}.{file_format}?{urlencode(dict(query, **extra))}',
+                          download=f'{kind}.{file_format}', style={'marginLeft': '0.5vw'}) for file_format in formats]
+        return html.Div([label] + anchors)
+    return [links(f'Profiles at t = {t}%:', 'profiles', t=t), links('All time steps:', 'profiles', t='all'),
+            links('Settlement–time:', 'settlement')]
+
+
+# Callback to collect the drain inputs into the drains store, empty unless the drains are switched on
+@app.callback(
+    Output('drains', 'data'),
+    [Input('drains-enabled', 'value'),
+     Input('drain-spacing', 'value'),
+     Input('drain-pattern', 'value'),
+     Input('drain-diameter', 'value'),
+     Input('smear-ratio', 'value'),
+     Input('permeability-ratio', 'value'),
+     Input('ch-ratio', 'value'),
+     Input('drain-theory', 'value')],
+    prevent_initial_call=True  # the drains are off at startup
+)
+def update_drains(enabled, spacing, pattern, diameter, smear_ratio, permeability_ratio, ch_ratio, theory):
+    if not enabled or not all(value and value > 0 for value in (spacing, diameter, smear_ratio, permeability_ratio, ch_ratio)):
+        return None
+    return list(drain_parameters(spacing, pattern, diameter, smear_ratio, permeability_ratio, ch_ratio, theory))
+
+
+# Callback to collect the compression of the clay into the compression store, with the initial effective
+# stress of the clay from the geometry and unit weights, empty while an input is missing or invalid
+@app.callback(
+    Output('compression', 'data'),
+    [Input('compression-index', 'value'),
+     Input('recompression-index', 'value'),
+     Input('void-ratio', 'value'),
+     Input('preconsolidation', 'value'),
+     Input('permeability-index', 'value'),
+     Input('z-1', 'value'),
+     Input('z-2', 'value'),
+     Input('z-3', 'value'),
+     Input('gamma_1', 'value'),
+     Input('gamma_r_1', 'value'),
+     Input('gamma_2', 'value'),
+     Input('gamma_r_2', 'value'),
+     Input('gamma_3', 'value'),
+     Input('gamma_r_3', 'value'),
+     Input('water-table', 'value')]
+)
+def update_compression(Cc, Cr, e0, preconsolidation, ck, z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                       gamma_3, gamma_r_3, water_table):
+    import nonlinear
+    try:
+        stresses = nonlinear.initial_effective_stress(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3,
+                                                      gamma_r_3, water_table)
+        return list(nonlinear.compression_parameters(Cc, Cr, e0, preconsolidation, ck, *stresses))
+    except (TypeError, ValueError):
+        return None
+
+
+# Callback to draw the time to the target degree of consolidation over the drain spacings of both
+# patterns, one broadcast computation for the whole grid, whenever a target or a drain input changes
+@app.callback(
+    [Output('drain-design-graph', 'figure'),
+     Output('drain-design-result', 'children')],
+    [Input('update-button', 'n_clicks'),
+     Input('target-U', 'value'),
+     Input('target-days', 'value'),
+     Input('drain-diameter', 'value'),
+     Input('smear-ratio', 'value'),
+     Input('permeability-ratio', 'value'),
+     Input('ch-ratio', 'value'),
+     Input('drain-theory', 'value')],
+    [State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('m_v', 'value'),
+     State('k', 'value')],
+    prevent_initial_call=True  # the default scenario is put into the layout at startup
+)
+@timed('drain_design')
+def update_drain_design(n_clicks, target_U, target_days, diameter, smear_ratio, permeability_ratio, ch_ratio, theory,
+                        z2, z3, m_v, k):
+    with stage('parse'):
+        values = (target_U, target_days, diameter, smear_ratio, permeability_ratio, ch_ratio)
+        if not all(value and value > 0 for value in values) or target_U >= 100:
+            return dash.no_update, 'Targets and drain properties need positive values, and U below 100%'
+        params = (z2, z3, m_v, k, target_U / 100, target_days)
+        properties = (diameter, smear_ratio, permeability_ratio, ch_ratio, theory)
+
+    def solve():
+        with stage('series'):
+            design = drains.design_sweep(*params, drains.spacings, *properties)
+        with stage('figure'):
+            return design, drain_design_changes(design)
+    design, changes = drain_design_cache.get_or_compute(normalize_key(*params, *properties), solve)
+
+    with stage('figure'):
+        result = []
+        for pattern in design['patterns']:
+            spacing = design['largest_spacing'][pattern]
+            if spacing is None:
+                result.append(f"{pattern.capitalize()}: no spacing from {design['spacings'][0]:.2f} m reaches the target")
+            else:
+                result.append(f"{pattern.capitalize()}: s ≤ {spacing:.2f} m, "
+                              f"{design['drains_per_100m2'][pattern]:.1f} drains per 100 m²")
+        return patch_figure(changes), '\n'.join(result)
+
+
+# Callback to take the spacing and pattern of a clicked point of the design graph
+@app.callback(
+    [Output('drain-spacing', 'value'),
+     Output('drain-pattern', 'value')],
+    Input('drain-design-graph', 'clickData'),
+    prevent_initial_call=True
+)
+def pick_drain_spacing(click):
+    if not click or click['points'][0]['curveNumber'] >= len(drain_patterns):
+        return dash.no_update, dash.no_update
+    point = click['points'][0]
+    return round(point['x'], 2), list(drain_patterns)[point['curveNumber']]
+
+
+# Callback to fit cv and mv of the clay to an uploaded settlement record, by least squares over
+# thousands of candidates and by Asaoka's method
+@app.callback(
+    [Output('back-analysis-result', 'children'),
+     Output('back-analysis', 'data'),
+     Output('settelment-time-graph', 'figure', allow_duplicate=True)],
+    Input('settelment-record', 'contents'),
+    [State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('delta_sigma', 'value')],
+    prevent_initial_call=True
+)
+@timed('back_analysis')
+def update_back_analysis(contents, z2, z3, delta_sigma):
+    import back_analysis
+    with stage('parse'):
+        try:
+            days, settelment = back_analysis.read_record(base64.b64decode(contents.split(',', 1)[1]).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as error:
+            return str(error), None, dash.no_update
+    with stage('series'):
+        fit = back_analysis.fit_settelment(days, settelment, z2, z3, delta_sigma)
+        asaoka = back_analysis.asaoka(days, settelment, z2, z3)
+        fitted = back_analysis.settelment_model(curve_times, fit['c_v'], fit['m_v'], z2, z3, delta_sigma)
+    with stage('figure'):
+        result = (
+            f"cv = {fit['c_v']:.3g} m²/s (95%: {fit['c_v_interval'][0]:.3g} – {fit['c_v_interval'][1]:.3g})\n"
+            f"mv = {fit['m_v']:.3g} m²/kN (95%: {fit['m_v_interval'][0]:.3g} – {fit['m_v_interval'][1]:.3g})\n"
+            f"k = {fit['k']:.3g} m/s (95%: {fit['k_interval'][0]:.3g} – {fit['k_interval'][1]:.3g})\n"
+            f"𝜌∞ = {fit['final_settelment']:.1f} mm, RMSE = {fit['rmse']:.2f} mm\n"
+            f"Asaoka: cv = {asaoka['c_v']:.3g} m²/s, 𝜌∞ = {asaoka['final_settelment']:.1f} mm"
+        )
+        changes = back_analysis_changes(days, settelment, curve_times / seconds_per_day, fitted)
+        return result, {'m_v': float(fit['m_v']), 'k': float(fit['k'])}, patch_figure(changes)
+
+
+# Callback to take the fitted mv and k as the clay properties
+@app.callback(
+    [Output('m_v', 'value'),
+     Output('k', 'value')],
+    Input('use-fit-button', 'n_clicks'),
+    State('back-analysis', 'data'),
+    prevent_initial_call=True
+)
+def use_fit(n_clicks, fit):
+    if not fit:
+        return dash.no_update, dash.no_update
+    return float(f"{fit['m_v']:.4g}"), float(f"{fit['k']:.4g}")
+
+
+# Callback to draw the P5–P95 bands of Monte Carlo realizations of k, mv and Δσ at the time of the
+# slider, when they are switched on. The realizations are of the homogeneous clay, whatever the method.
+@app.callback(
+    [Output('pressure-graph', 'figure', allow_duplicate=True),
+     Output('settelment-graph', 'figure', allow_duplicate=True),
+     Output('settelment-time-graph', 'figure', allow_duplicate=True),
+     Output('uncertainty-result', 'children')],
+    [Input('update-button', 'n_clicks'),
+     Input('time-slider', 'value'),
+     Input('uncertainty-enabled', 'value')],
+    [State('z-1', 'value'),
+     State('z-2', 'value'),
+     State('z-3', 'value'),
+     State('delta_sigma', 'value'),
+     State('m_v', 'value'),
+     State('k', 'value'),
+     State('water-table', 'value'),
+     State('tolerance', 'value'),
+     State('solver-method', 'value'),
+     State('clay-sublayers', 'data'),
+     State('samples', 'value'),
+     State('k-distribution', 'value'),
+     State('k-cov', 'value'),
+     State('m_v-distribution', 'value'),
+     State('m_v-cov', 'value'),
+     State('delta_sigma-distribution', 'value'),
+     State('delta_sigma-cov', 'value'),
+     State('background-enabled', 'value')],
+    prevent_initial_call=True
 )
+@timed('uncertainty')
+def update_uncertainty(n_clicks, t, enabled, z1, z2, z3, delta_sigma, m_v, k, water_table, tolerance, method,
+                       sublayer_rows, samples, k_distribution, k_cov, m_v_distribution, m_v_cov,
+                       delta_sigma_distribution, delta_sigma_cov, background=None):
+    if not enabled:
+        if dash.ctx.triggered_id != 'uncertainty-enabled':
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return (patch_figure(hidden_band_changes(pressure_band)), patch_figure(hidden_band_changes(settelment_band)),
+                patch_figure(hidden_band_changes(settelment_time_band)), '')
+    if background:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update  # drawn by the background job
 
-def update_graphs(n_clicks, t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2, 
-                   gamma_3, gamma_r_3, m_v, k, water_table):
-    # Constants
-    gamma_water = 10 # kN/m³ for water
-
-    # total depth
-    total_depth = z1 + z2 + z3
-
-    # Ensure y_top has a default value
-    y_top = -0.1*total_depth
-
-    # Define soil layers and their boundaries with specified patterns
-    layers = [
-        {'layer_id': '1', 'name': 'Sand-1', 'thickness' : z1,'top': 0, 'bottom': z1, 'color': 'rgb(244,164,96)','fillpattern': {'shape': '.'}, 
-         'x0': -0.2,'text':'h\u2081'
-         },  # Dots for Sand
-        {'layer_id': '2', 'name': 'Clay', 'thickness' : z2, 'top': z1, 'bottom': z1 + z2, 'color': 'rgb(139,69,19)',
-         'fillpattern': {'shape': ''}, 'x0': 0
-         },  # Dashes for Clay
-        {'layer_id': '3', 'name': 'Sand-2', 'thickness' : z3, 'top': z1 + z2, 'bottom': z1 + z2 + z3, 'color': 'rgb(244,164,96)',
-         'fillpattern': {'shape': '.'}, 'x0': -0.70, 'text':'h\u2083'
-         },  # Dots for Sand
-    ]
-
-    # Create the soil layers figure (139,69,19)
-    soil_layers_fig = go.Figure()
-    pressure_fig = go.Figure()
-    settelment_fig = go.Figure()
-
-    for layer in layers:
-        if layer['thickness'] > 0:
-            soil_layers_fig.add_trace(go.Scatter(
-                x=[0, 0, 1, 1],  # Create a rectangle-like shape
-                y=[layer['top'], layer['bottom'], layer['bottom'], layer['top']],
-                fill='toself',
-                fillcolor=layer['color'],  # Transparent background to see the pattern
-                line=dict(width=1, color='black'),
-                name=layer['name'],
-                showlegend=False,
-                hoverinfo='skip',  # Skip the hover info for these layers
-                fillpattern=layer['fillpattern']  # Use the specified fill pattern
-            ))
-
-            # Add a line at the top and bottom of each layer
-            soil_layers_fig.add_trace(go.Scatter(
-                x=[0, 1],  # Start at -1 and end at 1
-                y=[layer['top'], layer['top']],  # Horizontal line at the top of the layer
-                mode='lines',
-                line=dict(color='black', width=1, dash='dash'),
-                showlegend=False,  # Hide legend for these lines
-                hoverinfo='skip'  # Skip the hover info for these line
-            ))
-            
-            # Add the annotation for the layer name
-            mid_depth = (layer['top'] + layer['bottom']) / 2  # Midpoint of the layer
-            soil_layers_fig.add_annotation(
-                x=0.4,  # Position the text slightly to the right of the layer box
-                y=mid_depth,
-                text=layer['name'],  # Layer name as text
-                font = dict(size=14, color="white", weight='bold'),
-                showarrow=False,  # Don't show an arrow
-                xanchor='left',  # Anchor text to the left
-                yanchor='middle'  # Center text vertically with the midpoint             
-            )
-
-
-    # Add a line at the water table
-    soil_layers_fig.add_trace(go.Scatter(
-        x=[0, 1],  # Start at -1 and end at 1
-        y=[0, 0],  # Horizontal line at the top of the layer
-        mode='lines',
-        line=dict(color='blue', width=2, dash='dot'),
-        showlegend=False,  # Hide legend for these lines
-        hoverinfo='skip'  # Skip the hover info for these line
-    )) 
-
-    # adding arrowas distributed load on the foundation
-    num_arrows = 10
-    for i in range(0, int(num_arrows+1)):
-        soil_layers_fig.add_annotation(
-            x=i*0.1, # x-coordinate of arrow head
-            y=0, # y-coordinate of arrow head
-            ax=i*0.1, # x-coordinate of tail
-            ay=0.9*y_top, # y-coordinate of tail
-            xref="x",
-            yref="y",
-            axref="x",
-            ayref="y",
-            showarrow=True,
-            arrowhead=2,
-            arrowsize=1,
-            arrowwidth=2,
-            arrowcolor="black"
+    *changes, result = uncertainty_outputs(t, z1, z2, z3, delta_sigma, m_v, k, water_table, tolerance, method,
+                                           sublayer_rows, samples, k_distribution, k_cov, m_v_distribution, m_v_cov,
+                                           delta_sigma_distribution, delta_sigma_cov)
+    with stage('figure'):
+        return (*(patch_figure(graph_changes) for graph_changes in changes), result)
+
+
+# Band changes of the pressure, settlement and settlement–time graphs and the summary of the Monte Carlo
+# realizations at the slider position. progress(done, total) follows the chunks of realizations.
+def uncertainty_outputs(t, z1, z2, z3, delta_sigma, m_v, k, water_table, tolerance, method, sublayer_rows, samples,
+                        k_distribution, k_cov, m_v_distribution, m_v_cov, delta_sigma_distribution, delta_sigma_cov,
+                        progress=None):
+    with stage('parse'):
+        tolerance = tolerance or default_tolerance
+        params = (int(t), z1, z2, z3, delta_sigma, m_v, k, samples or monte_carlo.default_samples,
+                  k_cov or 0, k_distribution, m_v_cov or 0, m_v_distribution, delta_sigma_cov or 0,
+                  delta_sigma_distribution)
+    with stage('series'):
+        bands = uncertainty_cache.get_or_compute(
+            normalize_key(*params, tolerance),
+            lambda: monte_carlo.uncertainty_bands(*params, tolerance=tolerance, progress=progress))
+        # the realizations are of the linear clay, and so is the scale of their bands
+        clay, _ = clay_sweep(z1, z2, z3, delta_sigma, m_v, k, tolerance, 'analytic' if method == 'nonlinear' else method,
+                             parse_sublayers(sublayer_rows))
+    with stage('figure'):
+        x_max = 1.2 * float(np.max(sweep_frame(clay, int(t))['accummultive_settelment']))
+        U, rho = 100 * bands['U_at_time'][:, 0], bands['accummultive_settelment'][:, -1]
+        at = 'in the final state' if np.isinf(bands['time']) else f"at t = {bands['time'] / seconds_per_day:.3g} days"
+        result = (
+            f"{bands['samples']} realizations {at}\n"
+            f"U = {U[1]:.1f}% (P5–P95: {U[0]:.1f} – {U[2]:.1f}%)\n"
+            f"𝜌 = {rho[1]:.1f} mm (P5–P95: {rho[0]:.1f} – {rho[2]:.1f} mm)"
         )
+        return (pressure_band_changes(bands, water_table), settelment_band_changes(bands, x_max),
+                settelment_time_band_changes(bands), result)
 
-    soil_layers_fig.add_trace(go.Scatter(
-        x=[0, 1],  
-        y=[0, 0],  # Horizontal line at the top of the layer
-        mode='lines',
-        line=dict(color='black', width=4, dash='solid'),
-        showlegend=False,  # Hide legend for these lines
-        hoverinfo='skip'  # Skip the hover info for these line
-    ))
-
-    #  adding text for the load delta sigma
-    soil_layers_fig.add_annotation(
-        x=0.5,  # Position the text slightly to the right of the layer box
-        y=y_top,
-        text='Δσ',  # Layer name as text
-        font = dict(size=14, color="black", weight='bold'),
-        showarrow=False,  # Don't show an arrow
-        xanchor='center',  # Anchor text to the left
-        yanchor='middle'  # Center text vertically with the midpoint
+
+# Background jobs of the update, with progress and cancellation, if diskcache is installed. The
+# graphs of an update are then solved by the job instead of the callbacks above, and the results are
+# cached by the hash of the inputs.
+if jobs.manager:
+    # Callback to start a job for an update, when background jobs are switched on, and for a new slider
+    # position or switching the uncertainty bands on, whose Monte Carlo realizations the job draws
+    @app.callback(
+        Output('job-request', 'data'),
+        [Input('update-button', 'n_clicks'),
+         Input('time-slider', 'value'),
+         Input('uncertainty-enabled', 'value')],
+        [State('background-enabled', 'value'),
+         State('job-request', 'data')],
+        prevent_initial_call=True
     )
-    # add a line for the water table
-    soil_layers_fig.add_trace(go.Scatter(
-        x=[0, 1],  # Start at -1 and end at 1
-        y=[water_table, water_table],  # Horizontal line at the top of the layer
-        mode='lines',
-        line=dict(color='blue', width=2, dash='dot'),
-        showlegend=False,  # Hide legend for these lines
-        hoverinfo='skip'  # Skip the hover info for these line
-    ))
-
-   
-    # First figure (soil_layers_fig)
-    soil_layers_fig.update_layout(
-        plot_bgcolor='white',
-        xaxis_title= dict(text='Width (m)', font=dict(weight='bold')),
-        xaxis=dict(
-            range=[0, 1],  # Adjusting the x-range as needed
-                showticklabels=False,
-                showgrid=False,
-                title=None, 
-                zeroline=False
-        ),
-        yaxis_title= dict(text='Depth (m)', font=dict(weight='bold')),
-        yaxis=dict(
-            range=[total_depth, y_top],  # Adjusted range for the y-axis (inverted for depth)
-            showticklabels=True,
-            ticks='outside',
-            title_standoff=4,
-            ticklen=5,
-            minor_ticks="inside",
-            showline=True,
-            linewidth=2,
-            linecolor='black',
-            zeroline=False,
-            # scaleanchor="x",  # Link y-axis scaling with x-axis
-            # scaleratio=1,
-        ),
-        margin=dict(l=20, r=10),
+    def request_job(n_clicks, t, uncertainty_enabled, background, request):
+        if not background or (dash.ctx.triggered_id != 'update-button' and not uncertainty_enabled):
+            return dash.no_update
+        return (request or 0) + 1
+
+    # Job drawing the pressure, settlement and settlement–time graphs, and the uncertainty bands if
+    # they are switched on, in a process of its own
+    @app.callback(
+        [Output('pressure-graph', 'figure', allow_duplicate=True),
+         Output('pressure-sweep', 'data', allow_duplicate=True),
+         Output('settelment-graph', 'figure', allow_duplicate=True),
+         Output('settelment-sweep', 'data', allow_duplicate=True),
+         Output('settelment-time-graph', 'figure', allow_duplicate=True),
+         Output('uncertainty-result', 'children', allow_duplicate=True)],
+        Input('job-request', 'data'),
+        [State('time-slider', 'value'),
+         State('z-1', 'value'),
+         State('z-2', 'value'),
+         State('z-3', 'value'),
+         State('delta_sigma', 'value'),
+         State('gamma_1', 'value'),
+         State('gamma_r_1', 'value'),
+         State('gamma_2', 'value'),
+         State('gamma_r_2', 'value'),
+         State('gamma_3', 'value'),
+         State('gamma_r_3', 'value'),
+         State('m_v', 'value'),
+         State('k', 'value'),
+         State('water-table', 'value'),
+         State('tolerance', 'value'),
+         State('solver-method', 'value'),
+         State('clay-sublayers', 'data'),
+         State('drains', 'data'),
+         State('load-history', 'data'),
+         State('compression', 'data'),
+         State('uncertainty-enabled', 'value'),
+         State('samples', 'value'),
+         State('k-distribution', 'value'),
+         State('k-cov', 'value'),
+         State('m_v-distribution', 'value'),
+         State('m_v-cov', 'value'),
+         State('delta_sigma-distribution', 'value'),
+         State('delta_sigma-cov', 'value')],
+        background=True,
+        manager=jobs.manager,
+        progress=[Output('job-progress', 'value'),
+                  Output('job-progress', 'max'),
+                  Output('job-status', 'children')],
+        running=[(Output('cancel-job-button', 'disabled'), False, True)],
+        cancel=[Input('cancel-job-button', 'n_clicks')],
+        prevent_initial_call=True
     )
+    def run_job(set_progress, request, t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3,
+                gamma_r_3, m_v, k, water_table, tolerance, method, sublayer_rows, drains_data, history_rows,
+                compression_data, uncertainty_enabled, *uncertainty_params):
+        jobs.lower_priority()
+        clay_params = (z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayer_rows, drains_data, history_rows,
+                       compression_data)
+        steps = 4 if uncertainty_enabled else 3
 
-     # Calculate pore water pressure based on conditions
-    step = 0.05
-    z1_depth = np.linspace(0, z1, num=int(z1/step)+1)
-    z2_depth = np.linspace(z1, z1+z2, num=int(z2/step)+1)
-    z3_depth = np.linspace(z1+z2, z1+z2+z3, num=int(z3/step)+1)
-    depths = np.concatenate((z1_depth, z2_depth, z3_depth))
-    total_stress_z1 = np.zeros_like(z1_depth)
-    total_stress_z2 = np.zeros_like(z2_depth)
-    total_stress_z3 = np.zeros_like(z3_depth)
-    pore_pressure_z1 = np.zeros_like(z1_depth)
-    pore_pressure_z2 = np.zeros_like(z2_depth)
-    pore_pressure_z3 = np.zeros_like(z3_depth)
-    effective_stress_z1 = np.zeros_like(z1_depth)
-    effective_stress_z2 = np.zeros_like(z2_depth)
-    effective_stress_z3 = np.zeros_like(z3_depth)
-    settelment_z2 = np.zeros_like(z2_depth)
-   
-  
-    # condition for the first layer
-    for i, depth in enumerate(z1_depth):
-        
-        if depth <= water_table:
-            total_stress_z1[i] = depth * gamma_1 + delta_sigma
-            pore_pressure_z1[i] = 0
-        else:
-            total_stress_z1[i] = total_stress_z1[int(water_table/step)] + (depth - water_table) * gamma_r_1
-            pore_pressure_z1[i] = (depth-water_table) * gamma_water
-        effective_stress_z1[i] = total_stress_z1[i] - pore_pressure_z1[i]
-
-    # condition for the second layer
-    for i, depth in enumerate(z2_depth):
-
-        total_stress_z2[i] = total_stress_z1[int(z1/step)] + (depth - z1) * gamma_r_2
-        # pore water pressure
-        if z3 == 0:
-            H = z2
-        else:
-            H = z2/2
-        
-        c_v = k/(m_v * gamma_water)
-        t_99 = (1.4832*(H)**2)/c_v
+        set_progress((0, steps, 'Solving the time sweep'))
+        pressure, pressure_sweep = pressure_outputs(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                                                    gamma_3, gamma_r_3, m_v, k, water_table, *clay_params[6:])
+        set_progress((1, steps, 'Settlement profiles'))
+        settelment, settelment_sweep = settelment_outputs(t, *clay_params)
+        set_progress((2, steps, 'Settlement–time curve'))
+        settelment_time = settelment_time_outputs(*clay_params)
 
-        T_v = ((t/100) * t_99* c_v)/(H)**2
+        result = dash.no_update
+        if uncertainty_enabled:
+            def progress(done, total):
+                set_progress((3 + done / total, steps, f'Monte Carlo realizations, chunk {done} of {total}'))
+            pressure_bands, settelment_bands, settelment_time_bands, result = uncertainty_outputs(
+                t, z1, z2, z3, delta_sigma, m_v, k, water_table, tolerance, method, sublayer_rows, *uncertainty_params,
+                progress=progress)
+            pressure, settelment = pressure + pressure_bands, settelment + settelment_bands
+            settelment_time = settelment_time + settelment_time_bands
+        set_progress((steps, steps, 'Done'))
+        return (patch_figure(pressure), pressure_sweep, patch_figure(settelment), settelment_sweep,
+                patch_figure(settelment_time), result)
 
-        if t == 100:
-            U = 1
-        elif T_v >= 0 and  T_v < (1/12):
-            U = np.sqrt(4*T_v/3)    
-        else:
-            U = 1 - (2/3)*np.exp((1/4)-(3*T_v))
-        
-        # Calculate excess pore pressure using the series summation method
-        if t == 0:
-            excess_pore_pressure  = delta_sigma
-        elif t == 100:
-            excess_pore_pressure  = 0
-        else:
-            M = np.pi/2 * (2 * np.arange(0, 100) + 1)  # Mode numbers
-            excess_pore_pressure = (2 * delta_sigma / M) * np.sin(M * (depth - z1) / (H)) * np.exp(-M**2 * T_v)
-            excess_pore_pressure = np.sum(excess_pore_pressure)  # Sum up for all modes
-        
-        pore_pressure_z2[i] = (depth - water_table) * gamma_water + excess_pore_pressure
-        effective_stress_z2[i] = total_stress_z2[i] - pore_pressure_z2[i]
-        settelment_z2[i] = 1000*(delta_sigma-excess_pore_pressure) * m_v * step
-
-
-    # condition for the third layer    
-    for i, depth in enumerate(z3_depth):
-        total_stress_z3[i] = total_stress_z2[int(z2/step)] + (depth+-z1-z2) * gamma_r_3
-        pore_pressure_z3[i] = (depth-water_table) * gamma_water
-        effective_stress_z3[i] = total_stress_z3[i] - pore_pressure_z3[i]
-
-    # Combine the results for all layers
-    total_stress = np.concatenate((total_stress_z1, total_stress_z2, total_stress_z3))
-    pore_pressure = np.concatenate((pore_pressure_z1, pore_pressure_z2, pore_pressure_z3))
-    effective_stress = np.concatenate((effective_stress_z1, effective_stress_z2, effective_stress_z3))
-
-
-
-    # Create the pore pressure figure
-    for layer in layers:
-        # Add a line at the bottom of each layer other graph
-        pressure_fig.add_trace(go.Scatter(
-            x=[0, 1.2 * max(max(total_stress), max(pore_pressure), max(effective_stress))],  
-            y=[layer['bottom'], layer['bottom']],  
-            mode='lines',
-            line=dict(color='black', width=1, dash='dash'),
-            showlegend=False,  
-            hoverinfo='skip'  
-        ))
-    
-    
-    
 
-    pressure_fig.add_trace(go.Scatter(
-        x=total_stress,
-        y=depths,
-        mode='lines',
-        line=dict(color='red', width=3 ),
-        name='Total Vertical Stress, σ<sub>T</sub>'
-    ))
-
-    pressure_fig.add_trace(go.Scatter(
-        x=pore_pressure,
-        y=depths,
-        mode='lines',
-        line=dict(color='blue', width=3 ),
-        name='Pore Water Pressure, u'
-    ))
-
-
-    pressure_fig.add_trace(go.Scatter(
-        x=effective_stress,
-        y=depths,
-        mode='lines',
-        line=dict(color='green', width=3 ),
-        name='Effective Vertical Stress, σ\''
-    ))
-
-    # draw the original pore water pressuer line
-    pressure_fig.add_trace(go.Scatter
-    (
-        x=[0, (total_depth - water_table) * gamma_water],
-        y=[water_table, total_depth],
-        mode='lines',
-        line=dict(color='blue', width=3, dash='dot'),
-        name='Initial Pore Water Pressure, u<sub>0</sub>'
-    ))
-
-    pressure_fig.update_layout(
-        xaxis_title=dict(text='Stress/pressure (kPa)', font=dict(weight='bold')),
-        plot_bgcolor='white',
-        xaxis=dict(
-            range=[0, 1.2 * max(max(total_stress), max(pore_pressure), max(effective_stress))],
-            side='top',
-            title_standoff=4,
-            zeroline=False,
-            showticklabels=True,
-            ticks='outside',
-            ticklen=5,
-            minor_ticks="inside",
-            showline=True,
-            linewidth=2,
-            linecolor='black',
-            showgrid=False,
-            gridwidth=1,
-            gridcolor='lightgrey',
-            mirror=True,
-            hoverformat=".2f"  # Sets hover value format for x-axis to two decimal places
-        ),
-        yaxis_title=dict(text='Depth (m)', font=dict(weight='bold')),
-        yaxis=dict(
-            range=[total_depth, y_top],
-            zeroline=True,
-            zerolinecolor= "black",
-            title_standoff=4,
-            showticklabels=True,
-            ticks='outside',
-            ticklen=5,
-            minor_ticks="inside",
-            showline=True,
-            linewidth=2,
-            linecolor='black',
-            showgrid=False,
-            gridwidth=1,
-            gridcolor='lightgrey',
-            mirror=True,
-            hoverformat=".3f"  # Sets hover value format for y-axis to two decimal places
-        ),
-        legend=dict(
-            yanchor="top",  # Align the bottom of the legend box
-            y=1,               # Position the legend at the bottom inside the plot
-            xanchor="right",    # Align the right edge of the legend box
-            x=1,               # Position the legend at the right inside the plot
-            font= dict(size=10),  # Adjust font size
-            bgcolor="rgba(255, 255, 255, 0.7)",  # Optional: Semi-transparent white background
-            bordercolor="black",                 # Optional: Border color
-            borderwidth=1                        # Optional: Border width
-        ),
-        margin=dict(l=10, r=10),
-    )
+# Pick the precomputed frames of the time slider position without a server round-trip, while it is dragged
+app.clientside_callback(
+    ClientsideFunction(namespace='consolidation', function_name='select_pressure_frame'),
+    Output('pressure-graph', 'figure', allow_duplicate=True),
+    Input('time-slider', 'drag_value'),
+    [State('pressure-sweep', 'data'),
+     State('pressure-graph', 'figure')],
+    prevent_initial_call=True
+)
+app.clientside_callback(
+    ClientsideFunction(namespace='consolidation', function_name='select_export_time'),
+    Output('export-links', 'children', allow_duplicate=True),
+    Input('time-slider', 'drag_value'),
+    State('export-links', 'children'),
+    prevent_initial_call=True
+)
+app.clientside_callback(
+    ClientsideFunction(namespace='consolidation', function_name='select_settelment_frame'),
+    Output('settelment-graph', 'figure', allow_duplicate=True),
+    Input('time-slider', 'drag_value'),
+    [State('settelment-sweep', 'data'),
+     State('settelment-graph', 'figure')],
+    prevent_initial_call=True
+)
 
-    accummultive_settelment = np.cumsum(np.sort(settelment_z2)[::-1])
-    # print(accummultive_settelment)
-    
-    # Calculate the settlement for the second layer
-    for layer in layers:
-        # Add a line at the bottom of each layer other graph
-        settelment_fig.add_trace(go.Scatter(
-            x=[0, 1.2 * max(accummultive_settelment)],  # Start at -1 and end at 1
-            y=[layer['bottom'], layer['bottom']],  # Horizontal line at the top of the layer
-            mode='lines',
-            line=dict(color='black', width=1, dash='dash'),
-            showlegend=False,  # Hide legend for these lines
-            hoverinfo='skip'  # Skip the hover info for these line
-        ))
-     
-
-
-    settelment_fig.add_trace(go.Scatter(
-        x=accummultive_settelment,
-        y=np.sort(z2_depth)[::-1],
-        mode='lines',
-        line=dict(color='red', width=3 ),
-        name='Accumultive primary consolidation settelment, 𝜌'
-    ))
-
-    # adding text to show U value at the middle of Clay layer
-    settelment_fig.add_annotation(
-        x=0.3*max(accummultive_settelment),  # Position the text slightly to the right of the layer box
-        y=0.8*(z1 + z2/2),
-        text=f'U = {U*100:.0f}%',  # Layer name as text
-        font = dict(size=14, color="red", weight='bold'),
-        showarrow=False,  # Don't show an arrow
-        xanchor='center',  # Anchor text to the left
-        bgcolor="yellow", 
-        yanchor='middle'  # Center text vertically with the midpoint
-    )
 
+# Figures and time frames of the default scenario, put into the layout so that the first page load
+# needs no callback. The cached results come from the startup snapshot if there is one.
+def prewarm():
+    if startup_snapshot:
+        caches_by_name = {cache.name: cache for cache in caches}
+        for name, entries in startup_snapshot['caches'].items():
+            for key, value in entries:
+                caches_by_name[name].put(key, value)
 
-    settelment_fig.update_layout(
-        xaxis_title=dict(text='Primary consolidation settelment (mm)', font=dict(weight='bold')),
-        plot_bgcolor='white',
-        xaxis=dict(
-            range=[0, 1.2 * max(accummultive_settelment)],
-            side='top',
-            title_standoff=4,
-            zeroline=False,
-            showticklabels=True,
-            ticks='outside',
-            ticklen=5,
-            minor_ticks="inside",
-            showline=True,
-            linewidth=2,
-            linecolor='black',
-            showgrid=False,
-            gridwidth=1,
-            gridcolor='lightgrey',
-            mirror=True,
-            hoverformat=".2f"  # Sets hover value format for x-axis to two decimal places
-        ),
-        yaxis_title=dict(text='Depth (m)', font=dict(weight='bold')),
-        yaxis=dict(
-            range=[total_depth, y_top],
-            zeroline=True,
-            zerolinecolor= "black",
-            title_standoff=4,
-            showticklabels=True,
-            ticks='outside',
-            ticklen=5,
-            minor_ticks="inside",
-            showline=True,
-            linewidth=2,
-            linecolor='black',
-            showgrid=False,
-            gridwidth=1,
-            gridcolor='lightgrey',
-            mirror=True,
-            hoverformat=".2f"  # Sets hover value format for y-axis to two decimal places
-        ),
-        legend=dict(
-            yanchor="top",  # Align the bottom of the legend box
-            y=1,               # Position the legend at the bottom inside the plot
-            xanchor="right",    # Align the right edge of the legend box
-            x=1,               # Position the legend at the right inside the plot
-            font= dict(size=10),  # Adjust font size
-            bgcolor="rgba(255, 255, 255, 0.7)",  # Optional: Semi-transparent white background
-            bordercolor="black",                 # Optional: Border color
-            borderwidth=1                        # Optional: Border width
-            
-        ),
-        margin=dict(l=10, r=10),
-    )
+    from batch import default_scenario as s
+    t = app.layout['time-slider'].value
+    clay = (s['z1'], s['z2'], s['z3'], s['delta_sigma'], s['m_v'], s['k'], s['tolerance'], s['method'], [])
+    unit_weights = (s['gamma_1'], s['gamma_r_1'], s['gamma_2'], s['gamma_r_2'], s['gamma_3'], s['gamma_r_3'])
+    soil_layers = update_soil_layers(0, s['z1'], s['z2'], s['z3'], s['water_table'])
+    pressure, pressure_sweep = update_pressure(0, t, *clay[:4], *unit_weights, s['m_v'], s['k'], s['water_table'],
+                                               *clay[6:])
+    settelment, settelment_sweep = update_settelment(0, t, *clay)
+    settelment_time = update_settelment_time(0, *clay)
+    export_links = update_export_links(0, t, *clay[:4], *unit_weights, s['m_v'], s['k'], s['water_table'], *clay[6:])
+    drain_design, drain_design_result = update_drain_design(
+        0, *(app.layout[input_id].value for input_id in ('target-U', 'target-days', 'drain-diameter', 'smear-ratio',
+                                                           'permeability-ratio', 'ch-ratio', 'drain-theory')),
+        s['z2'], s['z3'], s['m_v'], s['k'])
 
+    app.layout['soil-layers-graph'].figure = apply_patch(templates['soil_layers'], soil_layers)
+    app.layout['pressure-graph'].figure = apply_patch(templates['pressure'], pressure)
+    app.layout['settelment-graph'].figure = apply_patch(templates['settelment'], settelment)
+    app.layout['settelment-time-graph'].figure = apply_patch(templates['settelment_time'], settelment_time)
+    app.layout['drain-design-graph'].figure = apply_patch(templates['drain_design'], drain_design)
+    app.layout['drain-design-result'].children = drain_design_result
+    app.layout['export-links'].children = export_links
+    app.layout['pressure-sweep'].data = pressure_sweep
+    app.layout['settelment-sweep'].data = settelment_sweep
 
-    return soil_layers_fig, pressure_fig, settelment_fig
-# Run the Dash app
-if __name__ == '__main__':
-    app.run_server(debug=True)
-    
 
-# Expose the server
-server = app.server
+# Write the startup snapshot of the templates and the cached default scenario
+def save_snapshot():
+    return snapshot.save({'templates': templates, 'caches': {cache.name: cache.entries() for cache in caches}})
+
+
+# Put the default scenario into the layout and write the startup snapshot if there was none. Run by
+# the server process before it serves, here or in the on_starting hook of gunicorn.conf.py, and not
+# on import, so the batch and the tests that import the app do not pay for it.
+def startup():
+    prewarm()
+    if not startup_snapshot:
+        save_snapshot()
+    metrics.startup_seconds['total'] = time.perf_counter() - started
+
+
+# Run the Dash app, or write the startup snapshot with `python cosolidation.py snapshot`. The scenario
+# table runs without the app with `python batch.py scenarios.csv`; `python cosolidation.py batch` is
+# the same command after loading the app.
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        import batch
+        batch.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'snapshot':
+        prewarm()
+        if not save_snapshot():
+            sys.exit('Set CONSOLIDATION_SNAPSHOT to the file of the startup snapshot')
+    else:
+        startup()
+        app.run_server(debug=True)
@@ -0,0 +1,36 @@
+import numpy as np
+from solver import (gamma_water, seconds_per_day, drainage_length, drain_patterns, radial_rate,
+                    combined_degree_of_consolidation, consolidation_time)
+
+
+# Drain spacings (m) of the design sweep
+spacings = np.round(np.arange(0.8, 4.0001, 0.05), 2)
+
+# Clay area (m²) served by one drain, per squared spacing
+drain_areas = {'triangular': np.sqrt(3) / 2, 'square': 1.0}
+
+
+# Degree of consolidation at the target time and time to the target degree of consolidation of every
+# pattern and spacing of the grid, as one (pattern × spacing) computation, with the largest spacing
+# of each pattern that reaches target_U within target_days
+def design_sweep(z2, z3, m_v, k, target_U=0.9, target_days=180, spacings=spacings, diameter=0.05, smear_ratio=2,
+                 permeability_ratio=2, ch_ratio=2, theory='hansbo'):
+    c_v = k / (m_v * gamma_water)
+    H = drainage_length(z2, z3)
+    patterns = list(drain_patterns)
+    spacings = np.asarray(spacings, dtype=float)
+    D = np.array([drain_patterns[pattern] for pattern in patterns])[:, None] * spacings
+    rate = radial_rate(c_v, D, diameter, smear_ratio, permeability_ratio, ch_ratio, theory)
+
+    U = combined_degree_of_consolidation(target_days * seconds_per_day, c_v, H, rate)
+    days = consolidation_time(target_U, c_v, H, rate) / seconds_per_day
+    reached = days <= target_days
+    largest = {pattern: float(spacings[np.flatnonzero(ok)[-1]]) if ok.any() else None
+               for pattern, ok in zip(patterns, reached)}
+    return {
+        'patterns': patterns, 'spacings': spacings, 'U': U, 'days': days,
+        'target_U': target_U, 'target_days': target_days, 'largest_spacing': largest,
+        # drains per 100 m² of the largest spacings, for comparing the patterns
+        'drains_per_100m2': {pattern: float(100 / (drain_areas[pattern] * spacing**2)) if spacing else None
+                             for pattern, spacing in largest.items()},
+    }
@@ -0,0 +1,209 @@
+import importlib.util
+import itertools
+import os
+import zipfile
+
+import flask
+import numpy as np
+from solver import (solve_layers, soil_profiles, time_curve, time_dependent, slider_times, seconds_per_day,
+                    curve_times)
+from stratigraphy import hydrostatic_pressure
+from batch import scenario_inputs, depth_nodes, inputs_profile
+from api import max_values
+
+# Parquet export is off without pyarrow, which is imported by the first Parquet export only
+parquet_available = importlib.util.find_spec('pyarrow') is not None
+
+
+# Streaming export of the results of a scenario, given as query parameters with the names of the batch
+# scenario table (see batch.scenario_inputs). The clay is solved once for all times, and the rows are
+# built and written in blocks of about export_bytes, so that the stress profiles of the whole grid are
+# never held at once; the whole export is bounded by the (time × depth) budget of a request of the
+# solve API.
+export_bytes = int(os.environ.get('CONSOLIDATION_EXPORT_BYTES', 16 * 2**20))
+formats = {'csv': 'text/csv', 'npz': 'application/zip', 'parquet': 'application/vnd.apache.parquet'}
+step_range = (0.001, 1.0)  # m, depth steps an export may ask for
+
+# Columns of the exports: one row per (time, depth) of the profiles, one per time of the settlement–time
+# curve. t is the slider position (percent of t_99), days the real time.
+profile_columns = ('t', 'days', 'depth', 'total_stress', 'pore_pressure', 'effective_stress',
+                   'excess_pore_pressure', 'accummultive_settelment')
+curve_columns = ('days', 'settelment', 'U')
+
+
+# Write target of the streamed files, handing out the bytes written since the last drain
+class ChunkBuffer:
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# Slider positions solved at once for an export, the rows of each with their work arrays fitting into
+# export_bytes
+def profile_frames(inputs, step):
+    return max(export_bytes // (8 * 4 * len(profile_columns) * depth_nodes(inputs, step)), 1)
+
+
+# Profile rows of a scenario at the slider positions, as blocks of columns. The clay solution of all
+# positions is solved in one go, since the finite differences, nonlinear clays and load histories march
+# through all times up to the last of a block, and sliced into the blocks. The stresses of the sand
+# layers come with zero excess pore pressure, and the accumulated settlement at a sand node is that of
+# the next clay node below it, zero below the lowest clay.
+def profile_chunks(inputs, times, step):
+    frames = profile_frames(inputs, step)
+    profile = inputs_profile(inputs)
+    clay = solve_layers(times, profile, inputs['delta_sigma'], inputs['tolerance'], inputs['method'],
+                        inputs['sublayers'], step, inputs['drains'], inputs['loading'], inputs['compression'])
+    for start in range(0, len(times), frames):
+        t = times[start:start + frames]
+        block = {key: value[start:start + frames] if key in time_dependent else value for key, value in clay.items()}
+        solution = soil_profiles(block, profile, inputs['delta_sigma'], inputs['water_table'], step)
+        depths, clay_nodes, z2_depth = solution['depths'], solution['clay'], solution['z2_depth']
+        excess = solution['pore_pressure'] - hydrostatic_pressure(depths, inputs['water_table'])
+        accummultive = solution['accummultive_settelment'][:, ::-1]  # clay nodes from the top down
+        # the node of the clay solution at or below each clay node of the grid, then at or below each depth
+        nodes = np.minimum(np.searchsorted(z2_depth, depths[clay_nodes]), len(z2_depth) - 1)
+        below = np.append(nodes, len(z2_depth))[np.searchsorted(clay_nodes, np.arange(len(depths)))]
+        settelment = np.concatenate((accummultive, np.zeros((len(t), 1))), axis=1)[:, below]
+        yield {
+            't': np.repeat(t, len(depths)),
+            'days': np.repeat(t / 100 * solution['t_99'] / seconds_per_day, len(depths)),
+            'depth': np.tile(depths, len(t)),
+            'total_stress': solution['total_stress'].ravel(),
+            'pore_pressure': solution['pore_pressure'].ravel(),
+            'effective_stress': solution['effective_stress'].ravel(),
+            'excess_pore_pressure': excess.ravel(),
+            'accummultive_settelment': settelment.ravel(),
+        }
+
+
+# Settlement–time curve of a scenario, as one block of columns
+def curve_chunks(inputs, step):
+    profile = inputs_profile(inputs)
+    curve = time_curve(lambda t: solve_layers(t, profile, inputs['delta_sigma'], inputs['tolerance'], inputs['method'],
+                                              inputs['sublayers'], step, inputs['drains'], inputs['loading'],
+                                              inputs['compression']))
+    yield {'days': curve['seconds'] / seconds_per_day, 'settelment': curve['settelment'], 'U': curve['U']}
+
+
+# CSV text of the blocks, with a header row. Each block is formatted by one % operation over all of its
+# values, which is about twice as fast as np.savetxt row by row.
+def csv_stream(columns, chunks):
+    yield (','.join(columns) + '\n').encode()
+    row = ','.join(['%.10g'] * len(columns)) + '\n'
+    for chunk in chunks:
+        values = np.column_stack([chunk[column] for column in columns])
+        yield ((row * len(values)) % tuple(values.ravel().tolist())).encode()
+
+
+# NPZ archive of one structured array of the rows, named after the export. The array header needs the
+# number of rows up front; the records follow block by block.
+def npz_stream(columns, chunks, rows, name):
+    buffer = ChunkBuffer()
+    dtype = np.dtype([(column, '<f8') for column in columns])
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        with archive.open(f'{name}.npy', 'w', force_zip64=True) as entry:
+            np.lib.format.write_array_header_2_0(entry, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                         'fortran_order': False, 'shape': (rows,)})
+            for chunk in chunks:
+                records = np.empty(len(chunk[columns[0]]), dtype=dtype)
+                for column in columns:
+                    records[column] = chunk[column]
+                entry.write(records.tobytes())
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+# Parquet file of the rows, one row group per block
+def parquet_stream(columns, chunks):
+    import pyarrow
+    import pyarrow.parquet
+    buffer = ChunkBuffer()
+    schema = pyarrow.schema([(column, pyarrow.float64()) for column in columns])
+    writer = pyarrow.parquet.ParquetWriter(buffer, schema)
+    for chunk in chunks:
+        writer.write_table(pyarrow.table({column: chunk[column] for column in columns}, schema=schema))
+        yield buffer.drain()
+    writer.close()
+    yield buffer.drain()
+
+
+# Streamed response of the blocks in the format
+def export_response(columns, chunks, rows, name, file_format):
+    if file_format == 'csv':
+        stream = csv_stream(columns, chunks)
+    elif file_format == 'npz':
+        stream = npz_stream(columns, chunks, rows, name)
+    else:
+        stream = parquet_stream(columns, chunks)
+    return flask.Response(stream, mimetype=formats[file_format],
+                          headers={'Content-Disposition': f'attachment; filename={name}.{file_format}'})
+
+
+# Slider positions of the t query parameter: "all" (default) for the time sweep, or a comma-separated list
+def export_times(value):
+    if value in (None, '', 'all'):
+        return slider_times.astype(float)
+    times = np.array([float(t) for t in value.split(',')])
+    if not np.all((times >= 0) & (times <= 100)):
+        raise ValueError('The slider positions t are between 0 and 100')
+    return times
+
+
+# Scenario inputs and depth step of the query parameters
+def export_inputs(args):
+    step = float(args.get('step', 0.05))
+    if not step_range[0] <= step <= step_range[1]:
+        raise ValueError(f'The depth step is between {step_range[0]} and {step_range[1]} m')
+    return scenario_inputs(args.to_dict(), step), step
+
+
+# View of /export/profiles.<format> and /export/settlement.<format>
+def export(kind, file_format):
+    if kind not in ('profiles', 'settlement') or file_format not in formats:
+        flask.abort(404)
+    if file_format == 'parquet' and not parquet_available:
+        return flask.jsonify(error='Parquet export needs pyarrow installed on the server'), 501
+    try:
+        inputs, step = export_inputs(flask.request.args)
+        # the settlement–time curve also solves the final state
+        times = export_times(flask.request.args.get('t')) if kind == 'profiles' else np.append(curve_times, 100)
+        values = len(times) * depth_nodes(inputs, step)
+        if values > max_values:
+            return flask.jsonify(error=f'The export would hold {values} values, at most {max_values}'), 413
+        if kind == 'profiles':
+            chunks, columns = profile_chunks(inputs, times, step), profile_columns
+        else:
+            chunks, columns = curve_chunks(inputs, step), curve_columns
+        # the first block is solved before the response starts, so that bad inputs give an error status
+        first = next(chunks)
+    except (ValueError, TypeError, KeyError) as error:
+        return flask.jsonify(error=f'{type(error).__name__}: {error}'), 400
+    rows = len(first[columns[0]])
+    if kind == 'profiles':
+        frames = min(profile_frames(inputs, step), len(times))
+        rows = rows // frames * len(times)
+    return export_response(columns, itertools.chain([first], chunks), rows, kind, file_format)
+
+
+# Add the /export/profiles.<format> and /export/settlement.<format> routes to the Flask server of the app
+def register(server):
+    server.add_url_rule('/export/<kind>.<file_format>', 'export.export', export)
@@ -0,0 +1,691 @@
+import base64
+import copy
+import numpy as np
+import plotly.graph_objs as go
+from dash import Patch
+from solver import gamma_water, sweep_frames, seconds_per_day, drain_patterns
+
+
+# Soil layers with their specified patterns
+layers = [
+    {'layer_id': '1', 'name': 'Sand-1', 'color': 'rgb(244,164,96)', 'fillpattern': {'shape': '.'}},  # Dots for Sand
+    {'layer_id': '2', 'name': 'Clay', 'color': 'rgb(139,69,19)', 'fillpattern': {'shape': ''}},  # Dashes for Clay
+    {'layer_id': '3', 'name': 'Sand-2', 'color': 'rgb(244,164,96)', 'fillpattern': {'shape': '.'}},  # Dots for Sand
+]
+
+num_arrows = 10  # arrows of the distributed load on the foundation
+plot_tolerance = 1e-3  # largest deviation of the sampled profiles, relative to the axis range (about a pixel)
+webgl_points = 1000  # traces with more points are drawn with WebGL
+
+# Trace and annotation positions in the figure templates
+pressure_traces = {'total_stress': len(layers), 'pore_pressure': len(layers) + 1,
+                   'effective_stress': len(layers) + 2, 'initial_pore_pressure': len(layers) + 3}
+settelment_trace = len(layers)
+water_table_trace = 2 * len(layers) + 2  # after the layer boxes and lines, the water line and the load line
+load_annotation = len(layers) + num_arrows + 1
+pressure_band = len(layers) + 4  # P5, P95 and P50 traces of the Monte Carlo realizations, after the profiles
+settelment_band = len(layers) + 1
+settelment_time_band = 4
+band_rows = (0, 2, 1)  # rows of the P5, P95 and P50 percentiles in the order of the band traces
+
+
+# Axis style of the pressure and settlement graphs
+def profile_axis(hoverformat):
+    return dict(
+        title_standoff=4,
+        showticklabels=True,
+        ticks='outside',
+        ticklen=5,
+        minor_ticks="inside",
+        showline=True,
+        linewidth=2,
+        linecolor='black',
+        showgrid=False,
+        gridwidth=1,
+        gridcolor='lightgrey',
+        mirror=True,
+        hoverformat=hoverformat
+    )
+
+
+legend = dict(
+    yanchor="top",  # Align the bottom of the legend box
+    y=1,               # Position the legend at the bottom inside the plot
+    xanchor="right",    # Align the right edge of the legend box
+    x=1,               # Position the legend at the right inside the plot
+    font= dict(size=10),  # Adjust font size
+    bgcolor="rgba(255, 255, 255, 0.7)",  # Optional: Semi-transparent white background
+    bordercolor="black",                 # Optional: Border color
+    borderwidth=1                        # Optional: Border width
+)
+
+
+# P5–P95 band and P50 line of the Monte Carlo realizations, hidden until there are any. The P95 trace
+# fills to the P5 trace before it, across the depth (fill 'tonextx') or the time axis ('tonexty').
+def add_band(fig, color, fillcolor, fill, hovertemplate):
+    for percentile, line, extra in (
+            ('P5', dict(color=color, width=0), dict(showlegend=False)),
+            ('P95', dict(color=color, width=0), dict(fill=fill, fillcolor=fillcolor)),
+            ('P50', dict(color=color, width=2, dash='dash'), {})):
+        fig.add_trace(go.Scatter(
+            x=[],
+            y=[],
+            mode='lines',
+            line=line,
+            name=percentile,
+            visible=False,
+            hovertemplate=f'{percentile}: {hovertemplate}<extra></extra>',
+            **extra
+        ))
+
+
+# Static structure of the soil layers figure, built once; the positions come from soil_layers_changes
+def soil_layers_template():
+    soil_layers_fig = go.Figure()
+    for layer in layers:
+        soil_layers_fig.add_trace(go.Scatter(
+            x=[0, 0, 1, 1],  # Create a rectangle-like shape
+            y=[0, 0, 0, 0],
+            fill='toself',
+            fillcolor=layer['color'],  # Transparent background to see the pattern
+            line=dict(width=1, color='black'),
+            name=layer['name'],
+            showlegend=False,
+            hoverinfo='skip',  # Skip the hover info for these layers
+            fillpattern=layer['fillpattern']  # Use the specified fill pattern
+        ))
+
+        # Add a line at the top and bottom of each layer
+        soil_layers_fig.add_trace(go.Scatter(
+            x=[0, 1],  # Start at -1 and end at 1
+            y=[0, 0],  # Horizontal line at the top of the layer
+            mode='lines',
+            line=dict(color='black', width=1, dash='dash'),
+            showlegend=False,  # Hide legend for these lines
+            hoverinfo='skip'  # Skip the hover info for these line
+        ))
+
+        # Add the annotation for the layer name
+        soil_layers_fig.add_annotation(
+            x=0.4,  # Position the text slightly to the right of the layer box
+            y=0,
+            text=layer['name'],  # Layer name as text
+            font = dict(size=14, color="white", weight='bold'),
+            showarrow=False,  # Don't show an arrow
+            xanchor='left',  # Anchor text to the left
+            yanchor='middle'  # Center text vertically with the midpoint
+        )
+
+    # Add a line at the water table
+    soil_layers_fig.add_trace(go.Scatter(
+        x=[0, 1],  # Start at -1 and end at 1
+        y=[0, 0],  # Horizontal line at the top of the layer
+        mode='lines',
+        line=dict(color='blue', width=2, dash='dot'),
+        showlegend=False,  # Hide legend for these lines
+        hoverinfo='skip'  # Skip the hover info for these line
+    ))
+
+    # adding arrowas distributed load on the foundation
+    for i in range(0, int(num_arrows+1)):
+        soil_layers_fig.add_annotation(
+            x=i*0.1, # x-coordinate of arrow head
+            y=0, # y-coordinate of arrow head
+            ax=i*0.1, # x-coordinate of tail
+            ay=0, # y-coordinate of tail
+            xref="x",
+            yref="y",
+            axref="x",
+            ayref="y",
+            showarrow=True,
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=2,
+            arrowcolor="black"
+        )
+
+    soil_layers_fig.add_trace(go.Scatter(
+        x=[0, 1],
+        y=[0, 0],  # Horizontal line at the top of the layer
+        mode='lines',
+        line=dict(color='black', width=4, dash='solid'),
+        showlegend=False,  # Hide legend for these lines
+        hoverinfo='skip'  # Skip the hover info for these line
+    ))
+
+    #  adding text for the load delta sigma
+    soil_layers_fig.add_annotation(
+        x=0.5,  # Position the text slightly to the right of the layer box
+        y=0,
+        text='Δσ',  # Layer name as text
+        font = dict(size=14, color="black", weight='bold'),
+        showarrow=False,  # Don't show an arrow
+        xanchor='center',  # Anchor text to the left
+        yanchor='middle'  # Center text vertically with the midpoint
+    )
+    # add a line for the water table
+    soil_layers_fig.add_trace(go.Scatter(
+        x=[0, 1],  # Start at -1 and end at 1
+        y=[0, 0],  # Horizontal line at the top of the layer
+        mode='lines',
+        line=dict(color='blue', width=2, dash='dot'),
+        showlegend=False,  # Hide legend for these lines
+        hoverinfo='skip'  # Skip the hover info for these line
+    ))
+
+    soil_layers_fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title= dict(text='Width (m)', font=dict(weight='bold')),
+        xaxis=dict(
+            range=[0, 1],  # Adjusting the x-range as needed
+                showticklabels=False,
+                showgrid=False,
+                title=None,
+                zeroline=False
+        ),
+        yaxis_title= dict(text='Depth (m)', font=dict(weight='bold')),
+        yaxis=dict(
+            range=[1, 0],  # Adjusted range for the y-axis (inverted for depth)
+            showticklabels=True,
+            ticks='outside',
+            title_standoff=4,
+            ticklen=5,
+            minor_ticks="inside",
+            showline=True,
+            linewidth=2,
+            linecolor='black',
+            zeroline=False,
+        ),
+        margin=dict(l=20, r=10),
+    )
+    return soil_layers_fig.to_dict()
+
+
+# Static structure of the pressure figure, built once; the profiles come from pressure_changes
+def pressure_template():
+    pressure_fig = go.Figure()
+    for layer in layers:
+        # Add a line at the bottom of each layer other graph
+        pressure_fig.add_trace(go.Scatter(
+            x=[0, 1],
+            y=[0, 0],
+            mode='lines',
+            line=dict(color='black', width=1, dash='dash'),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+
+    pressure_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='red', width=3 ),
+        name='Total Vertical Stress, σ<sub>T</sub>'
+    ))
+
+    pressure_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='blue', width=3 ),
+        name='Pore Water Pressure, u'
+    ))
+
+    pressure_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='green', width=3 ),
+        name='Effective Vertical Stress, σ\''
+    ))
+
+    # draw the original pore water pressuer line
+    pressure_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='blue', width=3, dash='dot'),
+        name='Initial Pore Water Pressure, u<sub>0</sub>'
+    ))
+    add_band(pressure_fig, 'blue', 'rgba(0,0,255,0.2)', 'tonextx', 'u = %{x:.2f} kPa')
+
+    pressure_fig.update_layout(
+        xaxis_title=dict(text='Stress/pressure (kPa)', font=dict(weight='bold')),
+        plot_bgcolor='white',
+        xaxis=dict(range=[0, 1], side='top', zeroline=False, **profile_axis(".2f")),
+        yaxis_title=dict(text='Depth (m)', font=dict(weight='bold')),
+        yaxis=dict(range=[1, 0], zeroline=True, zerolinecolor= "black", **profile_axis(".3f")),
+        legend=legend,
+        margin=dict(l=10, r=10),
+    )
+    return pressure_fig.to_dict()
+
+
+# Static structure of the settlement figure, built once; the profile comes from settelment_changes
+def settelment_template():
+    settelment_fig = go.Figure()
+    for layer in layers:
+        # Add a line at the bottom of each layer other graph
+        settelment_fig.add_trace(go.Scatter(
+            x=[0, 1],  # Start at -1 and end at 1
+            y=[0, 0],  # Horizontal line at the top of the layer
+            mode='lines',
+            line=dict(color='black', width=1, dash='dash'),
+            showlegend=False,  # Hide legend for these lines
+            hoverinfo='skip'  # Skip the hover info for these line
+        ))
+
+    settelment_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='red', width=3 ),
+        name='Accumultive primary consolidation settelment, 𝜌'
+    ))
+    add_band(settelment_fig, 'red', 'rgba(255,0,0,0.2)', 'tonextx', '𝜌 = %{x:.2f} mm')
+
+    # adding text to show U value at the middle of Clay layer
+    settelment_fig.add_annotation(
+        x=0,  # Position the text slightly to the right of the layer box
+        y=0,
+        text='',  # Layer name as text
+        font = dict(size=14, color="red", weight='bold'),
+        showarrow=False,  # Don't show an arrow
+        xanchor='center',  # Anchor text to the left
+        bgcolor="yellow",
+        yanchor='middle'  # Center text vertically with the midpoint
+    )
+
+    settelment_fig.update_layout(
+        xaxis_title=dict(text='Primary consolidation settelment (mm)', font=dict(weight='bold')),
+        plot_bgcolor='white',
+        xaxis=dict(range=[0, 1], side='top', zeroline=False, **profile_axis(".2f")),
+        yaxis_title=dict(text='Depth (m)', font=dict(weight='bold')),
+        yaxis=dict(range=[1, 0], zeroline=True, zerolinecolor= "black", **profile_axis(".2f")),
+        legend=legend,
+        margin=dict(l=10, r=10),
+    )
+    return settelment_fig.to_dict()
+
+
+# Static structure of the settlement–time figure, built once; the curve comes from settelment_time_changes
+def settelment_time_template():
+    settelment_time_fig = go.Figure()
+    settelment_time_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='red', width=3),
+        name='Primary consolidation settelment, 𝜌',
+        hovertemplate='t = %{x:.3g} days<br>𝜌 = %{y:.2f} mm<br>U = %{customdata:.1f}%<extra></extra>'
+    ))
+
+    # vertical line at t_99
+    settelment_time_fig.add_trace(go.Scatter(
+        x=[1, 1],
+        y=[0, 0],
+        mode='lines',
+        line=dict(color='black', width=1, dash='dash'),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    # settlement record and fitted curve of the back-analysis
+    settelment_time_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='markers',
+        marker=dict(color='black', size=6, symbol='circle-open'),
+        name='Measured settelment',
+        hovertemplate='t = %{x:.3g} days<br>𝜌 = %{y:.2f} mm<extra></extra>'
+    ))
+    settelment_time_fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        line=dict(color='black', width=2, dash='dot'),
+        name='Fitted settelment',
+        hovertemplate='t = %{x:.3g} days<br>𝜌 = %{y:.2f} mm<extra></extra>'
+    ))
+    add_band(settelment_time_fig, 'red', 'rgba(255,0,0,0.2)', 'tonexty',
+             't = %{x:.3g} days<br>𝜌 = %{y:.2f} mm<br>U = %{customdata:.1f}%')
+
+    settelment_time_fig.add_annotation(
+        x=0,
+        y=0,
+        text='t<sub>99</sub>',
+        font=dict(size=12, color='black'),
+        showarrow=False,
+        xanchor='left',
+        yanchor='top'
+    )
+
+    settelment_time_fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title=dict(text='Time (days)', font=dict(weight='bold')),
+        xaxis=dict(type='log', exponentformat='power', **profile_axis(".3g")),
+        yaxis_title=dict(text='Settelment (mm)', font=dict(weight='bold')),
+        yaxis=dict(range=[1, 0], zeroline=False, **profile_axis(".2f")),
+        # degree of consolidation as a second scale of the same curve
+        yaxis2=dict(title=dict(text='U (%)', font=dict(weight='bold')), overlaying='y', side='right',
+                    range=[100, 0], showline=True, linewidth=2, linecolor='black', ticks='outside', showgrid=False),
+        legend=legend,
+        margin=dict(l=10, r=10, t=10),
+    )
+    return settelment_time_fig.to_dict()
+
+
+# Static structure of the drain design figure, built once; the sweep comes from drain_design_changes.
+# A point of a pattern's curve picks that pattern and spacing.
+def drain_design_template():
+    drain_design_fig = go.Figure()
+    for pattern, color in zip(drain_patterns, ('darkorange', 'purple')):
+        drain_design_fig.add_trace(go.Scatter(
+            x=[],
+            y=[],
+            mode='lines+markers',
+            marker=dict(size=4),
+            line=dict(color=color, width=2),
+            name=f'{pattern.capitalize()} pattern',
+            hovertemplate='s = %{x:.2f} m<br>t = %{y:.3g} days<br>U at target = %{customdata:.1f}%<extra></extra>'
+        ))
+
+    # target time
+    drain_design_fig.add_trace(go.Scatter(
+        x=[0, 1],
+        y=[0, 0],
+        mode='lines',
+        line=dict(color='black', width=1, dash='dash'),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+
+    drain_design_fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title=dict(text='Drain spacing (m)', font=dict(weight='bold')),
+        xaxis=dict(**profile_axis(".2f")),
+        yaxis_title=dict(text='Time to target U (days)', font=dict(weight='bold')),
+        yaxis=dict(type='log', exponentformat='power', **profile_axis(".3g")),
+        legend=dict(legend, x=0, xanchor='left'),
+        margin=dict(l=10, r=10, t=10),
+    )
+    return drain_design_fig.to_dict()
+
+
+# Boundaries of the layers for the thicknesses z1, z2, z3
+def layer_bounds(z1, z2, z3):
+    tops = np.array([0, z1, z1 + z2])
+    return tops, tops + np.array([z1, z2, z3])
+
+
+# Changes of the soil layers template for the geometry, as (path, value) pairs
+def soil_layers_changes(z1, z2, z3, water_table):
+    total_depth = z1 + z2 + z3
+    y_top = -0.1*total_depth
+    tops, bottoms = layer_bounds(z1, z2, z3)
+
+    changes = []
+    for i, (top, bottom) in enumerate(zip(tops, bottoms)):
+        visible = bool(bottom - top > 0)
+        changes += [
+            (('data', 2*i, 'y'), [top, bottom, bottom, top]),
+            (('data', 2*i, 'visible'), visible),
+            (('data', 2*i + 1, 'y'), [top, top]),
+            (('data', 2*i + 1, 'visible'), visible),
+            (('layout', 'annotations', i, 'y'), (top + bottom) / 2),  # Midpoint of the layer
+            (('layout', 'annotations', i, 'visible'), visible),
+        ]
+    for i in range(0, int(num_arrows+1)):
+        changes.append((('layout', 'annotations', len(layers) + i, 'ay'), 0.9*y_top))
+    changes += [
+        (('layout', 'annotations', load_annotation, 'y'), y_top),
+        (('data', water_table_trace, 'y'), [water_table, water_table]),
+        (('layout', 'yaxis', 'range'), [total_depth, y_top]),
+    ]
+    return changes
+
+
+# Depth samples whose straight-line interpolation stays within the tolerances of the traces.
+# Points on straight parts of the profiles (the sand layers, mostly) are left out; the points are
+# split Douglas–Peucker style where the deviation from the chord is largest.
+def adaptive_samples(profiles, tolerances):
+    profiles = np.asarray(profiles, dtype=float)
+    tolerances = np.maximum(np.asarray(tolerances, dtype=float), np.finfo(float).tiny)[:, None]
+    n = profiles.shape[1]
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    segments = [(0, n - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        weight = np.arange(1, last - first) / (last - first)
+        chord = profiles[:, [first]] * (1 - weight) + profiles[:, [last]] * weight
+        deviation = np.max(np.abs(profiles[:, first + 1:last] - chord) / tolerances, axis=0)
+        split = np.argmax(deviation)
+        if deviation[split] > 1:
+            split += first + 1
+            keep[split] = True
+            segments += [(first, split), (split, last)]
+    return np.flatnonzero(keep)
+
+
+# Plotly typed array of the values, sent as base64 instead of a list of JSON floats
+def typed_array(values, dtype='f4'):
+    values = np.ascontiguousarray(values, dtype='<' + dtype)
+    return {'dtype': dtype, 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+
+
+# Trace type for the number of points, WebGL for long traces
+def trace_type(n):
+    return 'scattergl' if n > webgl_points else 'scatter'
+
+
+# Sampled stress profiles of a solution frame, as typed arrays
+def pressure_frame(result):
+    profiles = [result['total_stress'], result['pore_pressure'], result['effective_stress']]
+    x_max = 1.2 * max(max(result['total_stress']), max(result['pore_pressure']), max(result['effective_stress']))
+    depth_max = max(result['depths'][-1], np.finfo(float).eps)
+    samples = adaptive_samples(profiles + [result['depths']], [plot_tolerance * x_max] * 3 + [plot_tolerance * depth_max])
+    frame = {key: typed_array(profile[samples]) for key, profile in zip(pressure_traces, profiles)}
+    frame.update({'depths': typed_array(result['depths'][samples]), 'x_max': x_max, 'type': trace_type(len(samples))})
+    return frame
+
+
+# Sampled settlement profile of a solution frame, as typed arrays
+def settelment_frame(result):
+    accummultive_settelment = result['accummultive_settelment']
+    depths = np.sort(result['z2_depth'])[::-1]
+    x_max = 1.2 * max(accummultive_settelment)
+    depth_range = max(depths[0] - depths[-1], np.finfo(float).eps)
+    samples = adaptive_samples([accummultive_settelment, depths], [plot_tolerance * x_max, plot_tolerance * depth_range])
+    return {'accummultive_settelment': typed_array(accummultive_settelment[samples]),
+            'depths': typed_array(depths[samples]), 'x_max': x_max, 'type': trace_type(len(samples)),
+            'U': float(result['U']), 'label_x': 0.3*max(accummultive_settelment)}
+
+
+# Changes of the pressure template for a solution frame, as (path, value) pairs
+def pressure_changes(result, z1, z2, z3, water_table):
+    total_depth = z1 + z2 + z3
+    y_top = -0.1*total_depth
+    frame = pressure_frame(result)
+    x_max = frame['x_max']
+
+    changes = [(('data', i, 'x'), [0, x_max]) for i in range(len(layers))]
+    changes += [(('data', i, 'y'), [bottom, bottom]) for i, bottom in enumerate(layer_bounds(z1, z2, z3)[1])]
+    for key in ('total_stress', 'pore_pressure', 'effective_stress'):
+        changes += [(('data', pressure_traces[key], 'x'), frame[key]),
+                    (('data', pressure_traces[key], 'y'), frame['depths']),
+                    (('data', pressure_traces[key], 'type'), frame['type'])]
+    changes += [
+        (('data', pressure_traces['initial_pore_pressure'], 'x'), [0, (total_depth - water_table) * gamma_water]),
+        (('data', pressure_traces['initial_pore_pressure'], 'y'), [water_table, total_depth]),
+        (('layout', 'xaxis', 'range'), [0, x_max]),
+        (('layout', 'yaxis', 'range'), [total_depth, y_top]),
+    ]
+    return changes
+
+
+# Changes of the settlement template for a solution frame, as (path, value) pairs
+def settelment_changes(result, z1, z2, z3):
+    total_depth = z1 + z2 + z3
+    y_top = -0.1*total_depth
+    frame = settelment_frame(result)
+    x_max = frame['x_max']
+
+    changes = [(('data', i, 'x'), [0, x_max]) for i in range(len(layers))]
+    changes += [(('data', i, 'y'), [bottom, bottom]) for i, bottom in enumerate(layer_bounds(z1, z2, z3)[1])]
+    changes += [
+        (('data', settelment_trace, 'x'), frame['accummultive_settelment']),
+        (('data', settelment_trace, 'y'), frame['depths']),
+        (('data', settelment_trace, 'type'), frame['type']),
+        # adding text to show U value at the middle of Clay layer
+        (('layout', 'annotations', 0, 'x'), frame['label_x']),
+        (('layout', 'annotations', 0, 'y'), 0.8*(z1 + z2/2)),
+        (('layout', 'annotations', 0, 'text'), f"U = {result['U']*100:.0f}%"),
+        (('layout', 'xaxis', 'range'), [0, x_max]),
+        (('layout', 'yaxis', 'range'), [total_depth, y_top]),
+    ]
+    return changes
+
+
+# Changes of the settlement–time template for a settlement–time curve, as (path, value) pairs
+def settelment_time_changes(curve):
+    days = curve['seconds'] / seconds_per_day
+    t_99 = curve['t_99'] / seconds_per_day
+    y_max = 1.05 * curve['final_settelment']
+    return [
+        (('data', 0, 'x'), typed_array(days)),
+        (('data', 0, 'y'), typed_array(curve['settelment'])),
+        (('data', 0, 'customdata'), typed_array(100 * curve['U'])),
+        (('data', 1, 'x'), [t_99, t_99]),
+        (('data', 1, 'y'), [0, float(y_max)]),
+        (('layout', 'annotations', 0, 'x'), float(np.log10(t_99))),  # log axes take the exponent
+        (('layout', 'annotations', 0, 'y'), 0),
+        (('layout', 'xaxis', 'range'), [float(np.log10(days[0])), float(np.log10(days[-1]))]),
+        (('layout', 'yaxis', 'range'), [float(y_max), 0]),
+        (('layout', 'yaxis', 'autorange'), False),
+        (('layout', 'yaxis2', 'range'), [105, 0]),
+    ]
+
+
+# Changes of the settlement–time template for a back-analysis of a settlement record (days, mm),
+# the fitted curve drawn at the times of the settlement–time curve
+def back_analysis_changes(days, settelment, fitted_days, fitted_settelment):
+    return [
+        (('data', 2, 'x'), typed_array(days)),
+        (('data', 2, 'y'), typed_array(settelment)),
+        (('data', 3, 'x'), typed_array(fitted_days)),
+        (('data', 3, 'y'), typed_array(fitted_settelment)),
+        (('layout', 'yaxis', 'autorange'), 'reversed'),  # to show the record and the calculated curve
+    ]
+
+
+# Changes of the three band traces from the index on, for (3 × n) percentiles along x or y
+def band_changes(index, name, x, y, customdata=None):
+    changes = []
+    for j, row in enumerate(band_rows):
+        changes += [
+            (('data', index + j, 'x'), typed_array(x[row] if np.ndim(x) == 2 else x)),
+            (('data', index + j, 'y'), typed_array(y[row] if np.ndim(y) == 2 else y)),
+            (('data', index + j, 'visible'), True),
+        ]
+        if customdata is not None:
+            changes.append((('data', index + j, 'customdata'), typed_array(customdata[row])))
+    changes += [(('data', index + 1, 'name'), f'{name}, P5–P95'), (('data', index + 2, 'name'), f'{name}, P50')]
+    return changes
+
+
+# Changes hiding the three band traces from the index on
+def hidden_band_changes(index):
+    return [(('data', index + j, 'visible'), False) for j in range(len(band_rows))]
+
+
+# Changes of the pressure template for the uncertainty bands of monte_carlo.uncertainty_bands
+def pressure_band_changes(bands, water_table):
+    pore_pressure = bands['excess'] + np.maximum(bands['depths'] - water_table, 0) * gamma_water
+    return band_changes(pressure_band, f"u at {bands['time'] / seconds_per_day:.3g} days", pore_pressure, bands['depths'])
+
+
+# Changes of the settlement template for the uncertainty bands; the axis takes the larger of x_max of
+# the deterministic profile and the P95 profile
+def settelment_band_changes(bands, x_max):
+    x_max = max(x_max, 1.2 * float(np.max(bands['accummultive_settelment'])))
+    changes = band_changes(settelment_band, f"𝜌 at {bands['time'] / seconds_per_day:.3g} days",
+                           bands['accummultive_settelment'], np.sort(bands['depths'])[::-1])
+    changes += [(('data', i, 'x'), [0, x_max]) for i in range(len(layers))]
+    changes.append((('layout', 'xaxis', 'range'), [0, x_max]))
+    return changes
+
+
+# Changes of the settlement–time template for the uncertainty bands, the U scale following the
+# settlement scale of the deterministic final settlement
+def settelment_time_band_changes(bands):
+    final_settelment = max(float(bands['final_settelment']), np.finfo(float).tiny)
+    y_max = 1.05 * max(final_settelment, float(np.max(bands['settelment'])))
+    changes = band_changes(settelment_time_band, '𝜌', bands['seconds'] / seconds_per_day, bands['settelment'],
+                           100 * bands['U'])
+    changes += [
+        (('layout', 'yaxis', 'range'), [y_max, 0]),
+        (('layout', 'yaxis', 'autorange'), False),
+        (('layout', 'yaxis2', 'range'), [100 * y_max / final_settelment, 0]),
+    ]
+    return changes
+
+
+# Changes of the drain design template for a design sweep of drains.design_sweep
+def drain_design_changes(design):
+    spacings = design['spacings']
+    changes = []
+    for i, pattern in enumerate(design['patterns']):
+        changes += [
+            (('data', i, 'x'), typed_array(spacings)),
+            (('data', i, 'y'), typed_array(design['days'][i])),
+            (('data', i, 'customdata'), typed_array(100 * design['U'][i])),
+        ]
+    changes += [
+        (('data', len(design['patterns']), 'x'), [float(spacings[0]), float(spacings[-1])]),
+        (('data', len(design['patterns']), 'y'), [design['target_days'], design['target_days']]),
+    ]
+    return changes
+
+
+# Sampled pressure graph frames of all slider positions, sent to the browser once per scenario
+def pressure_sweep_store(sweep):
+    return [pressure_frame(frame) for frame in sweep_frames(sweep)]
+
+
+# Sampled settlement graph frames of all slider positions, sent to the browser once per scenario
+def settelment_sweep_store(clay):
+    return [settelment_frame(frame) for frame in sweep_frames(clay)]
+
+
+# Partial property update of a figure in the browser from (path, value) pairs
+def patch_figure(changes):
+    figure = Patch()
+    for path, value in changes:
+        target = figure
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return figure
+
+
+# Full figure from a template and a Patch of patch_figure, for figures put into the layout
+def apply_patch(template, patch):
+    changes = []
+    for operation in patch.to_plotly_json()['operations']:
+        if operation['operation'] != 'Assign':
+            raise ValueError(f"Unsupported patch operation {operation['operation']}")
+        changes.append((operation['location'], operation['params']['value']))
+    return apply_changes(template, changes)
+
+
+# Full figure from a template and (path, value) pairs, for use outside of the browser
+def apply_changes(template, changes):
+    figure = copy.deepcopy(template)
+    for path, value in changes:
+        target = figure
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return figure
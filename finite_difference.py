@@ -0,0 +1,126 @@
+import numpy as np
+
+
+# Constants
+gamma_water = 10  # kN/m³ for water
+growth = 1.1  # ratio of two successive time steps
+startup_steps = 2  # implicit Euler steps before Crank–Nicolson, to damp the load step at t = 0
+
+
+# Solve the tridiagonal systems a x[i-1] + b x[i] + c x[i+1] = d by parallel cyclic reduction.
+# Every reduction level eliminates the neighbours at distance s = 1, 2, 4, ... for all rows at once,
+# so the solve takes log2(n) vectorized steps instead of a loop over the nodes. d may hold several
+# right-hand sides as columns.
+def tridiagonal_solve(a, b, c, d):
+    a, b, c, d = (np.array(x, dtype=float) for x in (a, b, c, d))
+    a[0] = 0
+    c[-1] = 0
+    columns = (slice(None),) + (None,) * (d.ndim - 1)
+    n = len(b)
+    s = 1
+    while s < n:
+        # rows beyond the ends are identity rows with zero right-hand side
+        a_lower, b_lower, c_lower, d_lower = (shift(x, s, fill) for x, fill in ((a, 0), (b, 1), (c, 0), (d, 0)))
+        a_upper, b_upper, c_upper, d_upper = (shift(x, -s, fill) for x, fill in ((a, 0), (b, 1), (c, 0), (d, 0)))
+        alpha = -a / b_lower
+        gamma = -c / b_upper
+        d = d + alpha[columns] * d_lower + gamma[columns] * d_upper
+        b = b + alpha * c_lower + gamma * a_upper
+        a = alpha * a_lower
+        c = gamma * c_upper
+        s *= 2
+    return d / b[columns]
+
+
+# Rows of x moved down by s (up for negative s), filling the vacated rows
+def shift(x, s, fill):
+    shifted = np.full_like(x, fill)
+    if s > 0:
+        shifted[s:] = x[:-s]
+    else:
+        shifted[:s] = x[-s:]
+    return shifted
+
+
+# Compressibility and permeability of the elements between the clay nodes. The clay below the
+# sublayers, given as (thickness, m_v, k) rows from the top of the clay, takes the default m_v and k.
+def element_properties(node_depths, m_v, k, sublayers=()):
+    middle = (node_depths[:-1] + node_depths[1:]) / 2 - node_depths[0]
+    m_v_e = np.full(len(middle), m_v, dtype=float)
+    k_e = np.full(len(middle), k, dtype=float)
+    bottoms = np.cumsum([thickness for thickness, _, _ in sublayers])
+    for top, bottom, (_, m_v_i, k_i) in zip(np.concatenate(([0], bottoms)), bottoms, sublayers):
+        inside = (middle >= top) & (middle < bottom)
+        m_v_e[inside] = m_v_i
+        k_e[inside] = k_i
+    return m_v_e, k_e
+
+
+# Value of element properties at the nodes, averaged over the two elements next to a node
+def node_average(x_e):
+    if len(x_e) == 0:
+        return np.zeros(1)
+    return np.concatenate(([x_e[0]], (x_e[:-1] + x_e[1:]) / 2, [x_e[-1]]))
+
+
+# Equivalent homogeneous m_v and k of the layered clay: thickness averaged m_v, harmonic mean k
+def equivalent_properties(m_v_e, k_e):
+    return np.mean(m_v_e), len(k_e) / np.sum(1 / k_e)
+
+
+# Time levels from 0 to the largest requested time, growing geometrically from a step that resolves
+# diffusion over one element, and passing through every requested time
+def time_levels(times, dt_min):
+    if len(times) == 0 or np.max(times) <= 0:
+        return np.unique(np.concatenate(([0], times)))
+    t_max = np.max(times)
+    n = max(int(np.ceil(np.log(t_max / dt_min * (growth - 1) + 1) / np.log(growth))), 1)
+    grid = dt_min * (growth**np.arange(1, n + 1) - 1) / (growth - 1)
+    return np.unique(np.concatenate(([0], grid[grid < t_max], times)))
+
+
+# Excess pore pressure of a clay layer with node-wise properties, by Crank–Nicolson finite
+# differences on the storage equation m_v γw ∂u/∂t = ∂/∂z (k ∂u/∂z). The clay drains at the top,
+# and at the bottom if bottom_drained. All times (s) are reached in one march; returns a
+# (time × node) array.
+def consolidate(node_depths, m_v_e, k_e, delta_sigma, times, bottom_drained=True):
+    times = np.asarray(times, dtype=float)
+    n = len(node_depths)
+    u = np.full((len(times), n), float(delta_sigma))
+    if n < 2:
+        return u
+
+    # lumped storage of the nodes and conductance of the elements
+    h = np.diff(node_depths)
+    storage_e = m_v_e * gamma_water * h
+    storage = np.concatenate(([0], storage_e / 2)) + np.concatenate((storage_e / 2, [0]))
+    conductance = k_e / h
+    stiffness_diagonal = np.concatenate(([0], conductance)) + np.concatenate((conductance, [0]))
+    stiffness_lower = -np.concatenate(([0], conductance))
+    stiffness_upper = -np.concatenate((conductance, [0]))
+
+    drained = np.zeros(n, dtype=bool)
+    drained[0] = True
+    drained[-1] = bottom_drained
+
+    c_v_e = k_e / (m_v_e * gamma_water)
+    levels = time_levels(times[times > 0], 0.5 * np.min(h**2 / c_v_e))
+    output = np.searchsorted(levels, times)
+
+    current = np.full(n, float(delta_sigma))
+    current[drained] = 0
+    u[output == 0] = delta_sigma  # the load is carried by the pore water at first
+    for step, dt in enumerate(np.diff(levels), start=1):
+        theta = 1 if step <= startup_steps else 0.5
+        rhs = storage * current - (1 - theta) * dt * (
+            stiffness_diagonal * current
+            + stiffness_lower * np.concatenate(([0], current[:-1]))
+            + stiffness_upper * np.concatenate((current[1:], [0])))
+        a = theta * dt * stiffness_lower
+        b = storage + theta * dt * stiffness_diagonal
+        c = theta * dt * stiffness_upper
+        # drained nodes keep u = 0
+        a[drained], b[drained], c[drained], rhs[drained] = 0, 1, 0, 0
+        current = tridiagonal_solve(a, b, c, rhs)
+        u[output == step] = current
+    return u
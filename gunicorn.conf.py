@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+
+# Production server settings, used by `gunicorn cosolidation:server` (see the Procfile)
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Import the app and numpy once in the master process, the workers are forked from it
+preload_app = True
+
+# Computed results are shared by all workers through an on-disk cache. This is read when the app
+# is imported, so it has to be set here, before the preloading.
+os.environ.setdefault('CONSOLIDATION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'consolidation-cache'))
+
+# Templates and default scenario of the first page, written at the first start (or at build time with
+# `python cosolidation.py snapshot`) and read by every later start
+os.environ.setdefault('CONSOLIDATION_SNAPSHOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot.pkl'))
+
+
+# Fill the layout with the default scenario in the master process, after the preloading and before
+# the workers are forked, so they all start with it
+def on_starting(server):
+    import cosolidation
+    cosolidation.startup()
@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import tempfile
+
+from dash import DiskcacheManager
+from dash.long_callback.managers import BaseLongCallbackManager
+
+import snapshot
+
+
+# Background jobs of heavy analyses, run by the background callbacks of Dash in processes of their own,
+# with their progress and results in a cache on the local disk, so that no web worker waits for them.
+# They are off without diskcache and the multiprocess and psutil it runs on.
+directory = os.environ.get('CONSOLIDATION_JOB_DIR', os.path.join(tempfile.gettempdir(), 'consolidation-jobs'))
+expire = int(os.environ.get('CONSOLIDATION_JOB_EXPIRE', 7 * 24 * 3600))  # s, results kept by their inputs
+niceness = int(os.environ.get('CONSOLIDATION_JOB_NICENESS', 10))  # priority of the jobs below the web workers
+available = all(importlib.util.find_spec(name) for name in ('diskcache', 'multiprocess', 'psutil'))
+
+
+# DiskcacheManager that opens its cache, and imports diskcache, multiprocess and psutil with it, when
+# the first job starts instead of when the app is imported
+class LazyDiskcacheManager(DiskcacheManager):
+    def __init__(self, directory, cache_by=None, expire=None):
+        self.directory = directory
+        self.expire = expire
+        self._handle = None
+        BaseLongCallbackManager.__init__(self, cache_by)
+
+    @property
+    def handle(self):
+        if self._handle is None:
+            import diskcache
+            self._handle = diskcache.Cache(self.directory)
+        return self._handle
+
+    # the job functions are registered with the callbacks at import, and take the cache when they run
+    def make_job_fn(self, fn, progress, key=None):
+        def job_fn(*args):
+            return DiskcacheManager.make_job_fn(self, fn, progress, key)(*args)
+        return job_fn
+
+
+# Manager of the background callbacks, caching the result of a job by the hash of its inputs and the
+# version of the code (see snapshot.version), or None without diskcache
+def job_manager():
+    if not available:
+        return None
+    return LazyDiskcacheManager(directory, cache_by=[snapshot.version], expire=expire)
+
+
+manager = job_manager()
+
+
+# Lower the scheduling priority of the job process, so that the interactive requests of the web
+# workers keep their share of the CPU while heavy jobs run
+def lower_priority():
+    if hasattr(os, 'nice') and niceness:
+        os.nice(niceness)
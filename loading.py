@@ -0,0 +1,66 @@
+import csv
+import io
+
+import numpy as np
+
+
+# Load history on the foundation as a tuple of (day, load kPa) points. The load varies linearly
+# between the points, jumps where two points share a day, is zero before the first point and stays
+# at the last one. ((0, 100),) is the instant load of the app; ((0, 0), (30, 50), (60, 50), (60, 100))
+# a ramp to 50 kPa over a month, then a second stage of 50 kPa a month later.
+def load_history(points):
+    history = tuple((float(day), float(load)) for day, load in points)
+    if not history:
+        raise ValueError('A load history needs at least one point of time (days) and load (kPa)')
+    if any(day < 0 for day, _ in history):
+        raise ValueError('The days of a load history start at zero')
+    return tuple(sorted(history, key=lambda point: point[0]))  # stable, keeping the order of a jump
+
+
+# Load history of the complete rows of the load table, None without any
+def parse_history(rows):
+    points = []
+    for row in rows or []:
+        values = [row.get(key) for key in ('day', 'load')]
+        if all(isinstance(value, (int, float)) for value in values) and values[0] >= 0:
+            points.append(values)
+    return load_history(points) if points else None
+
+
+# Load history of (days, kPa) columns in CSV text; rows that are not two numbers, such as a header,
+# are skipped
+def read_history(text):
+    points = []
+    for row in csv.reader(io.StringIO(text)):
+        try:
+            points.append((float(row[0]), float(row[1])))
+        except (IndexError, ValueError):
+            continue
+    return load_history(points)
+
+
+# Load increments of the history: the jumps (day, kPa) and the changes of the loading rate
+# (day, kPa/day), whose step and ramp responses superpose to the response to the history
+def load_changes(history):
+    days, loads = np.array(history, dtype=float).T
+    before = np.concatenate(([0], loads[:-1]))
+    same_day = np.concatenate(([True], np.diff(days) == 0))
+    jumps = np.where(same_day, loads - before, 0)
+
+    # rate of each interval between points, zero before the first and after the last
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(np.diff(days) > 0, np.diff(loads) / np.diff(days), 0)
+    rates = np.concatenate(([0], rates, [0]))
+    rate_changes = np.diff(rates)
+
+    step = jumps != 0
+    ramp = rate_changes != 0
+    return days[step], jumps[step], days[ramp], rate_changes[ramp]
+
+
+# Load (kPa) of the history at the days, which may be an array
+def applied_load(history, days):
+    jump_days, jumps, ramp_days, rate_changes = load_changes(history)
+    days = np.asarray(days, dtype=float)[..., None]
+    return (np.sum(jumps * (days >= jump_days), axis=-1)
+            + np.sum(rate_changes * np.maximum(days - ramp_days, 0), axis=-1))[()]
@@ -0,0 +1,138 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import flask
+from cache import caches
+
+
+# Stage timing of the callbacks, on if the CONSOLIDATION_METRICS environment variable is set. When
+# off, the stages are no-op context managers and the callbacks are not wrapped at all.
+enabled = os.environ.get('CONSOLIDATION_METRICS', '').lower() not in ('', '0', 'false', 'no')
+
+duration_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+size_buckets = (1e3, 3e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7)
+
+
+# Prometheus histogram with a fixed set of label names
+class Histogram:
+    def __init__(self, name, description, buckets, labels):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, (counts, total) in series:
+            labels = ','.join(f'{label}="{value}"' for label, value in zip(self.labels, key))
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {counts[-1]}')
+        return lines
+
+
+stage_seconds = Histogram('consolidation_stage_seconds', 'Duration of the stages of the callbacks',
+                          duration_buckets, ('callback', 'stage'))
+payload_bytes = Histogram('consolidation_payload_bytes', 'Size of the callback responses',
+                          size_buckets, ('callback',))
+
+# Callback running in the current thread, to label the stages
+_current = threading.local()
+
+# Seconds from the start of the app module to the end of each startup stage, recorded even if the
+# callbacks are not timed
+startup_seconds = {}
+
+
+# Context manager timing a stage of the running callback
+def stage(name):
+    if not enabled:
+        return nullcontext()
+    return _timed_stage(name)
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, callback=getattr(_current, 'callback', ''), stage=name)
+
+
+# Decorator timing a callback as a whole. The end time is kept in the request context, so that the
+# serialization of the output by Dash and the response size are measured in observe_response.
+def timed(callback):
+    def decorator(function):
+        if not enabled:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            _current.callback = callback
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                stage_seconds.observe(end - start, callback=callback, stage='total')
+                if flask.has_request_context():
+                    flask.g.consolidation_callback = (callback, end)
+                _current.callback = ''
+        return wrapper
+    return decorator
+
+
+# Prometheus text of the histograms and the cache counters
+def render():
+    lines = stage_seconds.render() + payload_bytes.render()
+    stats = [cache.stats() for cache in caches]
+    for counter, description in (('hits', 'Cache hits'), ('misses', 'Cache misses'), ('evictions', 'Cache evictions'),
+                                 ('shared_hits', 'Shared cache hits'), ('shared_misses', 'Shared cache misses'),
+                                 ('shared_evictions', 'Shared cache evictions')):
+        name = f'consolidation_cache_{counter}_total'
+        samples = [f'{name}{{cache="{s["name"]}"}} {s[counter]}' for s in stats if counter in s]
+        if samples:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter'] + samples
+    lines += ['# HELP consolidation_cache_size Entries in the cache', '# TYPE consolidation_cache_size gauge']
+    lines += [f'consolidation_cache_size{{cache="{s["name"]}"}} {s["size"]}' for s in stats]
+    lines += ['# HELP consolidation_startup_seconds Time from the start of the app to the end of a startup stage',
+              '# TYPE consolidation_startup_seconds gauge']
+    lines += [f'consolidation_startup_seconds{{stage="{name}"}} {seconds}' for name, seconds in startup_seconds.items()]
+    return '\n'.join(lines) + '\n'
+
+
+# Add the /metrics route to the Flask server of the app, and the response measurement if the
+# callbacks are timed. The cache counters and the startup time are served either way.
+def register(server):
+    if enabled:
+        @server.after_request
+        def observe_response(response):
+            callback = flask.g.pop('consolidation_callback', None)
+            if callback:
+                name, end = callback
+                stage_seconds.observe(time.perf_counter() - end, callback=name, stage='serialize')
+                payload_bytes.observe(len(response.get_data()), callback=name)
+            return response
+
+    @server.route('/metrics')
+    def metrics():
+        return flask.Response(render(), mimetype='text/plain; version=0.0.4')
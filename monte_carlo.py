@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from solver import (gamma_water, default_tolerance, n_modes, drainage_length, time_factor, normalized_excess,
+                    series_degree_of_consolidation, erfc_approximation, curve_times)
+
+
+# Realizations of the homogeneous clay with uncertain k, m_v and Δσ. Each input is sampled around its
+# deterministic value with a coefficient of variation; lognormal inputs take the value as their median,
+# so that the P50 bands follow the deterministic curves.
+distributions = ('normal', 'lognormal', 'uniform')
+percentiles = (5, 50, 95)
+default_samples = 10000
+max_samples = 100000
+profile_nodes = 101  # clay depths of the sampled profiles
+band_times = curve_times[::2]  # times of the settlement–time bands
+chunk_bytes = int(os.environ.get('CONSOLIDATION_MC_BYTES', 256 * 2**20))  # work arrays of all chunks in flight
+workers = int(os.environ.get('CONSOLIDATION_MC_WORKERS', os.cpu_count() or 1))
+bins = 2048  # histogram bins of every output value, from which its percentiles are read
+
+
+# n samples of a positive input with the value, coefficient of variation and distribution
+def sample(rng, n, value, cov, distribution):
+    if distribution not in distributions:
+        raise ValueError(f'Unknown distribution {distribution!r}, expected one of {", ".join(distributions)}')
+    if distribution == 'lognormal':
+        values = value * np.exp(np.sqrt(np.log1p(cov**2)) * rng.standard_normal(n))
+    elif distribution == 'uniform':
+        values = value * (1 + np.sqrt(3) * cov * rng.uniform(-1, 1, n))
+    else:
+        values = value * (1 + cov * rng.standard_normal(n))
+    return np.maximum(values, np.finfo(float).tiny)  # the tails below zero are cut off
+
+
+# Bytes of the work arrays of one sample: the decay of the modes, the image terms of the short-time
+# solution at every depth, the modes of the degree of consolidation at every band time, and the outputs
+# with their bin indices
+def sample_bytes(nodes, times):
+    return 8 * (n_modes + nodes * (2 + 4 * 20) + 12 * times + 2 * (2 * nodes + 2 * times + 1))
+
+
+# Rows and value range of the outputs of the realizations, the range holding every sample
+def output_ranges(z2, m_v, delta_sigma):
+    settelment = 1000 * np.max(m_v * delta_sigma) * z2
+    return {
+        'excess': (profile_nodes, (0, np.max(delta_sigma))),
+        'accummultive_settelment': (profile_nodes, (0, settelment * profile_nodes / (profile_nodes - 1))),
+        'settelment': (len(band_times), (0, settelment)),
+        'U': (len(band_times), (0, 1)),
+        'U_at_time': (1, (0, 1)),
+    }
+
+
+# (value × sample) outputs of a chunk of samples, in the rows of output_ranges: the pore pressure and
+# settlement profiles at the time (s), the settlement–time curves and the degree of consolidation
+def realize(start, stop, seconds, Z, H, z2, m_v, k, delta_sigma, tolerance):
+    m_v, k, delta_sigma = m_v[start:stop], k[start:stop], delta_sigma[start:stop]
+    c_v = k / (m_v * gamma_water)
+    T_v = c_v * seconds / H**2
+    u = np.ones((stop - start, len(Z)))
+    u[np.isinf(T_v)] = 0  # the final state
+    active = (T_v > 0) & np.isfinite(T_v)
+    if active.any():
+        u[active] = normalized_excess(Z, T_v[active], tolerance, erfc_approximation)
+    excess = delta_sigma[:, None] * u
+    settelment = 1000 * (delta_sigma[:, None] - excess) * m_v[:, None] * z2 / (len(Z) - 1)
+    U = series_degree_of_consolidation(c_v[:, None] * band_times / H**2)
+    return np.concatenate((excess.T, np.cumsum(np.sort(settelment, axis=-1)[:, ::-1], axis=-1).T,
+                           1000 * (m_v * delta_sigma * z2) * U.T, U.T, series_degree_of_consolidation(T_v)[None]))
+
+
+# (value × bin) counts of the (value × sample) outputs over bins equal bins from low to high of each
+# value; values outside the range fall into the end bins
+def bin_counts(values, low, high):
+    width = (high - low) / bins
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index = np.where(width[:, None] > 0, (values - low[:, None]) / width[:, None], 0)
+    index = np.clip(np.nan_to_num(index), 0, bins - 1).astype(np.intp) + bins * np.arange(len(values))[:, None]
+    return np.bincount(index.ravel(), minlength=len(values) * bins).reshape(len(values), bins)
+
+
+# (percentile × value) percentiles of the values of the bin counts, interpolated linearly in their bins
+def histogram_percentiles(counts, low, high, q=percentiles):
+    width = (high - low) / bins
+    cumulative = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+    result = np.empty((len(q), len(counts)))
+    for i, rank in enumerate(np.asarray(q)[:, None] / 100 * cumulative[:, -1]):
+        b = np.minimum(np.sum(cumulative < rank[:, None], axis=1), bins - 1)
+        before = cumulative[rows, b] - counts[rows, b]
+        fraction = np.clip((rank - before) / np.maximum(counts[rows, b], 1), 0, 1)
+        result[i] = low + (b + fraction) * width
+    return result
+
+
+# P5, P50 and P95 of the clay at the slider position t (percent of the deterministic t_99, the
+# position 100 being the final state as in solver.slider_times) over the realizations. The chunks
+# run on the worker threads, sharing chunk_bytes; numpy releases the interpreter lock in the array
+# operations, so they run in parallel. Each chunk is reduced to histogram counts of its outputs, so
+# the memory does not grow with the samples. progress(done, total) is called as the chunks finish.
+def uncertainty_bands(t, z1, z2, z3, delta_sigma, m_v, k, samples=default_samples,
+                      k_cov=1.0, k_distribution='lognormal', m_v_cov=0.2, m_v_distribution='lognormal',
+                      delta_sigma_cov=0.1, delta_sigma_distribution='normal', seed=0, tolerance=default_tolerance,
+                      progress=None):
+    samples = int(min(max(samples, 1), max_samples))
+    rng = np.random.default_rng(seed)
+    k_samples = sample(rng, samples, k, k_cov, k_distribution)
+    m_v_samples = sample(rng, samples, m_v, m_v_cov, m_v_distribution)
+    delta_sigma_samples = sample(rng, samples, delta_sigma, delta_sigma_cov, delta_sigma_distribution)
+
+    H = drainage_length(z2, z3)
+    t_99 = time_factor(t, H, m_v, k)[1]
+    seconds = np.inf if t >= 100 else t / 100 * t_99
+    depths = np.linspace(z1, z1 + z2, profile_nodes)
+    Z = (depths - z1) / H
+
+    ranges = output_ranges(z2, m_v_samples, delta_sigma_samples)
+    low, high = (np.concatenate([np.full(n, bound[i], dtype=float) for n, bound in ranges.values()])
+                 for i in (0, 1))
+    counts = np.zeros((len(low), bins), dtype=np.int64)
+    extremes = np.array([np.full(len(low), np.inf), np.full(len(low), -np.inf)])  # smallest and largest values
+    lock = threading.Lock()
+
+    def reduce(start, stop):
+        values = realize(start, stop, seconds, Z, H, z2, m_v_samples, k_samples, delta_sigma_samples, tolerance)
+        chunk = bin_counts(values, low, high)
+        with lock:
+            counts[...] += chunk
+            extremes[0] = np.minimum(extremes[0], values.min(axis=1))
+            extremes[1] = np.maximum(extremes[1], values.max(axis=1))
+
+    workers_used = max(workers, 1)
+    step = max(chunk_bytes // workers_used // sample_bytes(profile_nodes, len(band_times)), 1)
+    with ThreadPoolExecutor(workers_used) as executor:
+        chunks = [executor.submit(reduce, start, min(start + step, samples)) for start in range(0, samples, step)]
+        for done, chunk in enumerate(chunks, start=1):
+            chunk.result()
+            if progress:
+                progress(done, len(chunks))
+    rows = np.cumsum([0] + [n for n, _ in ranges.values()])
+    # the percentiles lie between the extreme values, which makes them exact for values without scatter
+    values = np.clip(histogram_percentiles(counts, low, high), *extremes)
+    bands = {key: values[:, start:stop] for key, start, stop in zip(ranges, rows[:-1], rows[1:])}
+    bands.update({
+        'depths': depths, 'seconds': band_times, 't': t, 'time': seconds, 'samples': samples,
+        'final_settelment': 1000 * m_v * delta_sigma * z2,
+    })
+    return bands
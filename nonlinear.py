@@ -0,0 +1,151 @@
+import numpy as np
+from finite_difference import tridiagonal_solve
+from stratigraphy import three_layer_profile, total_stress, hydrostatic_pressure
+
+
+# Constants
+gamma_water = 10  # kN/m³ for water
+min_stress = 1.0  # kPa, effective stress floor of the logarithmic compression lines
+error_tolerance = 2e-3  # local error of a time step, relative to Δσ
+newton_tolerance = 1e-6  # Newton update of the excess pore pressure, relative to Δσ
+newton_iterations = 25
+final_U = 0.9999  # the march ends at this degree of consolidation of the settlement
+max_steps = 2000
+safety = 0.9  # step size controller: fraction of the optimal step, and the bounds of its change
+step_ratios = (0.2, 5.0)
+
+
+# Compression of the clay for the nonlinear method as a tuple: compression index Cc, recompression
+# index Cr, initial void ratio e0, preconsolidation pressure σ'p (kPa, the clay being normally
+# consolidated where it is below the initial effective stress), permeability change index Ck
+# (None for a constant k) and the initial effective stress at the top and the bottom of the clay
+def compression_parameters(Cc, Cr, e0, preconsolidation=0, ck=None, sigma_top=0, sigma_bottom=0):
+    if not (Cc > 0 and Cr > 0 and e0 > 0):
+        raise ValueError('Cc, Cr and e0 of the nonlinear method must be positive')
+    if ck is not None and ck <= 0:
+        raise ValueError('Ck must be positive, or None for a constant permeability')
+    return (float(Cc), float(Cr), float(e0), float(preconsolidation or 0), float(ck) if ck else None,
+            float(sigma_top), float(sigma_bottom))
+
+
+# Initial effective stress at the top and the bottom of the clay of the Sand-1 / Clay / Sand-2 column
+def initial_effective_stress(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, water_table):
+    profile = three_layer_profile(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3)
+    depths = np.array([z1, z1 + z2], dtype=float)
+    sigma = total_stress(profile, depths, 0, water_table) - hydrostatic_pressure(depths, water_table)
+    return float(sigma[0]), float(sigma[1])
+
+
+# Vertical strain from the initial effective stress sigma_0 to sigma, along the recompression line up
+# to the preconsolidation pressure sigma_p and the virgin compression line above it
+def strain(sigma, sigma_0, sigma_p, Cc, Cr, e0):
+    sigma = np.maximum(sigma, min_stress)
+    return (Cr * np.log10(np.minimum(sigma, sigma_p) / sigma_0) + Cc * np.log10(np.maximum(sigma, sigma_p) / sigma_p)) / (1 + e0)
+
+
+# Coefficient of volume compressibility m_v = dε/dσ' at the effective stress sigma
+def compressibility(sigma, sigma_p, Cc, Cr, e0):
+    sigma = np.maximum(sigma, min_stress)
+    return np.where(sigma < sigma_p, Cr, Cc) / ((1 + e0) * np.log(10) * sigma)
+
+
+# Excess pore pressure and strain at the clay nodes under the instant load delta_sigma, by BDF2
+# steps of variable size on γw ∂ε/∂t = ∂/∂z (k ∂u/∂z), the first step being implicit Euler, with
+# Newton iterations on each step. The step sizes follow the local error, estimated against the
+# Lagrange extrapolation of the last steps, so the steps grow as the solution smooths out; the march
+# ends at final_U of the final settlement. Returns the times (s), the (time × node) excess pore
+# pressure and strain, and the final strain.
+def consolidate_nonlinear(node_depths, k, delta_sigma, compression, bottom_drained=True):
+    Cc, Cr, e0, preconsolidation, ck, sigma_top, sigma_bottom = compression
+    n = len(node_depths)
+    h = np.diff(node_depths)
+    length = np.concatenate(([0], h / 2)) + np.concatenate((h / 2, [0]))  # clay thickness of each node
+    fraction = (node_depths - node_depths[0]) / max(node_depths[-1] - node_depths[0], np.finfo(float).tiny)
+    sigma_0 = np.maximum(sigma_top + (sigma_bottom - sigma_top) * fraction, min_stress)
+    sigma_p = np.maximum(preconsolidation, sigma_0)
+    final = strain(sigma_0 + delta_sigma, sigma_0, sigma_p, Cc, Cr, e0)
+    scale = abs(delta_sigma)
+
+    drained = np.zeros(n, dtype=bool)
+    drained[0] = True
+    drained[-1] = bottom_drained
+    u = np.full(n, float(delta_sigma))  # the load is carried by the pore water at first
+    if n < 2 or not np.any(final):
+        return np.array([0.0]), u[None], np.zeros((1, n)), final
+
+    def state(u):
+        sigma = sigma_0 + delta_sigma - u
+        return strain(sigma, sigma_0, sigma_p, Cc, Cr, e0), compressibility(sigma, sigma_p, Cc, Cr, e0)
+
+    # conductance k/h of the elements, the harmonic mean of the permeability at their nodes
+    def conductance(epsilon):
+        k_nodes = k * 10**(-(1 + e0) * epsilon / ck) if ck else np.full(n, float(k))
+        return 2 / (1 / k_nodes[:-1] + 1 / k_nodes[1:]) / h
+
+    def implicit_step(u, epsilon_old, dt):
+        u_new = u.copy()
+        for _ in range(newton_iterations):
+            epsilon, m_v = state(u_new)
+            K = conductance(epsilon)
+            lower = -np.concatenate(([0], K))
+            upper = -np.concatenate((K, [0]))
+            diagonal = -(lower + upper)
+            flux = diagonal * u_new + lower * np.concatenate(([0], u_new[:-1])) + upper * np.concatenate((u_new[1:], [0]))
+            residual = gamma_water * length * (epsilon_old - epsilon) + dt * flux
+            a, b, c = dt * lower, gamma_water * length * m_v + dt * diagonal, dt * upper
+            a[drained], b[drained], c[drained], residual[drained] = 0, 1, 0, u_new[drained]
+            update = tridiagonal_solve(a, b, c, -residual)
+            u_new = u_new + update
+            if np.max(np.abs(update)) < newton_tolerance * scale:
+                return u_new, True
+        return u_new, False
+
+    epsilon = state(u)[0]
+    times, pressures, strains = [0.0], [u], [epsilon]
+    total = np.sum(length * final)
+    # first step: diffusion over a tenth of the smallest element at the stiffest state
+    c_v = k / (compressibility(sigma_0 + delta_sigma, sigma_p, Cc, Cr, e0) * gamma_water)
+    dt = 0.1 * np.min(h)**2 / np.max(c_v)
+    for _ in range(max_steps):
+        if len(times) > 1:
+            # BDF2 with the step ratio ω to the last step, as an implicit Euler step from the
+            # weighted strain history over a shortened step
+            omega = dt / (times[-1] - times[-2])
+            a = (1 + 2 * omega) / (1 + omega)
+            history = ((1 + omega) * epsilon - omega**2 / (1 + omega) * strains[-2]) / a
+            u_new, converged = implicit_step(u, history, dt / a)
+        else:
+            u_new, converged = implicit_step(u, epsilon, dt)
+        if not converged:
+            dt *= step_ratios[0]
+            continue
+        # local error against the extrapolation of the last steps, with the error constant of the
+        # method (implicit Euler on the first step, BDF2 after it)
+        span = times[-1] - times[max(len(times) - 3, 0)]
+        predicted = extrapolate(times[-3:], pressures[-3:], times[-1] + dt)
+        error = dt / (dt + span) * np.sqrt(np.mean((u_new - predicted)[~drained]**2)) / scale if len(times) > 1 else 0
+        order = 2 if len(times) > 2 else 1
+        if error > error_tolerance:
+            dt *= max(step_ratios[0], safety * (error_tolerance / error)**(1 / (order + 1)))
+            continue
+        u = u_new
+        epsilon = state(u)[0]
+        times.append(times[-1] + dt)
+        pressures.append(u)
+        strains.append(epsilon)
+        if np.sum(length * epsilon) / total >= final_U:
+            break
+        dt *= min(step_ratios[1], safety * (error_tolerance / max(error, np.finfo(float).tiny))**(1 / (order + 1)))
+    return np.array(times), np.array(pressures), np.array(strains), final
+
+
+# Lagrange extrapolation of the values at the last times to the time t
+def extrapolate(times, values, t):
+    result = 0
+    for i, (t_i, value) in enumerate(zip(times, values)):
+        weight = 1
+        for j, t_j in enumerate(times):
+            if j != i:
+                weight *= (t - t_j) / (t_i - t_j)
+        result = result + weight * value
+    return result
@@ -0,0 +1,54 @@
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+
+import dash
+import numpy as np
+import plotly
+
+
+# Startup snapshot of the figure templates and the cached results of the default scenario, off unless
+# CONSOLIDATION_SNAPSHOT names the file. Writing it at build time (`python cosolidation.py snapshot`)
+# lets a new process skip building the templates and solving the default scenario.
+path = os.environ.get('CONSOLIDATION_SNAPSHOT')
+
+# Version of the code and the libraries the snapshot was written with: every module of the app makes
+# a snapshot stale when it changes
+def version():
+    digest = hashlib.sha256(f'{dash.__version__} {plotly.__version__} {np.__version__}'.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        with open(name, 'rb') as file:
+            digest.update(os.path.basename(name).encode())
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+# Contents of the snapshot, or None if there is none or it was written by other code
+def load():
+    if not path:
+        return None
+    try:
+        with open(path, 'rb') as file:
+            contents = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if contents.get('version') != version():
+        return None
+    return contents
+
+
+# Write the snapshot atomically; a read-only file system just leaves it out
+def save(contents):
+    if not path:
+        return False
+    try:
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(dict(contents, version=version()), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
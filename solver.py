@@ -0,0 +1,633 @@
+import hashlib
+import math
+import os
+import numpy as np
+from cache import LRUCache, normalize_key
+from finite_difference import consolidate, element_properties, equivalent_properties, node_average
+from stratigraphy import (three_layer_profile, table_profile, clay_units, depth_grid, total_stress,
+                          hydrostatic_pressure)
+from loading import load_changes, applied_load
+
+
+# Constants
+gamma_water = 10  # kN/m³ for water
+n_modes = 1000  # largest number of terms in the Fourier series of the excess pore pressure
+default_tolerance = 1e-6  # truncation error of the excess pore pressure, relative to Δσ
+superposition_bytes = 64 * 2**20  # (increment × time × depth) block of a load history summed at once
+response_nodes = 400  # times of the step response interpolated for a load history
+
+erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+# erfc to a relative error of 1.2e-7 in numpy operations only (Chebyshev fit of Numerical Recipes),
+# for the many time factors of the Monte Carlo realizations where math.erfc element by element is slow
+def erfc_approximation(x):
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    t = 1 / (1 + 0.5 * z)
+    poly = -1.26551223 + t*(1.00002368 + t*(0.37409196 + t*(0.09678418 + t*(-0.18628806 + t*(
+        0.27886807 + t*(-1.13520398 + t*(1.48851587 + t*(-0.82215223 + t*0.17087277))))))))
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = t * np.exp(-z*z + poly)
+    return np.where(x >= 0, result, 2 - result)
+
+# Spectral bases of the depth grids, bounded by CONSOLIDATION_BASIS_BYTES bytes in each process
+basis_cache = LRUCache('spectral_basis', maxsize=1024, shared=None,
+                       maxbytes=int(os.environ.get('CONSOLIDATION_BASIS_BYTES', 64 * 2**20)))
+
+# Time steps of the nonlinear clays, shared by their slider sweeps and settlement–time curves
+march_cache = LRUCache('nonlinear_march', shared=None)
+
+
+# Mode numbers of the Terzaghi series, M = π/2 (2m + 1)
+def mode_numbers(n=n_modes):
+    return np.pi/2 * (2 * np.arange(0, n) + 1)
+
+
+# Length of the drainage path of the clay layer
+def drainage_length(z2, z3):
+    # one-way drainage if there is no sand below the clay
+    if z3 == 0:
+        return z2
+    return z2/2
+
+
+# Time factor T_v for the slider position t (percent of t_99), t may be an array of positions
+def time_factor(t, H, m_v, k):
+    c_v = k/(m_v * gamma_water)
+    t_99 = (1.4832*(H)**2)/c_v
+    T_v = ((np.asarray(t)/100) * t_99 * c_v)/(H)**2
+    return c_v, t_99, T_v
+
+
+# Average degree of consolidation U for the time factor T_v
+def degree_of_consolidation(t, T_v):
+    t = np.asarray(t)
+    U = np.where((T_v >= 0) & (T_v < (1/12)), np.sqrt(4*T_v/3), 1 - (2/3)*np.exp((1/4)-(3*T_v)))
+    return np.where(t == 100, 1.0, U)[()]
+
+
+# Average degree of consolidation of the Terzaghi series for any array of time factors, exact to
+# rounding: the short-time solution 2√(T_v/π) below T_v = 0.05, where the image terms are below
+# exp(-1/T_v), and ten modes of the series above, where the next one is below exp(-50)
+def series_degree_of_consolidation(T_v):
+    T_v = np.maximum(np.asarray(T_v, dtype=float), 0)
+    flat = T_v.reshape(-1)
+    U = 2 * np.sqrt(flat / np.pi)
+    series = flat >= 0.05
+    M = mode_numbers(10)
+    U[series] = 1 - np.exp(-M**2 * flat[series][:, None]) @ (2 / M**2)  # the modes of the later times only
+    return U.reshape(T_v.shape)[()]
+
+
+# Diameter of the clay cylinder drained by one vertical drain, per drain spacing
+drain_patterns = {'triangular': 1.05, 'square': 1.128}
+drain_theories = ('barron', 'hansbo')
+
+
+# Vertical drains of solve_clay as a tuple: spacing (m), pattern, equivalent drain diameter d_w (m),
+# smear zone ratio d_s/d_w, permeability ratio k_h/k_s of the smear zone, ratio c_h/c_v and theory
+def drain_parameters(spacing, pattern='triangular', diameter=0.05, smear_ratio=2, permeability_ratio=2, ch_ratio=2,
+                     theory='hansbo'):
+    if pattern not in drain_patterns:
+        raise ValueError(f'Unknown drain pattern {pattern!r}, expected one of {", ".join(drain_patterns)}')
+    if theory not in drain_theories:
+        raise ValueError(f'Unknown drain theory {theory!r}, expected one of {", ".join(drain_theories)}')
+    return (float(spacing), pattern, float(diameter), float(smear_ratio), float(permeability_ratio), float(ch_ratio),
+            theory)
+
+
+# Drain function μ for the ratio n = D/d_w: Barron's ideal drain, or Hansbo's drain with a smear zone
+def drain_function(n, theory='hansbo', smear_ratio=2, permeability_ratio=2):
+    n = np.asarray(n, dtype=float)
+    if theory == 'barron':
+        return n**2 / (n**2 - 1) * np.log(n) - (3 * n**2 - 1) / (4 * n**2)
+    return np.log(n / smear_ratio) + permeability_ratio * np.log(smear_ratio) - 0.75
+
+
+# Rate λ (1/s) of the radial consolidation U_h = 1 - exp(-λ t) = 1 - exp(-8 T_h / μ), T_h = c_h t / D²,
+# for influence diameters D, which may be an array
+def radial_rate(c_v, D, diameter=0.05, smear_ratio=2, permeability_ratio=2, ch_ratio=2, theory='hansbo'):
+    D = np.asarray(D, dtype=float)
+    return 8 * ch_ratio * c_v / (D**2 * drain_function(D / diameter, theory, smear_ratio, permeability_ratio))
+
+
+# Rate of the radial consolidation of the drains of drain_parameters
+def drain_rate(c_v, drains):
+    spacing, pattern, *properties = drains
+    return radial_rate(c_v, drain_patterns[pattern] * spacing, *properties)
+
+
+# Degree of consolidation of vertical and radial drainage combined (Carrillo) at the times (s)
+def combined_degree_of_consolidation(seconds, c_v, H, rate):
+    seconds = np.asarray(seconds, dtype=float)
+    return 1 - (1 - series_degree_of_consolidation(c_v * seconds / H**2)) * np.exp(-rate * seconds)
+
+
+# Time (s) to the degree of consolidation U of vertical and radial drainage combined, for arrays of
+# rates, by bisection on the log of the time. Either drainage alone reaches U later, which bounds it.
+def consolidation_time(U, c_v, H, rate, iterations=60):
+    vertical = 2 * series_time_factor(U) * H**2 / c_v  # twice the estimate of the first mode
+    with np.errstate(divide='ignore'):
+        high = np.log(np.minimum(vertical, -np.log(1 - U) / np.asarray(rate, dtype=float)))
+    low = high - 30
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        done = combined_degree_of_consolidation(np.exp(middle), c_v, H, rate) >= U
+        high = np.where(done, middle, high)
+        low = np.where(done, low, middle)
+    return np.exp(high)[()]
+
+
+# Time factor of the Terzaghi series at the degree of consolidation U, inverting the two branches of
+# series_degree_of_consolidation, the second by its first mode only, which is a slight underestimate
+def series_time_factor(U):
+    U = np.asarray(U, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.where(U < 2 * np.sqrt(0.05 / np.pi), np.pi * U**2 / 4, -4 / np.pi**2 * np.log(np.pi**2 / 8 * (1 - U)))[()]
+
+
+# Number of Fourier modes whose truncation error stays below the tolerance, for each time factor.
+# Beyond mode N the terms shrink at least by q = exp(-2π²(N+1)T_v) from one to the next, so the
+# tail is bounded by the geometric series (2/M_N) exp(-M_N² T_v) / (1 - q). The bound falls with N,
+# so the smallest N is found by bisection, evaluating log2(n) modes instead of all n.
+def series_terms(T_v, tolerance=default_tolerance, n=n_modes):
+    T_v = np.asarray(T_v, dtype=float)
+
+    def converged(N):
+        M = np.pi/2 * (2 * N + 1)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return (2 / M) * np.exp(-M**2 * T_v) / (1 - np.exp(-2 * np.pi**2 * (N + 1) * T_v)) <= tolerance
+
+    low = np.ones(T_v.shape, dtype=int)
+    high = np.full(T_v.shape, n)
+    while np.any(low < high):
+        middle = (low + high) // 2
+        done = converged(middle)
+        high = np.where(done, middle, high)
+        low = np.where(done, low, middle + 1)
+    return high
+
+
+# Number of image terms of the short-time solution below the tolerance, for each time factor.
+# The terms from image n on are bounded by 4 erfc(n / √T_v).
+def image_terms(T_v, tolerance=default_tolerance, n=20, erfc=erfc):
+    K = np.arange(1, n + 1)
+    with np.errstate(divide='ignore'):
+        tail = 4 * erfc(K / np.sqrt(np.asarray(T_v, dtype=float)[..., None]))
+    return np.where((tail <= tolerance).any(axis=-1), K[np.argmax(tail <= tolerance, axis=-1)], n)
+
+
+# (modes × depth) basis (2/M) sin(M Z) of the Terzaghi series at the normalized depths Z = (z - z1)/H,
+# with at least n modes. The basis does not depend on time, so it is cached per depth grid; the mode
+# count is rounded up to a power of two, so that close truncations share one basis.
+def spectral_basis(Z, n):
+    Z = np.ascontiguousarray(Z, dtype=float)
+    modes = max(int(n), min(n_modes, 1 << max(int(n) - 1, 0).bit_length()))
+    key = (len(Z), hashlib.sha1(Z.tobytes()).hexdigest(), modes)
+
+    def compute():
+        M = mode_numbers(modes)
+        return (2 / M)[:, None] * np.sin(M[:, None] * Z)
+    return basis_cache.get_or_compute(key, compute)
+
+
+# Normalized excess pore pressure u/Δσ of the Terzaghi series, truncated after N[i] modes in frame i.
+# Only the decay exp(-M² T_v) depends on time, so the frames take one product with the cached basis.
+def fourier_series(Z, T_v, N):
+    M = mode_numbers(N.max())
+    decay = np.where(np.arange(len(M)) < N[:, None], np.exp(-M**2 * T_v[:, None]), 0)
+    return decay @ spectral_basis(Z, len(M))[:len(M)]  # (time × modes) · (modes × depth)
+
+
+# Normalized excess pore pressure u/Δσ of the short-time (erfc) solution with K[i] image pairs in frame i.
+# The layer drains at Z = 0 and Z = 2, which also holds for one-way drainage through symmetry about Z = 1.
+def short_time_solution(Z, T_v, K, erfc=erfc):
+    n = np.arange(K.max())
+    sign = np.where(n < K[:, None], (-1.0)**n, 0)[:, None, :]
+    root = 2 * np.sqrt(T_v)[:, None, None]
+    images = erfc((2*n + Z[:, None]) / root) + erfc((2*n + 2 - Z[:, None]) / root)
+    return 1 - np.sum(sign * images, axis=-1)
+
+
+# Normalized excess pore pressure u/Δσ at the normalized depths Z for the time factors T_v > 0.
+# Each time takes the cheaper of the Fourier series and the short-time solution at the tolerance.
+def normalized_excess(Z, T_v, tolerance=default_tolerance, erfc=erfc):
+    N = series_terms(T_v, tolerance)
+    K = image_terms(T_v, tolerance, erfc=erfc)
+    short = 2 * K < N
+    u = np.empty((len(T_v), len(Z)))
+    if (~short).any():
+        u[~short] = fourier_series(Z, T_v[~short], N[~short])
+    if short.any():
+        u[short] = short_time_solution(Z, T_v[short], K[short], erfc)
+    return u
+
+
+# Excess pore pressure at the clay depths, for one slider position or an array of them
+def excess_pore_pressure(clay_depths, z1, H, delta_sigma, T_v, t, tolerance=default_tolerance):
+    t = np.asarray(t)
+    T = np.broadcast_to(np.asarray(T_v, dtype=float), t.shape).ravel()
+    Z = (clay_depths - z1) / H
+    u = np.zeros((len(T), len(Z)))
+    u[(t == 0).ravel()] = 1  # the load is carried by the pore water at first
+
+    active = ((t != 0) & (t != 100)).ravel() & (T > 0)
+    if active.any():
+        u[active] = normalized_excess(Z, T[active], tolerance)
+    return delta_sigma * u.reshape(t.shape + Z.shape)
+
+
+# Excess pore pressure and settlement of the clay layer. t is a slider position or an array of
+# them; for an array, the time-dependent results get a leading time axis. method 'analytic' uses
+# the Terzaghi solution of the homogeneous clay, 'fdm' the finite differences solution of the
+# clay with its (thickness, m_v, k) sublayers. With vertical drains (see drain_parameters), the
+# radial consolidation combines with the vertical one after Carrillo, u = u_v (1 - U_h), and the
+# time slider follows t_99 of the combined drainage. With a load history (see loading.load_history)
+# in place of the instant load delta_sigma, see solve_staged_clay. method 'nonlinear' takes the
+# compression of the clay (see nonlinear.compression_parameters) in place of m_v, see
+# solve_nonlinear_clay.
+def solve_clay(t, z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+               sublayers=(), step=0.05, drains=None, loading=None, compression=None):
+    if method == 'nonlinear':
+        return solve_nonlinear_clay(t, z1, z2, z3, delta_sigma, m_v, k, compression, step)
+    if loading:
+        return solve_staged_clay(t, z1, z2, z3, loading, m_v, k, tolerance, method, sublayers, step, drains)
+    z2_depth = np.linspace(z1, z1+z2, num=int(z2/step)+1)
+
+    H = drainage_length(z2, z3)
+    if method == 'fdm':
+        m_v_e, k_e = element_properties(z2_depth, m_v, k, sublayers)
+        if len(m_v_e):
+            # the time slider follows t_99 of the equivalent homogeneous clay
+            m_v, k = equivalent_properties(m_v_e, k_e)
+    c_v, t_99, T_v = time_factor(t, H, m_v, k)
+    if drains:
+        rate = drain_rate(c_v, drains)
+        t_99 = consolidation_time(0.99, c_v, H, rate)
+        T_v = np.asarray(t) / 100 * t_99 * c_v / H**2
+        radial = np.exp(-rate * np.asarray(t) / 100 * t_99)[..., None]  # 1 - U_h
+
+    if method == 'fdm':
+        seconds = np.ravel(np.asarray(t) / 100 * t_99)
+        excess = consolidate(z2_depth, m_v_e, k_e, delta_sigma, seconds, bottom_drained=z3 != 0)
+        excess = np.where(np.asarray(t)[..., None] == 100, 0.0, excess.reshape(np.shape(t) + z2_depth.shape))
+        if drains:
+            excess = excess * radial
+        m_v_z2 = node_average(m_v_e) if len(m_v_e) else m_v
+        # compression of the clay, integrated with the trapezoidal rule over the nodes
+        weights = m_v_z2 * node_average(np.diff(z2_depth)) * np.where(np.isin(np.arange(len(z2_depth)),
+                                                                              (0, len(z2_depth) - 1)), 0.5, 1)
+        U = (1 - np.sum(excess * weights, axis=-1) / np.sum(delta_sigma * weights))[()]
+    else:
+        m_v_z2 = m_v
+        excess = excess_pore_pressure(z2_depth, z1, H, delta_sigma, T_v, t, tolerance)
+        if drains:
+            excess = excess * radial
+            # the exact series, as the combined t_99 is, instead of the approximation of U
+            U = np.where(np.asarray(t) == 100, 1.0, 1 - (1 - series_degree_of_consolidation(T_v)) * radial[..., 0])[()]
+        else:
+            U = degree_of_consolidation(t, T_v)
+    settelment_z2 = 1000*(delta_sigma-excess) * m_v_z2 * step
+    return {
+        'z2_depth': z2_depth,
+        'excess_pore_pressure': excess,
+        'settelment': settelment_z2,
+        'accummultive_settelment': np.cumsum(np.sort(settelment_z2, axis=-1)[..., ::-1], axis=-1),
+        'H': H, 'c_v': c_v, 't_99': t_99, 'T_v': T_v, 'U': U,
+    }
+
+
+# Clay solution of solve_clay under the instant load delta_sigma, from its solution under a unit load:
+# the linear methods are linear in the load, so the excess pore pressure and the settlement scale with
+# it, and U, t_99 and the time factors do not change. The accumulated settlement sorts the scaled
+# settlement again, as its order reverses under unloading.
+def scale_clay(clay, delta_sigma):
+    settelment = delta_sigma * clay['settelment']
+    return dict(clay, excess_pore_pressure=delta_sigma * clay['excess_pore_pressure'], settelment=settelment,
+                accummultive_settelment=np.cumsum(np.sort(settelment, axis=-1)[..., ::-1], axis=-1))
+
+
+# Excess pore pressure and settlement of the homogeneous clay with the Cc/Cr compression lines of
+# nonlinear.consolidate_nonlinear, under the instant load delta_sigma; sublayers, drains and load
+# histories are for the linear methods. The time slider follows t_99 of the settlement, the steps being
+# interpolated to the slider positions, and c_v is that of the linear clay with the same t_99. m_v only
+# sets the time scale of a clay that does not settle.
+def solve_nonlinear_clay(t, z1, z2, z3, delta_sigma, m_v, k, compression, step=0.05):
+    from nonlinear import consolidate_nonlinear
+    if compression is None:
+        raise ValueError('The nonlinear method needs the compression of the clay: Cc, Cr and e0')
+    z2_depth = np.linspace(z1, z1+z2, num=int(z2/step)+1)
+    H = drainage_length(z2, z3)
+    times, excess_steps, strain_steps, final = march_cache.get_or_compute(
+        normalize_key(z1, z2, z3, delta_sigma, k, step, compression),
+        lambda: consolidate_nonlinear(z2_depth, k, delta_sigma, compression, bottom_drained=z3 != 0))
+
+    lengths = node_average(np.diff(z2_depth)) * np.where(np.isin(np.arange(len(z2_depth)), (0, len(z2_depth) - 1)), 0.5, 1)
+    if len(times) > 1:
+        U_steps = np.minimum(np.maximum.accumulate(strain_steps @ lengths / np.sum(final * lengths)), 1)
+        t_99 = np.interp(0.99, U_steps, times)
+    else:
+        # a clay that does not settle keeps its initial state
+        t_99 = time_factor(0, H, m_v, k)[1]
+        times, U_steps = np.array([0, t_99]), np.ones(2)
+        excess_steps, strain_steps = np.repeat(excess_steps, 2, axis=0), np.repeat(strain_steps, 2, axis=0)
+    c_v = 1.4832 * H**2 / t_99
+
+    # linear interpolation between the steps around each time, the final state at the position 100
+    t = np.asarray(t)
+    seconds = np.ravel(t / 100 * t_99)
+    after = np.clip(np.searchsorted(times, seconds), 1, len(times) - 1)
+    before = after - 1
+    weight = np.clip((seconds - times[before]) / (times[after] - times[before]), 0, 1)[:, None]
+    final_state = (t == 100).ravel()[:, None]
+    excess = np.where(final_state, 0.0, (1 - weight) * excess_steps[before] + weight * excess_steps[after])
+    strain = np.where(final_state, final, (1 - weight) * strain_steps[before] + weight * strain_steps[after])
+    U = np.where(t == 100, 1.0, np.interp(seconds, times, U_steps).reshape(t.shape))[()]
+    excess = excess.reshape(t.shape + z2_depth.shape)
+    settelment_z2 = 1000 * strain.reshape(t.shape + z2_depth.shape) * step
+    return {
+        'z2_depth': z2_depth,
+        'excess_pore_pressure': excess,
+        'settelment': settelment_z2,
+        'accummultive_settelment': np.cumsum(np.sort(settelment_z2, axis=-1)[..., ::-1], axis=-1),
+        'H': H, 'c_v': c_v, 't_99': t_99, 'T_v': c_v * t / 100 * t_99 / H**2, 'U': U,
+    }
+
+
+# Sum over the load increments of changes[i] × response(times - change_times[i]), for the times from
+# each increment on. response maps an array of times since the increment to a (time × depth) array; the
+# (increment × time × depth) terms are summed in blocks of at most superposition_bytes.
+def superpose(times, change_times, changes, response, nodes):
+    total = np.zeros((len(times), nodes))
+    chunk = max(superposition_bytes // (8 * max(len(times) * nodes, 1)), 1)
+    for start in range(0, len(changes), chunk):
+        since = times - change_times[start:start + chunk, None]
+        active = since >= 0
+        terms = np.zeros(since.shape + (nodes,))
+        if active.any():
+            terms[active] = response(since[active])
+        total += np.tensordot(changes[start:start + chunk], terms, axes=1)
+    return total
+
+
+# Excess pore pressure and settlement of the clay layer under a load history, superposing the
+# responses to its load jumps (the step load solution of solve_clay) and to the changes of its
+# loading rate (the time integral of the step response). The slider covers the loading and t_99
+# after the last point of the history, which is returned as t_99.
+def solve_staged_clay(t, z1, z2, z3, history, m_v, k, tolerance=default_tolerance, method='analytic',
+                      sublayers=(), step=0.05, drains=None):
+    unit = solve_clay(0, z1, z2, z3, 1, m_v, k, tolerance, method, sublayers, step, drains)
+    z2_depth, H, c_v = unit['z2_depth'], unit['H'], unit['c_v']
+    Z = (z2_depth - z1) / H
+    end = history[-1][0] * seconds_per_day
+    span = end + unit['t_99']
+    seconds = np.asarray(t) / 100 * span
+    times = np.ravel(seconds)
+    jump_days, jumps, ramp_days, rate_changes = load_changes(history)
+    rate_changes = rate_changes / seconds_per_day  # kPa/s
+
+    def steps(since):
+        # the slider position 100 stands for the final state, so the times are kept off it
+        position = 100 * since / unit['t_99']
+        position = np.where(position == 100, np.nextafter(100, 0), position)
+        return solve_clay(position, z1, z2, z3, 1, m_v, k, tolerance, method, sublayers, step, drains)[
+            'excess_pore_pressure']
+
+    # step response on a geometric time grid and its time integral, the ramp response, by the
+    # trapezoidal rule, both interpolated linearly in time
+    longest = max(np.max(times), np.finfo(float).tiny)
+    grid = np.concatenate(([0], np.geomspace(longest * 1e-9, longest, response_nodes)))
+    grid_steps = steps(grid)
+    grid_ramps = np.concatenate((np.zeros((1, len(Z))), np.cumsum(
+        np.diff(grid)[:, None] * (grid_steps[1:] + grid_steps[:-1]) / 2, axis=0)))
+
+    def interpolate(values):
+        def response(since):
+            i = np.clip(np.searchsorted(grid, since), 1, len(grid) - 1)
+            w = ((since - grid[i - 1]) / (grid[i] - grid[i - 1]))[:, None]
+            return (1 - w) * values[i - 1] + w * values[i]
+        return response
+    # the Terzaghi series is cheap enough to take the step response at the exact times
+    step_response = interpolate(grid_steps) if method == 'fdm' else steps
+
+    excess = (superpose(times, jump_days * seconds_per_day, jumps, step_response, len(Z))
+              + superpose(times, ramp_days * seconds_per_day, rate_changes, interpolate(grid_ramps), len(Z)))
+    load = applied_load(history, times / seconds_per_day)
+    final = (np.ravel(t) == 100)
+    excess[final] = 0
+    load[final] = history[-1][1]
+    excess = excess.reshape(np.shape(t) + z2_depth.shape)
+    load = load.reshape(np.shape(t))
+
+    if method == 'fdm':
+        m_v_e = element_properties(z2_depth, m_v, k, sublayers)[0]
+        m_v_z2 = node_average(m_v_e) if len(m_v_e) else m_v
+    else:
+        m_v_z2 = m_v
+    settelment_z2 = 1000*(load[..., None] - excess) * m_v_z2 * step
+    # degree of consolidation of the settlement under the final load, by the trapezoidal rule
+    weights = m_v_z2 * node_average(np.diff(z2_depth)) * np.where(np.isin(np.arange(len(z2_depth)),
+                                                                          (0, len(z2_depth) - 1)), 0.5, 1)
+    U = np.sum((load[..., None] - excess) * weights, axis=-1) / (np.sum(weights) * (history[-1][1] or np.finfo(float).tiny))
+    return {
+        'z2_depth': z2_depth,
+        'excess_pore_pressure': excess,
+        'settelment': settelment_z2,
+        'accummultive_settelment': np.cumsum(np.sort(settelment_z2, axis=-1)[..., ::-1], axis=-1),
+        'H': H, 'c_v': c_v, 't_99': span, 'T_v': c_v * seconds / H**2, 'U': U[()], 'load': load[()],
+    }
+
+
+# Clay solution of the compressible layers of a layered profile (see stratigraphy.layered_profile), in
+# the form of solve_clay over the nodes of its consolidating units from the top down. Every unit is one
+# clay of solve_clay, its layers being the sublayers of the finite differences when they differ; the
+# slider position t is relative to t_99 of the slowest unit and U is that of the total settlement.
+# Sublayers, the nonlinear method and compression apply to a profile with a single unit.
+def solve_layers(t, profile, delta_sigma, tolerance=default_tolerance, method='analytic', sublayers=(), step=0.05,
+                 drains=None, loading=None, compression=None):
+    units = clay_units(profile)
+    if not units:
+        raise ValueError('The profile has no compressible layer')
+    if len(units) > 1 and (sublayers or method == 'nonlinear'):
+        raise ValueError('Sublayers and the nonlinear method need a profile with a single clay')
+    arguments, weights = [], []
+    for unit in units:
+        layers = [(profile['thicknesses'][i], profile['m_v'][i], profile['k'][i]) for i in unit]
+        unit_method, unit_sublayers = method, sublayers
+        if len({layer[1:] for layer in layers}) > 1:
+            unit_method, unit_sublayers = 'fdm', tuple(layers)
+        arguments.append((profile['tops'][unit[0]], sum(layer[0] for layer in layers),
+                          float(profile['bottom_drained'][unit[-1]]), delta_sigma, layers[0][1], layers[0][2],
+                          tolerance, unit_method, unit_sublayers, step, drains, loading, compression))
+        weights.append(sum(thickness * m_v for thickness, m_v, _ in layers))
+    if len(units) == 1:
+        return solve_clay(t, *arguments[0])
+
+    t = np.asarray(t, dtype=float)
+    t_99 = [solve_clay(0, *args)['t_99'] for args in arguments]
+    slowest = int(np.argmax(t_99))
+    clays = []
+    for args, unit_t_99 in zip(arguments, t_99):
+        # the slider position 100 stands for the final state, so other times are kept just below it
+        position = t * (t_99[slowest] / unit_t_99)
+        position = np.where(t == 100, 100.0, np.where(position == 100, np.nextafter(100, 0), position))
+        clays.append(solve_clay(position[()], *args))
+
+    settelment = np.concatenate([clay['settelment'] for clay in clays], axis=-1)
+    clay = dict(clays[slowest], **{
+        'z2_depth': np.concatenate([clay['z2_depth'] for clay in clays]),
+        'excess_pore_pressure': np.concatenate([clay['excess_pore_pressure'] for clay in clays], axis=-1),
+        'settelment': settelment,
+        'accummultive_settelment': np.cumsum(np.sort(settelment, axis=-1)[..., ::-1], axis=-1),
+        'U': (sum(weight * np.asarray(clay['U']) for weight, clay in zip(weights, clays)) / sum(weights))[()],
+    })
+    return clay
+
+
+# Stresses and pore pressures of a layered profile over its depth grid, for the clay solution of its
+# compressible layers (see solve_layers); the excess pore pressure is interpolated onto their nodes
+def soil_profiles(clay, profile, delta_sigma, water_table, step=0.05):
+    depths, layer_nodes = depth_grid(profile, step)
+    clay_nodes = np.concatenate([np.arange(len(depths))[nodes] for nodes, compressible
+                                 in zip(layer_nodes, profile['compressible']) if compressible]).astype(int)
+    # the load of a load history at each time, see solve_staged_clay
+    load = np.asarray(clay.get('load', delta_sigma), dtype=float)[..., None]
+    excess = clay['excess_pore_pressure']
+    z2_depth = clay['z2_depth']
+    if len(z2_depth) > 1:
+        i = np.clip(np.searchsorted(z2_depth, depths[clay_nodes], side='right'), 1, len(z2_depth) - 1)
+        w = (depths[clay_nodes] - z2_depth[i - 1]) / (z2_depth[i] - z2_depth[i - 1])
+        excess = (1 - w) * excess[..., i - 1] + w * excess[..., i]
+    shape = excess.shape[:-1] + depths.shape
+    total = np.broadcast_to(total_stress(profile, depths, load, water_table), shape)
+
+    # the excess pore pressure of the clay on top of the hydrostatic pore pressure
+    pore_pressure = np.broadcast_to(hydrostatic_pressure(depths, water_table), shape).copy()
+    pore_pressure[..., clay_nodes] += excess
+
+    return dict(clay, **{
+        'depths': depths,
+        'clay': clay_nodes,
+        'total_stress': total,
+        'pore_pressure': pore_pressure,
+        'effective_stress': total - pore_pressure,
+    })
+
+
+# Soil profile of a scenario: the layer rows (thickness, gamma, gamma_r, compressible, m_v, k) of
+# layers from the surface down, or else the Sand-1 / Clay / Sand-2 column
+def scenario_profile(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k, layers=None):
+    if layers:
+        return table_profile(layers)
+    return three_layer_profile(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k)
+
+
+# Stress, pore pressure and settlement profiles of the Sand-1 / Clay / Sand-2 column, or of the layer
+# rows of layers, see solve_layers
+def solve_consolidation(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2,
+                        gamma_3, gamma_r_3, m_v, k, water_table, tolerance=default_tolerance,
+                        method='analytic', sublayers=(), step=0.05, drains=None, loading=None, compression=None,
+                        layers=None):
+    profile = scenario_profile(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k, layers)
+    clay = solve_layers(t, profile, delta_sigma, tolerance, method, sublayers, step, drains, loading, compression)
+    return soil_profiles(clay, profile, delta_sigma, water_table, step)
+
+
+# Clay solutions of a batch of homogeneous clays under an instant load, in the form of solve_clay, for
+# arrays of z1, z2, z3, delta_sigma, m_v and k at the same slider positions t. The time slider is
+# relative to t_99, so the normalized isochrones only depend on the number of nodes and the drainage:
+# each such group takes one series evaluation, scaled by delta_sigma and m_v for its clays.
+def solve_clay_batch(t, z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, step=0.05):
+    t = np.asarray(t)
+    z1, z2, z3, delta_sigma, m_v, k = np.broadcast_arrays(*(np.asarray(value, dtype=float)
+                                                            for value in (z1, z2, z3, delta_sigma, m_v, k)))
+    T_v = time_factor(t, 1, 1 / gamma_water, 1)[2]  # the same for every clay
+    U = degree_of_consolidation(t, T_v)
+    groups = {}
+    for i, key in enumerate(zip((z2 / step).astype(int) + 1, z3 != 0)):
+        groups.setdefault(key, []).append(i)
+
+    solutions = [None] * len(z2)
+    for (n, bottom_drained), members in groups.items():
+        u = excess_pore_pressure(np.linspace(0, 2 if bottom_drained else 1, n), 0, 1, 1, T_v, t, tolerance)
+        # the accumulated settlement sorts the nodes by settlement, which reverses under unloading
+        ordered = np.sort(1 - u, axis=-1)
+        accummultive = {True: np.cumsum(ordered[..., ::-1], axis=-1), False: np.cumsum(ordered, axis=-1)}
+        for i in members:
+            H = drainage_length(z2[i], z3[i])
+            c_v, t_99 = time_factor(0, H, m_v[i], k[i])[:2]
+            scale = 1000 * delta_sigma[i] * m_v[i] * step
+            solutions[i] = {
+                'z2_depth': np.linspace(z1[i], z1[i] + z2[i], n),
+                'excess_pore_pressure': delta_sigma[i] * u,
+                'settelment': scale * (1 - u),
+                'accummultive_settelment': scale * accummultive[scale >= 0],
+                'H': H, 'c_v': c_v, 't_99': t_99, 'T_v': T_v, 'U': U,
+            }
+    return solutions
+
+
+# Slider positions of the time slider (percent of t_99)
+slider_times = np.arange(0, 101)
+
+# Results that carry a leading time axis when solve_consolidation is given an array of times
+time_dependent = ('pore_pressure', 'effective_stress', 'excess_pore_pressure', 'settelment',
+                  'accummultive_settelment', 'T_v', 'U', 'total_stress', 'load')
+
+
+# All slider positions of a scenario in one batched (time × depth × modes) evaluation
+def solve_time_sweep(*args, times=slider_times, **kwargs):
+    return solve_consolidation(times, *args, **kwargs)
+
+
+# All slider positions of the clay layer in one batched evaluation
+def solve_clay_sweep(*args, times=slider_times, **kwargs):
+    return solve_clay(times, *args, **kwargs)
+
+
+# Real times (s) of the settlement–time curve, log-spaced from one second to a century
+seconds_per_day = 86400
+curve_times = np.logspace(0, np.log10(100 * 365.25 * seconds_per_day), 241)
+
+
+# Settlement and degree of consolidation of the clay solution solve(t) at the slider positions t (see
+# solve_clay or solve_layers) at real times (s), all times in one batched evaluation
+def time_curve(solve, seconds=curve_times):
+    seconds = np.asarray(seconds, dtype=float)
+    t_99 = solve(0)['t_99']
+    # the slider position 100 stands for the final state, so the times are kept just below it
+    t = 100 * seconds / t_99
+    t = np.where(t == 100, np.nextafter(100, 0), t)
+    clay = solve(np.append(t, 100))
+    U = np.asarray(clay['U'][:-1], dtype=float)
+    final_settelment = clay['accummultive_settelment'][-1, -1]
+    return {'seconds': seconds, 'settelment': U * final_settelment, 'U': U,
+            'final_settelment': final_settelment, 't_99': t_99}
+
+
+# Settlement and degree of consolidation of the clay layer at real times (s), see time_curve
+def settelment_time_curve(z1, z2, z3, delta_sigma, m_v, k, tolerance=default_tolerance, method='analytic',
+                          sublayers=(), step=0.05, seconds=curve_times, drains=None, loading=None, compression=None):
+    return time_curve(lambda t: solve_clay(t, z1, z2, z3, delta_sigma, m_v, k, tolerance, method, sublayers, step,
+                                           drains, loading, compression), seconds)
+
+
+# Settlement–time curve under the instant load delta_sigma from the curve under a unit load, see scale_clay
+def scale_curve(curve, delta_sigma):
+    return dict(curve, settelment=delta_sigma * curve['settelment'],
+                final_settelment=delta_sigma * curve['final_settelment'])
+
+
+# Time frames of a time sweep, in the same form as solve_consolidation returns them
+def sweep_frames(sweep):
+    return [sweep_frame(sweep, i) for i in range(len(sweep['U']))]
+
+
+# Single time frame i of a time sweep, in the same form as solve_consolidation returns it
+def sweep_frame(sweep, i):
+    frame = dict(sweep)
+    for key in time_dependent:
+        if key in sweep:
+            frame[key] = sweep[key][i]
+    return frame
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+# Constants
+gamma_water = 10  # kN/m³ for water
+
+
+# Soil profile of N layers from the surface down, as a struct of arrays. Compressible layers (clays)
+# consolidate with m_v and k; the others (sands) drain freely, as does the surface. The base of the
+# profile is impermeable.
+def layered_profile(thicknesses, gamma, gamma_r, compressible, m_v=0, k=0, names=None):
+    thicknesses = np.asarray(thicknesses, dtype=float)
+    n = len(thicknesses)
+    bottoms = np.cumsum(thicknesses)
+    compressible = np.broadcast_to(np.asarray(compressible, dtype=bool), (n,)).copy()
+    draining = ~compressible
+
+    # nearest layers above and below that are not empty, -1 and n beyond the ends
+    index = np.where(thicknesses > 0, np.arange(n), -1)
+    above = np.concatenate(([-1], np.maximum.accumulate(index)[:-1]))
+    index = np.where(thicknesses > 0, np.arange(n), n)
+    below = np.concatenate((np.minimum.accumulate(index[::-1])[::-1][1:], [n]))
+    return {
+        'names': list(names) if names is not None else [f'Layer-{i + 1}' for i in range(n)],
+        'tops': bottoms - thicknesses,
+        'bottoms': bottoms,
+        'thicknesses': thicknesses,
+        'gamma': np.broadcast_to(np.asarray(gamma, dtype=float), (n,)).copy(),
+        'gamma_r': np.broadcast_to(np.asarray(gamma_r, dtype=float), (n,)).copy(),
+        'compressible': compressible,
+        'm_v': np.where(compressible, m_v, 0.0),
+        'k': np.where(compressible, k, 0.0),
+        # a compressible layer drains into the surface or a draining neighbour
+        'top_drained': (above < 0) | draining[np.maximum(above, 0)],
+        'bottom_drained': (below < n) & draining[np.minimum(below, n - 1)],
+    }
+
+
+# The Sand-1 / Clay / Sand-2 column of the app
+def three_layer_profile(z1, z2, z3, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v=0, k=0):
+    return layered_profile((z1, z2, z3), (gamma_1, gamma_2, gamma_3), (gamma_r_1, gamma_r_2, gamma_r_3),
+                           (False, True, False), m_v, k, names=('Sand-1', 'Clay', 'Sand-2'))
+
+
+# Profile of the layer rows (thickness, gamma, gamma_r, compressible, m_v, k) from the surface down
+def table_profile(layers):
+    thicknesses, gamma, gamma_r, compressible, m_v, k = (np.asarray(column) for column in zip(*layers))
+    return layered_profile(thicknesses, gamma, gamma_r, compressible.astype(bool), m_v.astype(float),
+                           k.astype(float))
+
+
+# Consolidating units of the profile: the runs of adjacent non-empty compressible layers, as lists of
+# layer indices. A unit drains at its top, and at its bottom when its last layer does.
+def clay_units(profile):
+    units = []
+    for i in np.flatnonzero(profile['compressible'] & (profile['thicknesses'] > 0)):
+        if units and not profile['top_drained'][i]:
+            units[-1].append(int(i))
+        else:
+            units.append([int(i)])
+    return units
+
+
+# Index of the layer of each depth, a depth on a boundary belonging to the layer above
+def layer_index(profile, depths):
+    return np.clip(np.searchsorted(profile['bottoms'], depths, side='left'), 0, len(profile['bottoms']) - 1)
+
+
+# Depth grid of the layers at the step, each layer from its top to its bottom node, and the slice of
+# every layer in it
+def depth_grid(profile, step=0.05):
+    grids = [np.linspace(top, bottom, num=int(thickness/step)+1)
+             for top, bottom, thickness in zip(profile['tops'], profile['bottoms'], profile['thicknesses'])]
+    ends = np.cumsum([len(grid) for grid in grids])
+    return np.concatenate(grids), [slice(end - len(grid), end) for grid, end in zip(grids, ends)]
+
+
+# Integral of the layer-wise unit weights from the surface to the depths
+def weight_integral(profile, unit_weights, depths):
+    i = layer_index(profile, depths)
+    above = np.concatenate(([0], np.cumsum(unit_weights * profile['thicknesses'])))
+    return above[i] + unit_weights[i] * (depths - profile['tops'][i])
+
+
+# Total vertical stress at the depths under the load delta_sigma, the layers being dry above the
+# water table and saturated below it
+def total_stress(profile, depths, delta_sigma, water_table):
+    depths = np.asarray(depths, dtype=float)
+    dry = weight_integral(profile, profile['gamma'], np.minimum(depths, water_table))
+    saturated = (weight_integral(profile, profile['gamma_r'], np.maximum(depths, water_table))
+                 - weight_integral(profile, profile['gamma_r'], np.asarray(water_table, dtype=float)))
+    return delta_sigma + dry + saturated
+
+
+# Hydrostatic pore pressure at the depths
+def hydrostatic_pressure(depths, water_table):
+    return np.maximum(np.asarray(depths, dtype=float) - water_table, 0) * gamma_water
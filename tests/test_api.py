@@ -0,0 +1,56 @@
+import flask
+import numpy as np
+import pytest
+
+import api
+import batch
+
+
+@pytest.fixture
+def client():
+    server = flask.Flask(__name__)
+    api.register(server)
+    return server.test_client()
+
+
+def test_single_scenario(client):
+    response = client.post('/api/solve', json={'z2': 4, 'times': [50]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['times'] == [50]
+    assert 0 < result['U'][0] < 1
+    assert result['final_settelment'] == pytest.approx(1000 * 100 * 5e-4 * 0.05 * 81)
+
+
+def test_node_limit_without_profiles(client):
+    response = client.post('/api/solve', json={'z2': 1e5, 'step': 0.001})
+    assert response.status_code == 400
+    assert 'depth nodes' in response.get_json()['error']
+
+
+def test_value_budget_without_profiles(client):
+    scenarios = [{'z2': 4}] * api.max_scenarios
+    response = client.post('/api/solve', json={'scenarios': scenarios, 'times': list(range(101)), 'profiles': False})
+    assert response.status_code == 413
+
+
+def test_validate_inputs_node_limit():
+    inputs = batch.scenario_inputs({})
+    batch.validate_inputs(inputs, step=0.05)
+    with pytest.raises(ValueError):
+        batch.validate_inputs(dict(inputs, z2=batch.max_nodes * 0.05), step=0.05)
+
+
+def test_layers(client):
+    # the Sand-1 / Clay / Sand-2 column given as layers solves as the column
+    layers = [{'thickness': 2, 'gamma': 18, 'gamma_r': 19, 'compressible': False, 'm_v': 0, 'k': 0},
+              {'thickness': 4, 'gamma': 19, 'gamma_r': 21, 'compressible': True, 'm_v': 5e-4, 'k': 1e-10},
+              {'thickness': 2, 'gamma': 18, 'gamma_r': 19, 'compressible': False, 'm_v': 0, 'k': 0}]
+    column = client.post('/api/solve', json={'times': [50], 'profiles': True}).get_json()
+    layered = client.post('/api/solve', json={'layers': layers, 'times': [50], 'profiles': True}).get_json()
+    assert layered['U'] == pytest.approx(column['U'])
+    assert np.allclose(layered['profiles']['effective_stress'], column['profiles']['effective_stress'])
+
+    response = client.post('/api/solve', json={'layers': [[4, 18, 19, False, 0, 0]]})
+    assert response.status_code == 400
+    assert 'no compressible layer' in response.get_json()['error']
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from back_analysis import fit_settelment, settelment_model, t_quantile, asaoka, read_record
+from solver import settelment_time_curve, solve_clay, seconds_per_day
+
+days = np.geomspace(1, 3000, 40)
+
+
+def test_fit_recovers_the_model():
+    c_v, m_v = 3e-8, 8e-4
+    settelment = settelment_model(days * seconds_per_day, c_v, m_v, 5, 0, 80)
+    fit = fit_settelment(days, settelment, 5, 0, 80)
+    assert fit['c_v'] == pytest.approx(c_v, rel=1e-4)
+    assert fit['m_v'] == pytest.approx(m_v, rel=1e-6)
+    assert fit['rmse'] < 1e-6
+
+
+def test_fit_recovers_the_app_curve():
+    # the finite difference curve of the app, whose settlement sums m_v Δσ step over the 81 clay nodes
+    curve = settelment_time_curve(2, 4, 2, 100, 5e-4, 1e-9, method='fdm', seconds=days * seconds_per_day)
+    fit = fit_settelment(days, curve['settelment'], 4, 2, 100)
+    assert fit['c_v'] == pytest.approx(solve_clay(0, 2, 4, 2, 100, 5e-4, 1e-9)['c_v'], rel=1e-2)
+    assert fit['m_v'] == pytest.approx(5e-4, rel=1e-3)
+    assert fit['final_settelment'] == pytest.approx(curve['final_settelment'], rel=1e-3)
+
+
+def test_confidence_intervals_of_a_noisy_record():
+    c_v, m_v = 2e-7, 5e-4
+    settelment = settelment_model(days * seconds_per_day, c_v, m_v, 4, 2, 100)
+    noisy = settelment + np.random.default_rng(1).normal(0, 2, len(days))
+    fit = fit_settelment(days, noisy, 4, 2, 100)
+    assert fit['c_v_interval'][0] < c_v < fit['c_v_interval'][1]
+    assert fit['m_v_interval'][0] < m_v < fit['m_v_interval'][1]
+
+
+def test_t_quantile():
+    assert t_quantile(1) == pytest.approx(12.7062, abs=1e-4)
+    assert t_quantile(5) == pytest.approx(2.5706, abs=1e-4)
+    # the expansion joins the table and falls towards the normal quantile
+    assert t_quantile(31) == pytest.approx(2.039513, abs=1e-5)
+    assert t_quantile(30) > t_quantile(31) > t_quantile(1000) > 1.96
+
+
+def test_asaoka_final_settlement():
+    settelment = settelment_model(days * seconds_per_day, 2e-7, 5e-4, 4, 2, 100)
+    assert asaoka(days, settelment, 4, 2)['final_settelment'] == pytest.approx(settelment_model(
+        np.inf, 2e-7, 5e-4, 4, 2, 100), rel=1e-2)
+
+
+def test_read_record_skips_the_header():
+    days, settelment = read_record('days,mm\n10,5\n1,2\n100,9\n')
+    assert days.tolist() == [1, 10, 100] and settelment.tolist() == [2, 5, 9]
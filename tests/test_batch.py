@@ -0,0 +1,30 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import batch
+
+
+def test_batch_command_runs_without_the_app(tmp_path):
+    scenarios = tmp_path / 'scenarios.csv'
+    scenarios.write_text('id,z2,method\na,4,analytic\nb,6,fdm\nc,-1,analytic\n')
+    output = tmp_path / 'results.csv'
+    code = ('import sys, batch; batch.main(sys.argv[1:]); '
+            "assert 'dash' not in sys.modules and 'cosolidation' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code, str(scenarios), '-o', str(output), '-w', '1'], check=True,
+                   cwd=os.path.dirname(os.path.abspath(batch.__file__)))
+    rows = sorted(csv.DictReader(output.open()), key=lambda row: row['id'])  # in the order they finish
+    assert [row['id'] for row in rows] == ['a', 'b', 'c']
+    assert float(rows[1]['final_settelment']) > float(rows[0]['final_settelment']) > 0
+    assert rows[2]['error'] and not rows[0]['error']
+
+
+def test_run_batch_profiles(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    assert batch.run_batch([{'z2': 4}], str(output), times=(50,), profiles=True, workers=1) == 1
+    result = json.loads(output.read_text())
+    assert set(result['U']) == {'50.0'}
+    profiles = result['profiles']
+    assert len(profiles['depths']) == len(profiles['total_stress']) == batch.depth_nodes(batch.default_scenario)
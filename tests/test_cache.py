@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from cache import DiskCache, LRUCache, normalize_key, value_nbytes
+
+
+def test_normalized_keys():
+    assert normalize_key(2, 2.0000000000001, [1, 'a']) == normalize_key(2.0, 2, (1.0, 'a'))
+
+
+def test_least_recently_used_eviction():
+    cache = LRUCache('test_entries', maxsize=2, shared=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.stats()['evictions'] == 1
+    assert cache.get_or_compute('b', lambda: 4) == 4
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_byte_bound_of_nested_values():
+    cache = LRUCache('test_bytes', maxsize=64, shared=None, maxbytes=3 * 8000)
+    clay = {'excess_pore_pressure': np.zeros(1000), 'H': 2.5}
+    assert value_nbytes((clay, {'sweep': [np.zeros(500), 'abcd']})) == 8000 + 4000 + 4
+    for i in range(5):
+        cache.put(i, dict(clay))
+    assert len(cache) == 3 and cache.nbytes == 3 * 8000
+    cache.put(2, {'excess_pore_pressure': np.zeros(2000)})  # a replaced entry takes its new size
+    assert len(cache) == 2 and cache.nbytes == 2000 * 8 + 8000
+    cache.clear()
+    assert cache.nbytes == 0
+
+
+def test_disk_cache_bounds(tmp_path):
+    cache = DiskCache(str(tmp_path), maxsize=10, maxbytes=3 * 9000)
+    for i in range(5):
+        cache.put(i, np.zeros(1000))  # about 8.2 kB pickled
+        os.utime(cache._path(i), (i, i))  # the order of use, as the file times are too coarse
+    assert cache.get(0) is None and cache.get(1) is None
+    assert np.all(cache.get(4) == 0)
+    assert len(os.listdir(tmp_path)) == 3 and cache.evictions == 2
+
+    cache = DiskCache(str(tmp_path / 'entries'), maxsize=2)
+    for i in range(3):
+        cache.put(i, i)
+        os.utime(cache._path(i), (i, i))
+    assert [cache.get(i) for i in range(3)] == [None, 1, 2]
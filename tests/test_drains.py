@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from drains import design_sweep
+from solver import (solve_clay, drain_function, radial_rate, drain_parameters, series_degree_of_consolidation,
+                    seconds_per_day)
+
+
+clay = dict(z1=2, z2=5, z3=2, m_v=1e-3, k=1e-9)
+positions = np.array([5, 20, 50, 80])
+
+
+def analytic(**kwargs):
+    return solve_clay(positions, clay['z1'], clay['z2'], clay['z3'], 100, clay['m_v'], clay['k'], **kwargs)
+
+
+def test_drain_functions():
+    n = 1.05 * 1.5 / 0.05
+    # Barron's ideal drain, and Hansbo's drain without smear reduces to ln n - 3/4
+    assert drain_function(n, 'barron') == pytest.approx(n**2 / (n**2 - 1) * np.log(n) - (3 * n**2 - 1) / (4 * n**2))
+    assert drain_function(n, 'hansbo', 1, 1) == pytest.approx(np.log(n) - 0.75)
+    assert drain_function(n, 'hansbo', 2, 2) > drain_function(n, 'hansbo', 1, 1)  # the smear slows the drain
+
+    c_v = clay['k'] / (clay['m_v'] * 10)
+    assert radial_rate(c_v, 1.05 * 1.5, theory='barron') == pytest.approx(
+        8 * 2 * c_v / ((1.05 * 1.5)**2 * drain_function(n, 'barron')))
+
+
+def test_carrillo_combination():
+    # U = 1 - (1 - U_v)(1 - U_h) at the same times
+    c_v = clay['k'] / (clay['m_v'] * 10)
+    rate = radial_rate(c_v, 1.05 * 1.5, theory='barron')
+    drained = analytic(drains=drain_parameters(1.5, theory='barron'))
+    seconds = positions / 100 * drained['t_99']
+    expected = 1 - (1 - series_degree_of_consolidation(drained['T_v'])) * np.exp(-rate * seconds)
+    assert np.allclose(drained['U'], expected)
+    assert drained['t_99'] < analytic()['t_99']
+
+
+def test_design_sweep():
+    sweep = design_sweep(clay['z2'], clay['z3'], clay['m_v'], clay['k'], target_U=0.9, target_days=180)
+    assert np.all(np.diff(sweep['days'], axis=1) > 0)  # wider spacings take longer
+    for i, pattern in enumerate(sweep['patterns']):
+        largest = sweep['largest_spacing'][pattern]
+        j = np.flatnonzero(sweep['spacings'] == largest)[0]
+        assert sweep['days'][i, j] <= 180 < sweep['days'][i, j + 1]
+        assert sweep['U'][i, j] >= 0.9
+    # a square grid drains a larger cylinder per spacing than a triangular one
+    assert sweep['largest_spacing']['square'] < sweep['largest_spacing']['triangular']
+
+    # the time to U = 0.9 of the sweep is that of the drained clay of solve_clay
+    spacing = sweep['spacings'][10]
+    drained = solve_clay(0, clay['z1'], clay['z2'], clay['z3'], 100, clay['m_v'], clay['k'],
+                         drains=drain_parameters(spacing))
+    days = np.array(sweep['days'][0, 10])
+    U = solve_clay(100 * days * seconds_per_day / drained['t_99'], clay['z1'], clay['z2'], clay['z3'], 100,
+                   clay['m_v'], clay['k'], drains=drain_parameters(spacing))['U']
+    assert U == pytest.approx(0.9, abs=1e-6)
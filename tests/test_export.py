@@ -0,0 +1,78 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import flask
+import numpy as np
+import pytest
+
+import batch
+import export
+from solver import solve_consolidation
+
+
+@pytest.fixture
+def client():
+    server = flask.Flask(__name__)
+    export.register(server)
+    return server.test_client()
+
+
+def test_profile_csv(client):
+    response = client.get('/export/profiles.csv?t=0,50,100')
+    assert response.status_code == 200
+    lines = response.data.decode().splitlines()
+    assert lines[0].split(',') == list(export.profile_columns)
+    assert len(lines) == 1 + 3 * 163
+
+
+def test_settlement_npz(client, tmp_path):
+    response = client.get('/export/settlement.npz')
+    assert response.status_code == 200
+    path = tmp_path / 'settlement.npz'
+    path.write_bytes(response.data)
+    with np.load(path) as data:
+        curve = data['settlement']
+    assert np.all(np.diff(curve['U']) >= 0)
+    assert np.all(np.diff(curve['days']) > 0)
+
+
+def test_node_limit(client):
+    assert client.get('/export/profiles.csv?z2=100000&step=0.001').status_code == 400
+
+
+def test_value_budget(client):
+    times = ','.join(str(t) for t in np.linspace(0, 100, 2001))
+    assert client.get(f'/export/profiles.csv?z2=10&step=0.001&t={times}').status_code == 413
+
+
+def test_fdm_profiles_solved_once(client, monkeypatch):
+    calls = []
+    solve_layers = export.solve_layers
+    monkeypatch.setattr(export, 'solve_layers', lambda *args: calls.append(args) or solve_layers(*args))
+    monkeypatch.setattr(export, 'export_bytes', 8 * 4 * len(export.profile_columns) * 163 * 2)  # two times a block
+    response = client.get('/export/profiles.csv?t=10,30,50,70,90&method=fdm')
+    assert response.status_code == 200
+    assert len(calls) == 1
+    rows = np.loadtxt(response.data.decode().splitlines(), delimiter=',', skiprows=1).reshape(5, 163, -1)
+    expected = solve_consolidation(np.array([10, 30, 50, 70, 90.]), **batch.scenario_inputs({'method': 'fdm'}))
+    for column in ('total_stress', 'pore_pressure', 'effective_stress'):
+        assert np.allclose(rows[..., export.profile_columns.index(column)], expected[column], rtol=1e-9)
+
+
+def test_parquet_imports_pyarrow_on_first_export():
+    code = 'import sys, export; assert "pyarrow" not in sys.modules; print(export.parquet_available)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=os.getcwd())
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(importlib.util.find_spec('pyarrow') is not None)
+
+
+@pytest.mark.skipif(not export.parquet_available, reason='pyarrow is not installed')
+def test_settlement_parquet(client, tmp_path):
+    import pyarrow.parquet
+    response = client.get('/export/settlement.parquet')
+    assert response.status_code == 200
+    path = tmp_path / 'settlement.parquet'
+    path.write_bytes(response.data)
+    assert pyarrow.parquet.read_table(path).column_names == list(export.curve_columns)
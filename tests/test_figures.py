@@ -0,0 +1,49 @@
+import base64
+
+import numpy as np
+
+from figures import (adaptive_samples, typed_array, pressure_sweep_store, settelment_sweep_store, plot_tolerance,
+                     webgl_points)
+from solver import solve_time_sweep, slider_times
+
+
+def decode(array):
+    return np.frombuffer(base64.b64decode(array['bdata']), dtype='<' + array['dtype'])
+
+
+def test_adaptive_samples_within_the_tolerance():
+    z = np.linspace(0, 10, 2001)
+    profiles = [np.where(z < 4, 18 * z, 72 + 9 * (z - 4)), 100 * np.exp(-z) * np.sin(3 * z), z]
+    tolerances = [0.1, 0.1, 0.01]
+    samples = adaptive_samples(profiles, tolerances)
+    assert samples[0] == 0 and samples[-1] == len(z) - 1
+    assert len(samples) < len(z) / 10
+    for profile, tolerance in zip(profiles, tolerances):
+        assert np.max(np.abs(np.interp(z, z[samples], profile[samples]) - profile)) <= tolerance
+    # a straight profile keeps its end points only
+    assert adaptive_samples([3 * z + 1, z], [1e-6, 1e-6]).tolist() == [0, len(z) - 1]
+
+
+def test_typed_array():
+    values = np.array([0.5, -2, 1e3])
+    assert decode(typed_array(values)).tolist() == values.tolist()
+    assert typed_array(values)['dtype'] == 'f4'
+
+
+def test_sweep_stores_are_sampled_frames():
+    args = (2, 12, 2, 100, 18, 19, 19, 21, 18, 19, 5e-4, 1e-10, 1)
+    sweep = solve_time_sweep(*args, step=0.005)
+    pressure, settelment = pressure_sweep_store(sweep), settelment_sweep_store(sweep)
+    assert len(pressure) == len(settelment) == len(slider_times)
+    for i in (0, 37, len(slider_times) - 1):
+        frame = pressure[i]
+        depths = decode(frame['depths'])
+        assert len(depths) < len(sweep['depths']) / 10
+        # the layer boundaries have a node in both layers, where the excess pore pressure may jump
+        inside = np.isin(sweep['depths'], sweep['depths'][np.diff(sweep['depths'], prepend=-1) == 0], invert=True)
+        for key in ('total_stress', 'pore_pressure', 'effective_stress'):
+            sampled = np.interp(sweep['depths'][inside], depths, decode(frame[key]))
+            error = np.max(np.abs(sampled - sweep[key][i][inside]))
+            assert error <= 1.01 * plot_tolerance * frame['x_max'], key
+        assert frame['type'] == ('scattergl' if len(depths) > webgl_points else 'scatter')
+        assert settelment[i]['U'] == float(sweep['U'][i])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from finite_difference import tridiagonal_solve, element_properties, equivalent_properties, consolidate
+from solver import solve_clay, series_degree_of_consolidation
+
+
+clay = dict(z1=2, z2=5, z3=2, m_v=1e-3, k=1e-9)
+positions = np.array([5, 20, 50, 80])
+
+
+def solve(method='analytic', sublayers=(), z3=clay['z3']):
+    return solve_clay(positions, clay['z1'], clay['z2'], z3, 100, clay['m_v'], clay['k'], method=method,
+                      sublayers=sublayers)
+
+
+def test_tridiagonal_solve():
+    rng = np.random.default_rng(1)
+    for n in (1, 2, 7, 64, 100):
+        a, c = rng.uniform(-1, 0, n), rng.uniform(-1, 0, n)
+        b = 2.5 + rng.uniform(0, 1, n)  # diagonally dominant, as the systems of the FDM
+        d = rng.normal(size=(n, 3))
+        matrix = np.diag(b) + np.diag(a[1:], -1) + np.diag(c[:-1], 1)
+        assert np.allclose(tridiagonal_solve(a, b, c, d), np.linalg.solve(matrix, d))
+        assert np.allclose(tridiagonal_solve(a, b, c, d[:, 0]), np.linalg.solve(matrix, d[:, 0]))
+
+
+@pytest.mark.parametrize('z3', [0, 2])
+def test_fdm_matches_series(z3):
+    series, fdm = solve(z3=z3), solve('fdm', z3=z3)
+    assert fdm['t_99'] == pytest.approx(series['t_99'])
+    assert np.max(np.abs(fdm['excess_pore_pressure'] - series['excess_pore_pressure'])) < 0.1  # of 100 kPa
+    # U of the series itself, where the analytic method takes the approximation of U
+    assert np.allclose(fdm['U'], series_degree_of_consolidation(series['T_v']), atol=2e-3)
+
+
+def test_sublayers():
+    # sublayers with the properties of the clay change nothing
+    same = ((2, clay['m_v'], clay['k']), (3, clay['m_v'], clay['k']))
+    assert np.allclose(solve('fdm', same)['excess_pore_pressure'], solve('fdm')['excess_pore_pressure'])
+
+    depths = np.linspace(0, 5, 101)
+    m_v_e, k_e = element_properties(depths, clay['m_v'], clay['k'], ((1, 2e-3, 1e-10),))
+    assert np.all(m_v_e[:20] == 2e-3) and np.all(m_v_e[20:] == clay['m_v'])
+    assert equivalent_properties(m_v_e, k_e) == pytest.approx((0.2 * 2e-3 + 0.8 * 1e-3, 1 / (0.2 / 1e-10 + 0.8 / 1e-9)))
+
+    # a tight sublayer at the drained top holds the pore pressure below it longer
+    seconds = np.array([1e7, 5e7])
+    tight = consolidate(depths, m_v_e, k_e, 100, seconds, bottom_drained=False)
+    uniform = consolidate(depths, *element_properties(depths, clay['m_v'], clay['k']), 100, seconds, bottom_drained=False)
+    assert np.all(tight[:, -1] > uniform[:, -1])
+    assert np.all(tight[:, 0] == 0) and np.all((tight >= -1e-9) & (tight <= 100 + 1e-9))
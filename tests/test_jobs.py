@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import jobs
+
+directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+pytestmark = pytest.mark.skipif(not jobs.available, reason='diskcache, multiprocess or psutil is not installed')
+
+# Start the background job of the app through the Dash endpoint, as the browser does, and poll it
+job_script = '''
+import json, time, cosolidation
+app = cosolidation.app
+key = next(key for key in app.callback_map if 'uncertainty-result.children@' in key)
+callback = app.callback_map[key]
+suffix = key.split('@')[1].split('.')[0]
+body = {
+    'output': key,
+    'outputs': [{'id': output.component_id, 'property': f'{output.component_property}@{suffix}'}
+                for output in callback['output']],
+    'inputs': [{'id': 'job-request', 'property': 'data', 'value': 1}],
+    'state': [dict(state, value=getattr(app.layout[state['id']], state['property'], None))
+              for state in callback['state']],
+    'changedPropIds': ['job-request.data'],
+}
+client = app.server.test_client()
+job = client.post('/_dash-update-component', json=body).get_json()
+progress = []
+for _ in range(600):
+    result = client.post(f"/_dash-update-component?cacheKey={job['cacheKey']}&job={job['job']}", json=body).get_json()
+    if result and 'progress' in result:
+        progress.append(result['progress']['job-status.children'])
+    if result and 'response' in result:
+        break
+    time.sleep(0.1)
+print(json.dumps({'job': job, 'progress': progress, 'outputs': sorted(result['response'])}))
+'''
+
+
+def test_manager_opens_its_cache_with_the_first_job(tmp_path):
+    manager = jobs.LazyDiskcacheManager(str(tmp_path / 'jobs'), cache_by=[lambda: 'version'])
+    assert manager._handle is None and not (tmp_path / 'jobs').exists()
+    manager.handle.set('key', 1)
+    assert (tmp_path / 'jobs').exists() and manager.handle.get('key') == 1
+
+
+def test_background_job_of_the_app(tmp_path):
+    env = dict(os.environ, CONSOLIDATION_METRICS='', CONSOLIDATION_SNAPSHOT='', CONSOLIDATION_CACHE_DIR='',
+               CONSOLIDATION_JOB_DIR=str(tmp_path / 'jobs'))
+    output = subprocess.run([sys.executable, '-c', job_script], cwd=directory, env=env, check=True,
+                            capture_output=True, text=True, timeout=300).stdout
+    result = json.loads(output.splitlines()[-1])
+    assert isinstance(result['job']['job'], int)  # the process id of the job
+    assert result['job']['cancel'] == [{'id': 'cancel-job-button', 'property': 'n_clicks'}]
+    assert result['progress'][-1] == 'Done'
+    # the graphs and their sweeps; the uncertainty result is left as it is without the bands
+    assert result['outputs'] == ['pressure-graph', 'pressure-sweep', 'settelment-graph', 'settelment-sweep',
+                                 'settelment-time-graph']
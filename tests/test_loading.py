@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from loading import load_history, load_changes, applied_load, parse_history, read_history
+from solver import solve_clay
+
+clay = dict(z1=2, z2=5, z3=2, m_v=1e-3, k=1e-9)
+positions = np.array([5, 20, 50, 80])
+ramp = ((0, 0), (30, 50), (60, 50), (60, 100))  # a ramp to 50 kPa, then a second stage a month later
+
+
+def solve(delta_sigma=100, **kwargs):
+    return solve_clay(positions, clay['z1'], clay['z2'], clay['z3'], delta_sigma, clay['m_v'], clay['k'], **kwargs)
+
+
+def test_load_history():
+    assert load_history([(60, 100), (0, 0), (60, 50)]) == ((0, 0), (60, 100), (60, 50))  # stable on a jump day
+    with pytest.raises(ValueError):
+        load_history([(-1, 100)])
+    assert parse_history([{'day': 0, 'load': 100}, {'day': None, 'load': 5}]) == ((0, 100),)
+    assert read_history('day,kPa\n0,0\n30,50\n') == ((0, 0), (30, 50))
+
+
+def test_load_changes_and_applied_load():
+    jump_days, jumps, ramp_days, rate_changes = load_changes(load_history(ramp))
+    assert jump_days.tolist() == [60] and jumps.tolist() == [50]
+    assert ramp_days.tolist() == [0, 30] and rate_changes == pytest.approx([50 / 30, -50 / 30])
+    assert applied_load(load_history(ramp), [0, 15, 30, 45, 59.9, 60, 1000]) == pytest.approx(
+        [0, 25, 50, 50, 50, 100, 100])
+
+
+def test_single_load_step_is_the_instant_load():
+    for method in ('analytic', 'fdm'):
+        instant = solve(method=method)
+        staged = solve(method=method, loading=load_history([(0, 100)]))
+        assert staged['t_99'] == pytest.approx(instant['t_99'])
+        assert np.allclose(staged['excess_pore_pressure'], instant['excess_pore_pressure'], atol=0.1)
+        assert np.allclose(staged['load'], 100)
+
+
+def test_superposition_of_two_stages():
+    # two jumps of 50 kPa on the same day load the clay as one of 100 kPa
+    staged = solve(loading=load_history([(0, 50), (0, 100)]))
+    instant = solve(loading=load_history([(0, 100)]))
+    assert np.allclose(staged['excess_pore_pressure'], instant['excess_pore_pressure'])
+
+
+def test_ramp_is_linear_in_the_load():
+    single = solve(loading=load_history(ramp))
+    double = solve(loading=load_history([(day, 2 * load) for day, load in ramp]))
+    assert np.allclose(double['excess_pore_pressure'], 2 * single['excess_pore_pressure'])
+    assert np.allclose(single['load'], applied_load(load_history(ramp), positions / 100 * single['t_99'] / 86400))
+    # the clay has consolidated under the whole load at the final state
+    final = solve_clay(100, clay['z1'], clay['z2'], clay['z3'], 100, clay['m_v'], clay['k'],
+                       loading=load_history(ramp))
+    assert np.allclose(final['excess_pore_pressure'], 0) and final['load'] == pytest.approx(100)
@@ -0,0 +1,62 @@
+import flask
+import pytest
+
+import metrics
+from cache import LRUCache
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    monkeypatch.setattr(metrics, 'stage_seconds', metrics.Histogram(
+        'consolidation_stage_seconds', 'Duration of the stages of the callbacks', metrics.duration_buckets,
+        ('callback', 'stage')))
+    monkeypatch.setattr(metrics, 'payload_bytes', metrics.Histogram(
+        'consolidation_payload_bytes', 'Size of the callback responses', metrics.size_buckets, ('callback',)))
+    server = flask.Flask(__name__)
+    metrics.register(server)
+
+    @metrics.timed('update_test')
+    def callback():
+        with metrics.stage('series'):
+            return 'x' * 5000
+
+    server.add_url_rule('/callback', 'callback', callback)
+    return server
+
+
+def test_histogram():
+    histogram = metrics.Histogram('test_seconds', 'Test', (0.1, 1), ('stage',))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, stage='a')
+    assert histogram.render() == [
+        '# HELP test_seconds Test', '# TYPE test_seconds histogram',
+        'test_seconds_bucket{stage="a",le="0.1"} 1', 'test_seconds_bucket{stage="a",le="1"} 2',
+        'test_seconds_bucket{stage="a",le="+Inf"} 3', 'test_seconds_sum{stage="a"} 5.55',
+        'test_seconds_count{stage="a"} 3']
+
+
+def test_metrics_endpoint(server):
+    cache = LRUCache('test_metrics', shared=None)
+    cache.get_or_compute('key', lambda: 1)
+    cache.get('key')
+    client = server.test_client()
+    assert client.get('/callback').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    lines = response.data.decode().splitlines()
+    for stage in ('total', 'series', 'serialize'):
+        assert f'consolidation_stage_seconds_count{{callback="update_test",stage="{stage}"}} 1' in lines
+    assert 'consolidation_payload_bytes_bucket{callback="update_test",le="10000.0"} 1' in lines
+    assert 'consolidation_cache_hits_total{cache="test_metrics"} 1' in lines
+    assert 'consolidation_cache_misses_total{cache="test_metrics"} 1' in lines
+    assert 'consolidation_cache_size{cache="test_metrics"} 1' in lines
+    assert '# TYPE consolidation_startup_seconds gauge' in lines
+
+
+def test_disabled_callbacks_are_not_wrapped(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', False)
+
+    def callback():
+        return 1
+    assert metrics.timed('update_test')(callback) is callback
@@ -0,0 +1,44 @@
+import numpy as np
+import monte_carlo
+
+
+def bands(t):
+    return monte_carlo.uncertainty_bands(t, 2, 5, 2, 100, 1e-3, 1e-9, 200, 0.3, 'lognormal', 0, 'lognormal', 0, 'normal')
+
+
+def test_final_state_at_slider_end():
+    final = bands(100)
+    assert np.isinf(final['time'])
+    assert np.allclose(final['U_at_time'][:, 0], 1)
+    # the final settlement of the linear clay does not depend on the scattered k
+    assert np.ptp(final['accummultive_settelment'][:, -1]) < 1e-9
+
+
+def test_t_99_before_slider_end():
+    assert np.all(bands(99)['U_at_time'][:, 0] < 1)
+
+
+def test_histogram_percentiles_match_the_samples():
+    params = (30, 2, 5, 2, 100, 1e-3, 1e-9)
+    result = monte_carlo.uncertainty_bands(*params, 5000, seed=3)
+    # the same realizations, kept in full
+    rng = np.random.default_rng(3)
+    k, m_v, delta_sigma = (monte_carlo.sample(rng, 5000, value, cov, distribution) for value, cov, distribution in
+                           ((1e-9, 1.0, 'lognormal'), (1e-3, 0.2, 'lognormal'), (100, 0.1, 'normal')))
+    H = monte_carlo.drainage_length(5, 2)
+    Z = (result['depths'] - 2) / H
+    values = monte_carlo.realize(0, 5000, result['time'], Z, H, 5, m_v, k, delta_sigma, monte_carlo.default_tolerance)
+    exact = np.percentile(values, monte_carlo.percentiles, axis=1)
+    rows = np.cumsum([0] + [n for n, _ in monte_carlo.output_ranges(5, m_v, delta_sigma).values()])
+    for key, start, stop in zip(('excess', 'accummultive_settelment', 'settelment', 'U', 'U_at_time'), rows, rows[1:]):
+        scale = np.max(np.abs(exact[:, start:stop]))
+        assert np.allclose(result[key], exact[:, start:stop], rtol=0, atol=2e-3 * scale), key
+
+
+def test_chunk_budget_shared_by_the_workers(monkeypatch):
+    monkeypatch.setattr(monte_carlo, 'workers', 4)
+    monkeypatch.setattr(monte_carlo, 'chunk_bytes', 4 * 50 * monte_carlo.sample_bytes(monte_carlo.profile_nodes,
+                                                                                         len(monte_carlo.band_times)))
+    totals = set()
+    monte_carlo.uncertainty_bands(50, 2, 5, 2, 100, 1e-3, 1e-9, 1000, progress=lambda done, total: totals.add(total))
+    assert totals == {20}  # 50 samples per chunk
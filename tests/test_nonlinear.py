@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from nonlinear import compression_parameters
+from solver import solve_clay, solve_nonlinear_clay, time_factor
+
+
+clay = dict(z1=2, z2=5, z3=2, m_v=1e-3, k=1e-9)
+positions = np.array([5, 20, 50, 80])
+
+
+def test_nonlinear_small_load_reduces_to_terzaghi():
+    # with Cc = Cr the clay is linear for a small load, with m_v = Cc / ((1 + e0) ln 10 σ'0)
+    Cc, e0, sigma_0, delta_sigma = 0.3, 1.0, 100, 0.01
+    m_v = Cc / ((1 + e0) * np.log(10) * sigma_0)
+    compression = compression_parameters(Cc, Cc, e0, 0, None, sigma_0, sigma_0)
+    nonlinear = solve_nonlinear_clay(positions, clay['z1'], clay['z2'], clay['z3'], delta_sigma, m_v, clay['k'],
+                                     compression)
+    # the same times of the linear clay, whose slider follows its own t_99
+    t_99 = time_factor(0, nonlinear['H'], m_v, clay['k'])[1]
+    linear = solve_clay(positions * nonlinear['t_99'] / t_99, clay['z1'], clay['z2'], clay['z3'], delta_sigma, m_v,
+                        clay['k'])
+    assert nonlinear['c_v'] == pytest.approx(linear['c_v'], rel=0.25)  # t_99 of the series against 1.4832 H²/c_v
+    assert np.max(np.abs(nonlinear['excess_pore_pressure'] - linear['excess_pore_pressure'])) < 5e-3 * delta_sigma
+    assert np.allclose(nonlinear['settelment'], linear['settelment'], rtol=5e-3, atol=5e-3 * np.max(linear['settelment']))
+
+
+def test_final_settlement_of_the_compression_lines():
+    # recompression up to σ'p = 150 kPa and virgin compression above it, from σ'0 = 100 kPa to 200 kPa
+    compression = compression_parameters(0.4, 0.05, 1.2, 150, None, 100, 100)
+    final = solve_nonlinear_clay(100, clay['z1'], clay['z2'], clay['z3'], 100, clay['m_v'], clay['k'], compression)
+    strain = (0.05 * np.log10(150 / 100) + 0.4 * np.log10(200 / 150)) / (1 + 1.2)
+    assert final['U'] == 1
+    assert np.allclose(final['excess_pore_pressure'], 0)
+    assert final['accummultive_settelment'][-1] == pytest.approx(1000 * strain * clay['z2'], rel=0.02)
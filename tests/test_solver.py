@@ -0,0 +1,152 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+import solver
+from solver import (solve_consolidation, erfc_approximation, mode_numbers, series_terms, image_terms,
+                    fourier_series, short_time_solution, normalized_excess, spectral_basis, n_modes, solve_clay,
+                    scale_clay, settelment_time_curve, scale_curve, drain_parameters)
+
+
+# The per-node loops of the original update_graphs, the reference of the vectorized solver
+def baseline(t, z1, z2, z3, delta_sigma, gamma_1, gamma_r_1, gamma_2, gamma_r_2, gamma_3, gamma_r_3, m_v, k,
+             water_table):
+    gamma_water = 10
+    step = 0.05
+    z1_depth = np.linspace(0, z1, num=int(z1/step)+1)
+    z2_depth = np.linspace(z1, z1+z2, num=int(z2/step)+1)
+    z3_depth = np.linspace(z1+z2, z1+z2+z3, num=int(z3/step)+1)
+    total_stress_z1, pore_pressure_z1 = np.zeros_like(z1_depth), np.zeros_like(z1_depth)
+    total_stress_z2, pore_pressure_z2 = np.zeros_like(z2_depth), np.zeros_like(z2_depth)
+    total_stress_z3, pore_pressure_z3 = np.zeros_like(z3_depth), np.zeros_like(z3_depth)
+    settelment_z2 = np.zeros_like(z2_depth)
+
+    for i, depth in enumerate(z1_depth):
+        if depth <= water_table:
+            total_stress_z1[i] = depth * gamma_1 + delta_sigma
+            pore_pressure_z1[i] = 0
+        else:
+            total_stress_z1[i] = total_stress_z1[int(water_table/step)] + (depth - water_table) * gamma_r_1
+            pore_pressure_z1[i] = (depth-water_table) * gamma_water
+
+    for i, depth in enumerate(z2_depth):
+        total_stress_z2[i] = total_stress_z1[int(z1/step)] + (depth - z1) * gamma_r_2
+        H = z2 if z3 == 0 else z2/2
+        c_v = k/(m_v * gamma_water)
+        t_99 = (1.4832*(H)**2)/c_v
+        T_v = ((t/100) * t_99 * c_v)/(H)**2
+        if t == 100:
+            U = 1
+        elif T_v >= 0 and T_v < (1/12):
+            U = np.sqrt(4*T_v/3)
+        else:
+            U = 1 - (2/3)*np.exp((1/4)-(3*T_v))
+        if t == 0:
+            excess_pore_pressure = delta_sigma
+        elif t == 100:
+            excess_pore_pressure = 0
+        else:
+            M = np.pi/2 * (2 * np.arange(0, 100) + 1)
+            excess_pore_pressure = np.sum((2 * delta_sigma / M) * np.sin(M * (depth - z1) / (H)) * np.exp(-M**2 * T_v))
+        pore_pressure_z2[i] = (depth - water_table) * gamma_water + excess_pore_pressure
+        settelment_z2[i] = 1000*(delta_sigma-excess_pore_pressure) * m_v * step
+
+    for i, depth in enumerate(z3_depth):
+        total_stress_z3[i] = total_stress_z2[int(z2/step)] + (depth+-z1-z2) * gamma_r_3
+        pore_pressure_z3[i] = (depth-water_table) * gamma_water
+
+    total_stress = np.concatenate((total_stress_z1, total_stress_z2, total_stress_z3))
+    pore_pressure = np.concatenate((pore_pressure_z1, pore_pressure_z2, pore_pressure_z3))
+    return {
+        'depths': np.concatenate((z1_depth, z2_depth, z3_depth)),
+        'total_stress': total_stress,
+        'pore_pressure': pore_pressure,
+        'effective_stress': total_stress - pore_pressure,
+        'settelment': settelment_z2,
+        'U': U,
+    }
+
+
+# the original loops hold for a water table on the step grid within the top sand, which they assume
+@pytest.mark.parametrize('t, z3, water_table', list(itertools.product((0, 1, 10, 50, 99, 100), (0, 2), (0, 1, 2))))
+def test_vectorized_solver_matches_the_original_loops(t, z3, water_table):
+    args = (2, 4, z3, 100, 18, 19, 19, 21, 18, 19, 5e-4, 1e-10, water_table)
+    expected, result = baseline(t, *args), solve_consolidation(t, *args)
+    for key in ('depths', 'total_stress', 'pore_pressure', 'effective_stress', 'settelment'):
+        # the original loops sum 100 modes, where the solver truncates the series to a tolerance
+        assert np.allclose(result[key], expected[key], atol=1e-3 * 100), key
+    assert result['U'] == pytest.approx(expected['U'])
+
+
+# Terzaghi series of u/Δσ summed over all n_modes modes
+def full_series(Z, T_v):
+    M = mode_numbers(n_modes)
+    return np.exp(-M**2 * np.asarray(T_v)[:, None]) @ ((2 / M)[:, None] * np.sin(M[:, None] * Z))
+
+
+def test_erfc_approximation():
+    x = np.linspace(-3, 8, 2001)
+    expected = np.array([math.erfc(v) for v in x])
+    assert np.all(np.abs(erfc_approximation(x) - expected) <= 1.2e-7 * expected)
+
+
+@pytest.mark.parametrize('tolerance', [1e-3, 1e-6, 1e-9])
+def test_truncated_series_within_the_tolerance(tolerance):
+    Z = np.linspace(0, 2, 81)
+    T_v = np.array([2e-3, 1e-2, 0.05, 0.2, 1.0, 3.0])
+    N = series_terms(T_v, tolerance)
+    assert np.all(N[:-1] >= N[1:])  # fewer modes at later times
+    assert np.max(np.abs(fourier_series(Z, T_v, N) - full_series(Z, T_v))) <= tolerance
+
+
+def test_short_time_solution():
+    Z = np.linspace(0, 2, 81)
+    T_v = np.array([1e-4, 1e-3, 1e-2])
+    K = image_terms(T_v, 1e-9)
+    assert np.all(K <= 2)  # one or two image pairs at short times, against hundreds of modes
+    assert np.all(2 * K < series_terms(T_v, 1e-9))
+    assert np.max(np.abs(short_time_solution(Z, T_v, K) - full_series(Z, T_v))) <= 1e-8
+    # normalized_excess takes the short-time branch there and the series later, both within the tolerance
+    T_v = np.array([1e-4, 1e-3, 0.3])
+    assert np.max(np.abs(normalized_excess(Z, T_v, 1e-6) - full_series(Z, T_v))) <= 1e-6
+
+
+def test_spectral_basis_cache_bound(monkeypatch):
+    # room for two 1024-mode bases of 81 nodes, so the third grid evicts the least recently used
+    monkeypatch.setattr(solver.basis_cache, 'maxbytes', 2 * 1024 * 81 * 8)
+    solver.basis_cache.clear()
+    evictions = solver.basis_cache.evictions
+    grids = [np.linspace(0, end, 81) for end in (1, 2, 1.5)]
+    T_v = np.array([1e-3, 0.1])
+    N = np.array([n_modes, n_modes])
+    for Z in grids:
+        assert np.allclose(fourier_series(Z, T_v, N), full_series(Z, T_v), rtol=0, atol=1e-12)
+    assert solver.basis_cache.nbytes <= solver.basis_cache.maxbytes
+    assert len(solver.basis_cache) == 2 and solver.basis_cache.evictions == evictions + 1
+    # the evicted basis is computed afresh, the cached one is served as it is
+    M = mode_numbers()
+    assert np.array_equal(spectral_basis(grids[0], n_modes), (2 / M)[:, None] * np.sin(M[:, None] * grids[0]))
+    assert spectral_basis(grids[0], n_modes) is spectral_basis(grids[0], n_modes)
+    solver.basis_cache.clear()
+
+
+@pytest.mark.parametrize('method, drains', [('analytic', None), ('fdm', None), ('analytic', drain_parameters(1.5))])
+def test_scale_clay_is_a_direct_solve(method, drains):
+    positions = np.array([0, 5, 20, 50, 80, 100])
+    clay = (2, 5, 2)
+    # an unloading of 40 kPa from the solution under a unit load, which reverses the order of the settlement
+    direct = solve_clay(positions, *clay, -40, 1e-3, 1e-9, method=method, drains=drains)
+    scaled = scale_clay(solve_clay(positions, *clay, 1, 1e-3, 1e-9, method=method, drains=drains), -40)
+    for key in ('excess_pore_pressure', 'settelment', 'accummultive_settelment', 'U', 'T_v'):
+        assert np.allclose(scaled[key], direct[key]), key
+    assert scaled['t_99'] == direct['t_99']
+
+
+def test_scale_curve_is_a_direct_solve():
+    direct = settelment_time_curve(2, 5, 2, 60, 1e-3, 1e-9, method='fdm')
+    scaled = scale_curve(settelment_time_curve(2, 5, 2, 1, 1e-3, 1e-9, method='fdm'), 60)
+    assert np.allclose(scaled['settelment'], direct['settelment'])
+    assert np.allclose(scaled['U'], direct['U'])
+    assert scaled['final_settelment'] == pytest.approx(direct['final_settelment'])
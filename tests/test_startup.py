@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    env = dict(os.environ, CONSOLIDATION_METRICS='', CONSOLIDATION_SNAPSHOT='', CONSOLIDATION_CACHE_DIR='')
+    return subprocess.run([sys.executable, '-c', code], cwd=directory, env=env, check=True, capture_output=True,
+                          text=True).stdout
+
+
+def test_import_defers_the_optional_subsystems():
+    loaded = run('import sys, cosolidation; print(" ".join(sorted(sys.modules)))').split()
+    for module in ('api', 'back_analysis', 'batch', 'export', 'nonlinear', 'pyarrow', 'diskcache', 'multiprocess',
+                   'psutil', 'concurrent.futures.process'):
+        assert module not in loaded
+
+
+def test_startup_and_lazy_routes():
+    output = run('\n'.join([
+        'import sys, cosolidation',
+        'cosolidation.startup()',
+        'client = cosolidation.server.test_client()',
+        "print(client.post('/api/solve', json={'z2': 4}).status_code)",
+        "print(client.get('/export/settlement.csv').status_code)",
+        "print('export' in sys.modules, 'api' in sys.modules)",
+        "print(client.get('/metrics').data.decode())",
+    ])).splitlines()
+    assert output[:3] == ['200', '200', 'True True']
+    stages = [line.split('"')[1] for line in output if line.startswith('consolidation_startup_seconds{')]
+    assert stages == ['imports', 'templates', 'total']
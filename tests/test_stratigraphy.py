@@ -0,0 +1,81 @@
+import numpy as np
+
+from solver import solve_consolidation, solve_clay, solve_layers, soil_profiles
+from stratigraphy import (layered_profile, three_layer_profile, table_profile, clay_units, depth_grid, total_stress,
+                          hydrostatic_pressure)
+
+
+def test_three_layer_stresses():
+    # 2 m of sand (18 / 20 kN/m³), 4 m of clay (19 kN/m³) and 3 m of sand (21 kN/m³), water table at 1 m
+    profile = three_layer_profile(2, 4, 3, 18, 20, 17, 19, 19, 21)
+    depths = np.array([0, 1, 2, 6, 9])
+    expected = 50 + np.array([0, 18, 18 + 20, 18 + 20 + 4 * 19, 18 + 20 + 4 * 19 + 3 * 21])
+    assert np.allclose(total_stress(profile, depths, 50, 1), expected)
+    assert np.allclose(hydrostatic_pressure(depths, 1), [0, 0, 10, 50, 80])
+
+
+def test_solve_consolidation_final_state():
+    result = solve_consolidation(100, 2, 4, 3, 50, 18, 20, 17, 19, 19, 21, 1e-3, 1e-9, 1)
+    depths, (_, clay, _) = depth_grid(three_layer_profile(2, 4, 3, 18, 20, 17, 19, 19, 21))
+    assert np.allclose(result['depths'], depths)
+    assert np.allclose(result['total_stress'], total_stress(three_layer_profile(2, 4, 3, 18, 20, 17, 19, 19, 21),
+                                                            depths, 50, 1))
+    # the excess pore pressure of the clay has dissipated
+    assert np.allclose(result['pore_pressure'], hydrostatic_pressure(depths, 1), atol=1e-6)
+    assert np.array_equal(result['clay'], np.arange(len(depths))[clay])
+
+
+def test_drainage_of_the_layers():
+    # an enclosed clay between two clays does not drain, a clay over a sand drains through its bottom
+    profile = layered_profile((2, 3, 1, 3, 2), 18, 20, (False, True, True, True, False))
+    assert profile['top_drained'][1:4].tolist() == [True, False, False]
+    assert profile['bottom_drained'][1:4].tolist() == [False, False, True]
+
+
+def test_clay_units():
+    # the empty clay and the sand split the clays into two units
+    profile = layered_profile((2, 3, 1, 0, 3, 2), 18, 20, (False, True, True, True, False, True))
+    assert clay_units(profile) == [[1, 2], [5]]
+
+
+def test_layers_with_separate_clays():
+    # two clays of different properties, separated by a sand, consolidate as two clays of solve_clay
+    layers = ((2, 18, 20, False, 0, 0), (4, 19, 21, True, 5e-4, 1e-10), (1, 18, 20, False, 0, 0),
+              (2, 19, 21, True, 1e-3, 1e-9), (1, 18, 20, False, 0, 0))
+    t = np.array([0, 10, 50, 100])
+    clay = solve_layers(t, table_profile(layers), 100)
+    clays = ((2, 4, 5e-4, 1e-10, slice(0, 81)), (7, 2, 1e-3, 1e-9, slice(81, None)))
+    t_99 = [solve_clay(0, z1, z2, 1, 100, m_v, k)['t_99'] for z1, z2, m_v, k, _ in clays]
+    assert clay['t_99'] == max(t_99)
+    for (z1, z2, m_v, k, nodes), unit_t_99 in zip(clays, t_99):
+        expected = solve_clay(t * clay['t_99'] / unit_t_99, z1, z2, 1, 100, m_v, k)
+        assert np.allclose(clay['excess_pore_pressure'][:, nodes], expected['excess_pore_pressure'])
+    # U of the total settlement, 4 m × 5e-4 and 2 m × 1e-3 weighing the same
+    assert np.allclose(clay['U'][-1], 1)
+    assert np.isclose(clay['accummultive_settelment'][-1, -1], 1000 * 100 * (4 * 5e-4 + 2 * 1e-3), rtol=0.03)
+
+    # the excess pore pressure sits on the clay nodes only
+    result = soil_profiles(clay, table_profile(layers), 100, 0)
+    depths, nodes = depth_grid(table_profile(layers))
+    sand = np.ones(len(depths), dtype=bool)
+    sand[result['clay']] = False
+    assert np.allclose(result['pore_pressure'][:, sand], hydrostatic_pressure(depths[sand], 0))
+    assert np.allclose(result['pore_pressure'][1, nodes[1]], hydrostatic_pressure(depths[nodes[1]], 0)
+                       + clay['excess_pore_pressure'][1, :81])
+
+
+def test_layers_of_one_clay():
+    # adjacent clays of different properties consolidate as one clay of the finite differences
+    layers = ((2, 18, 20, False, 0, 0), (2, 19, 21, True, 5e-4, 1e-10), (2, 19, 21, True, 1e-3, 1e-9))
+    t = np.array([10, 50])
+    clay = solve_layers(t, table_profile(layers), 100)
+    expected = solve_clay(t, 2, 4, 0, 100, 5e-4, 1e-10, method='fdm', sublayers=((2, 5e-4, 1e-10), (2, 1e-3, 1e-9)))
+    assert np.allclose(clay['excess_pore_pressure'], expected['excess_pore_pressure'])
+    assert clay['t_99'] == expected['t_99']
+
+    # the three-layer column is the Sand-1 / Clay / Sand-2 solution of solve_consolidation
+    column = solve_consolidation(t, 2, 4, 2, 100, 18, 20, 19, 21, 18, 20, 5e-4, 1e-10, 0)
+    layered = solve_consolidation(t, 0, 0, 0, 100, 0, 0, 0, 0, 0, 0, 0, 0, 0, layers=(
+        (2, 18, 20, False, 0, 0), (4, 19, 21, True, 5e-4, 1e-10), (2, 18, 20, False, 0, 0)))
+    for key in ('depths', 'pore_pressure', 'effective_stress', 'accummultive_settelment'):
+        assert np.allclose(layered[key], column[key])